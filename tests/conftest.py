@@ -0,0 +1,34 @@
+import json
+import random
+from types import SimpleNamespace
+
+import pytest
+
+from problem.benchmark import make_task
+from problem.drawn_forces import DrawnForce
+
+
+@pytest.fixture
+def inf_case():
+    """(task, forces) whose relation has a zero RHS, so the full result holds inf ratio/error."""
+    task = make_task(random.Random(0), 2, relations=True)
+    g, n = (spec.name for spec in task.expected_forces)
+    task.relation_requirements.relations[:] = [SimpleNamespace(
+        lhs=[SimpleNamespace(force_name=g, sign=1.0, e_vec=None)],
+        rhs=[SimpleNamespace(force_name=n, sign=1.0, e_vec=(1.0, 0.0))],
+        ratio=1.0,
+    )]
+    center = task.scene.rects[0].center
+    forces = [
+        DrawnForce(name=g, vec=(0.0, 100.0), anchor=center),
+        DrawnForce(name=n, vec=(0.0, -100.0), anchor=center),
+    ]
+    return task, forces
+
+
+@pytest.fixture
+def strict_loads():
+    """json.loads that rejects Infinity/NaN, like the browser's JSON.parse."""
+    def reject(token):
+        raise ValueError(f"non-finite JSON token {token}")
+    return lambda text: json.loads(text, parse_constant=reject)
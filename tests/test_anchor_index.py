@@ -0,0 +1,75 @@
+import dataclasses
+import random
+from types import SimpleNamespace
+
+import pytest
+
+import problem.evaluate as evaluate
+from problem.anchor_index import MIN_INDEXED_ANCHORS, MIN_NEAREST_ANCHORS, AnchorGrid
+from problem.benchmark import make_submission, make_task
+from problem.evaluate import compile_task, evaluate_task
+from problem.measurements import measure
+from problem.spec import AnchorType
+
+
+def _anchor(rng, x0=0.0, y0=0.0, extent=800.0):
+    a = (x0 + rng.uniform(0, extent), y0 + rng.uniform(0, extent))
+    if rng.random() < 0.5:
+        return SimpleNamespace(kind=AnchorType.POINT, point=a, segment=None, ref=None, point_name=None, segment_name=None)
+    length = rng.choice([5.0, 40.0, 300.0, 3000.0])
+    b = (a[0] + rng.uniform(-length, length), a[1] + rng.uniform(-length, length))
+    return SimpleNamespace(kind=AnchorType.SEGMENT, point=None, segment=(a, b), ref=None, point_name=None, segment_name=None)
+
+
+def _linear(plan):
+    """The same plan without anchor grids: every anchor is scanned."""
+    return dataclasses.replace(plan, forces=tuple(dataclasses.replace(cf, anchor_index=None) for cf in plan.forces))
+
+
+@pytest.mark.parametrize("seed", range(6))
+def test_evaluate_task_same_as_linear_scan(seed):
+    rng = random.Random(seed)
+    for _ in range(10):
+        task = make_task(rng, rng.randint(1, 5))
+        for spec in task.expected_forces:
+            cx, cy = task.scene.rects[0].center
+            spec.anchor = [_anchor(rng, cx - 200, cy - 200, 400) for _ in range(rng.randint(MIN_INDEXED_ANCHORS, 60))]
+        plan = compile_task(task)
+        assert all(cf.anchor_index is not None for cf in plan.forces)
+        linear = _linear(plan)
+        for _ in range(5):
+            forces = make_submission(rng, task, n_extra=rng.randint(0, 2))
+            for f in forces:
+                if f.anchor is not None and rng.random() < 0.5:
+                    f.anchor = (f.anchor[0] + rng.uniform(-60, 60), f.anchor[1] + rng.uniform(-60, 60))
+            assert evaluate_task(plan, forces) == evaluate_task(linear, forces)
+            assert measure(plan, forces) == measure(linear, forces)
+
+
+def test_best_and_nearest_anchor_same_as_linear_scan():
+    rng = random.Random(16)
+    checked = mismatches = 0
+    for _ in range(300):
+        specs = [_anchor(rng, -200, -200, 1100) for _ in range(rng.randint(MIN_INDEXED_ANCHORS, 2 * MIN_NEAREST_ANCHORS))]
+        anchors = tuple(
+            evaluate.CompiledAnchor(spec=a, is_point=a.kind is AnchorType.POINT, is_segment=a.kind is AnchorType.SEGMENT,
+                                    point=a.point, segment=a.segment)
+            for a in specs
+        )
+        items = [(k, a.is_point, a.point if a.is_point else a.segment) for k, a in enumerate(anchors)]
+        linear = SimpleNamespace(anchors=anchors, anchor_index=None)
+        indexed = SimpleNamespace(anchors=anchors, anchor_index=AnchorGrid(items, rng.choice([1, 7, 10, 55])))
+        for _ in range(20):
+            if rng.random() < 0.3:
+                _, is_point, geom = rng.choice(items)
+                p = geom if is_point else geom[0]
+            elif rng.random() < 0.8:
+                p = (rng.uniform(-300, 1100), rng.uniform(-300, 900))
+            else:
+                p = (rng.uniform(-1e5, 1e5), rng.uniform(-1e5, 1e5))
+            tol, span = rng.choice([0.0, 5.0, 20.0, 50.0]), rng.choice([-1.0, 0.0, 10.0, 60.0, 1e6])
+            checked += 1
+            if (evaluate._best_anchor(linear, p, tol, span)[:3] != evaluate._best_anchor(indexed, p, tol, span)[:3]
+                    or evaluate.nearest_anchor_distance(linear, p) != evaluate.nearest_anchor_distance(indexed, p)):
+                mismatches += 1
+    assert (mismatches, checked) == (0, 6000)
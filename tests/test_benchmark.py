@@ -0,0 +1,44 @@
+import copy
+
+from problem.benchmark import (
+    compare_to_baseline,
+    format_report,
+    generate_cases,
+    load_baseline,
+    run_suite,
+    save_baseline,
+)
+from problem.evaluate import evaluate_task
+
+
+def test_cases_are_seeded():
+    a = generate_cases(3, sizes=[(3, 2)], submissions=4)
+    b = generate_cases(3, sizes=[(3, 2)], submissions=4)
+    assert [c['name'] for c in a] == ['e3_x2_xy', 'e3_x2_xy_rel', 'e3_x2_np', 'e3_x2_np_rel']
+    for ca, cb in zip(a, b):
+        for sa, sb in zip(ca['submissions'], cb['submissions']):
+            assert evaluate_task(ca['task'], sa) == evaluate_task(cb['task'], sb)
+
+
+def test_suite_report_round_trip(tmp_path):
+    report = run_suite(1, sizes=[(2, 1)], submissions=3, repeats=1)
+    path = tmp_path / "baseline.json"
+    save_baseline(report, str(path))
+    assert load_baseline(str(path)) == report
+    assert compare_to_baseline(report, load_baseline(str(path))) == []
+    assert 'e2_x1_xy' in format_report(report)
+
+
+def test_compare_flags_only_regressions():
+    base = {'results': {'c': {'evaluate_task': {'p50_us': 100.0, 'p90_us': 200.0, 'throughput': 1000.0,
+                                                'alloc_peak_bytes': 500.0}}}}
+    report = copy.deepcopy(base)
+    m = report['results']['c']['evaluate_task']
+    m['p50_us'] = 130.0        # 30 % slower: regression
+    m['p90_us'] = 110.0        # faster: fine
+    m['throughput'] = 850.0    # 15 % lower: below the threshold
+    report['results']['ny'] = report['results']['c']  # not in the baseline: skipped
+    got = compare_to_baseline(report, base, threshold=0.2)
+    assert [(r['case'], r['metric']) for r in got] == [('c', 'p50_us')]
+    assert abs(got[0]['change'] - 0.3) < 1e-12
+    assert [r['metric'] for r in compare_to_baseline(report, base, threshold=0.1)] == ['p50_us', 'throughput']
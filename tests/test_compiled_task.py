@@ -0,0 +1,32 @@
+import dataclasses
+import random
+
+import pytest
+
+from problem.benchmark import make_submission, make_task
+from problem.evaluate import WANT_LEVELS, CompiledTask, compile_task, evaluate_many, evaluate_task
+
+
+@pytest.mark.parametrize("want", WANT_LEVELS)
+@pytest.mark.parametrize("seed", range(6))
+def test_evaluate_many_matches_evaluate_task(seed, want):
+    rng = random.Random(seed)
+    task = make_task(rng, rng.randint(1, 8), basis=rng.choice(["xy", "np"]), relations=seed % 2 == 1)
+    subs = [make_submission(rng, task, n_extra=rng.randint(0, 3), p_missing=0.2) for _ in range(25)]
+    subs.append([])
+    plan = compile_task(task)
+    got = list(evaluate_many(plan, subs, want=want))
+    assert len(got) == len(subs)
+    assert [dict(r) for r in evaluate_many(task, subs, want=want)] == [dict(r) for r in got]
+    for result, forces in zip(got, subs):
+        ref = evaluate_task(task, forces, want=want)
+        assert dict(result) == dict(ref)
+        assert result.overlays == ref.overlays
+
+
+def test_plan_is_immutable():
+    plan = compile_task(make_task(random.Random(1), 3))
+    assert isinstance(plan, CompiledTask)
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        plan.ang_tol = 1.0
+    assert compile_task(plan.task_spec) == plan
@@ -0,0 +1,46 @@
+import json
+import shutil
+
+import pytest
+
+from problem.differential import compare_reports, differential, load_report, same_cases, save_report
+
+
+def _report(over=10, mean=0.05, js_errors=0):
+    return {
+        'cases': 100, 'seed': 1, 'eps': 0.01, 'seconds': 1.0,
+        'errors': {'python': 0, 'js': js_errors},
+        'fields': {
+            'score': {'n': 100, 'over': over, 'mean': mean, 'max': 0.5},
+            'coverage': {'n': 100, 'over': 0, 'mean': 0.0, 'max': 0.0},
+        },
+        'worst': {'score': [{'delta': 0.5, 'case': [1, 0, 3]}], 'coverage': []},
+    }
+
+
+def test_save_and_load_drop_worst_cases(tmp_path):
+    path = tmp_path / "diff.json"
+    report = _report()
+    save_report(report, str(path))
+    stored = load_report(str(path))
+    assert 'worst' not in stored
+    assert stored == json.loads(json.dumps({k: v for k, v in report.items() if k != 'worst'}))
+    assert compare_reports(report, stored) == []
+    assert same_cases(report, stored)
+
+
+def test_compare_reports_lists_moved_stats():
+    changes = compare_reports(_report(over=12, mean=0.0502, js_errors=1), _report())
+    got = {(c['field'], c['stat']): c['delta'] for c in changes}
+    assert set(got) == {('score', 'over'), ('errors', 'js')}  # the mean moved less than the threshold
+    assert got[('score', 'over')] == pytest.approx(0.02)
+    assert got[('errors', 'js')] == pytest.approx(0.01)
+    assert compare_reports(_report(mean=0.0502), _report(), threshold=0.0) != []
+
+
+@pytest.mark.skipif(shutil.which('node') is None, reason="node is not installed")
+def test_same_seed_gives_no_changes():
+    first = differential(40, seed=5, workers=1, chunk_size=20)
+    again = differential(40, seed=5, workers=1, chunk_size=20)
+    assert same_cases(first, again)
+    assert compare_reports(again, first, threshold=0.0) == []
@@ -0,0 +1,71 @@
+import pickle
+from types import SimpleNamespace
+
+import pytest
+
+from problem.drawn_forces import DrawnForce, ForceBatch, as_force_batch
+
+
+def test_vec_from_base_and_tip():
+    f = DrawnForce.from_json({'name': 'G', 'anchor': [1, 2], 'arrowBase': [10, 20], 'arrowTip': [13, 16]})
+    assert f == DrawnForce(name='G', vec=(3.0, -4.0), anchor=(1.0, 2.0), arrowBase=(10.0, 20.0), editable=True)
+
+
+def test_vec_wins_over_base_and_tip():
+    f = DrawnForce.from_json({'name': 'G', 'vec': [5, 0], 'arrowBase': [0, 0], 'arrowTip': [0, 9]})
+    assert f.vec == (5.0, 0.0) and f.arrowBase == (0.0, 0.0)
+
+
+@pytest.mark.parametrize("d", [
+    {'name': 'G', 'arrowBase': [0, 0]},                       # no tip
+    {'name': 'G', 'arrowTip': [0, 9]},                        # no base
+    {'name': 'G', 'arrowBase': [0, 0], 'arrowTip': [0, "x"]},
+    {'name': 'G', 'vec': [1, 2, 3]},
+])
+def test_missing_vec(d):
+    assert DrawnForce.from_json(d).vec is None
+
+
+def test_missing_anchor_and_name():
+    f = DrawnForce.from_json({'arrowBase': [0, 0], 'arrowTip': [1, 0], 'name': None})
+    assert f.anchor is None and f.name == ''
+    batch = ForceBatch.from_json([{'arrowBase': [0, 0], 'arrowTip': [1, 0]}])
+    assert batch.anchor_at(0) is None and batch.vec_at(0) == (1.0, 0.0)
+
+
+@pytest.mark.parametrize("d, editable", [
+    ({}, True),
+    ({'isExpected': True}, True),
+    ({'isExpected': False}, False),    # pre-drawn force of the web client
+    ({'isExpected': None}, True),
+    ({'editable': False}, False),
+    ({'editable': True, 'isExpected': False}, True),  # editable takes precedence
+])
+def test_editable_defaults(d, editable):
+    assert DrawnForce.from_json(dict(d, name='G')).editable is editable
+
+
+def test_from_object():
+    f = DrawnForce(name='N', vec=(0.0, 1.0))
+    assert DrawnForce.from_object(f) is f
+    engine_force = SimpleNamespace(name=None, vec=[3, 4], anchor=(1, 1), editable=0)
+    assert DrawnForce.from_object(engine_force) == DrawnForce(
+        name='', vec=(3.0, 4.0), anchor=(1.0, 1.0), arrowBase=None, editable=False,
+    )
+    assert DrawnForce.from_object(SimpleNamespace()) == DrawnForce()
+
+
+def test_batch_from_json_round_trip():
+    forces = [
+        {'name': 'G', 'anchor': [0, 0], 'arrowBase': [0, 0], 'arrowTip': [0, 50]},
+        {'name': 'N', 'vec': [0, -50], 'isExpected': False},
+        {'name': '', 'arrowBase': [5, 5]},
+    ]
+    batch = ForceBatch.from_json(forces)
+    assert len(batch) == 3
+    assert list(batch) == [DrawnForce.from_json(d) for d in forces]
+    assert list(batch.editable) == [1, 0, 1]
+    assert batch.vec_at(2) is None and batch.base_at(2) == (5.0, 5.0)
+    assert list(pickle.loads(pickle.dumps(batch))) == list(batch)
+    assert as_force_batch(batch) is batch
+    assert list(as_force_batch(list(batch))) == list(batch)
@@ -0,0 +1,134 @@
+import asyncio
+import json
+import math
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from problem.benchmark import make_submission, make_task
+from problem.evaluate import evaluate_task
+from problem.grading_server import DeadlineExceeded, GradingService, LocalClient, Overloaded
+
+
+def _handle(tasks, request):
+    async def run():
+        async with GradingService(tasks) as service:
+            return await service.handle_json(json.dumps(request))
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize("forces", [
+    ["x"],
+    [1],
+    [None],
+    [{}],
+    [{"name": 3}],
+    [{"name": "G", "anchor": [1, "a"]}],
+    [{"name": "G", "arrowTip": [1, 2, 3]}],
+    [{"name": "G", "vec": {"x": 1, "y": 2}}],
+    [{"name": "G", "editable": "yes"}],
+    [{"name": "G", "arrowBase": [0, 0], "arrowTip": [10, 0]}, "x"],
+])
+def test_malformed_forces_are_rejected(forces):
+    task = make_task(random.Random(0), 2)
+    status, body = _handle({'t': task}, {'task_id': 't', 'forces': forces})
+    assert status == 400
+    assert 'forces' in json.loads(body)['error']
+
+
+def test_client_forces_are_graded():
+    task = make_task(random.Random(0), 2)
+    forces = [{"name": spec.name, "anchor": [0, 0], "arrowBase": [0, 0], "arrowTip": [50, 0], "isExpected": True}
+              for spec in task.expected_forces]
+
+    async def run():
+        async with GradingService({'t': task}) as service:
+            return await LocalClient(service).evaluate('t', forces)
+    reply = asyncio.run(run())
+    assert reply['status'] == 200
+    assert 0.0 <= reply['result']['score'] <= 1.0
+
+
+def test_full_response_is_strict_json(inf_case, strict_loads):
+    task, forces = inf_case
+    full = evaluate_task(task, forces, want="full")
+    assert any(isinstance(v, float) and math.isinf(v)
+               for d in full['details'].values() if isinstance(d, dict) for v in d.values())
+    json_forces = [{"name": f.name, "anchor": list(f.anchor), "arrowBase": list(f.anchor),
+                    "arrowTip": [f.anchor[0] + f.vec[0], f.anchor[1] + f.vec[1]]} for f in forces]
+    status, body = _handle({'t': task}, {'task_id': 't', 'forces': json_forces, 'want': 'full'})
+    assert status == 200
+    result = strict_loads(body)['result']
+    assert result['score'] == full['score']
+
+
+def _cases(seed, n):
+    rng = random.Random(seed)
+    task = make_task(rng, 4)
+    return task, [make_submission(rng, task, n_extra=1) for _ in range(n)]
+
+
+def _grade_all(service, requests):
+    """grade() every (task_id, forces, want) request concurrently; exceptions are returned."""
+    async def run():
+        async with service:
+            return await asyncio.gather(
+                *(service.grade(task_id, forces, want=want) for task_id, forces, want in requests),
+                return_exceptions=True,
+            )
+    return asyncio.run(run())
+
+
+def test_requests_coalesce_per_plan_and_want():
+    task, subs = _cases(1, 30)
+    other, other_subs = _cases(2, 5)
+    requests = [('t', s, "score") for s in subs[:20]] + [('t', s, "full") for s in subs[20:]]
+    requests += [('u', s, "score") for s in other_subs]
+    service = GradingService({'t': task, 'u': other}, batch_window=0.05)
+    results = _grade_all(service, requests)
+    assert service.stats['batches'] == 3
+    assert service.stats['graded'] == len(requests)
+    specs = {'t': task, 'u': other}
+    for (task_id, forces, want), result in zip(requests, results):
+        assert result == evaluate_task(specs[task_id], forces, want=want)
+
+
+def test_max_batch_splits_batches():
+    task, subs = _cases(3, 20)
+    service = GradingService(task, max_batch=8, batch_window=0.05)
+    results = _grade_all(service, [(None, s, "score") for s in subs])
+    assert service.stats['batches'] == 3
+    assert [r['score'] for r in results] == [evaluate_task(task, s, want="score")['score'] for s in subs]
+
+
+def test_overloaded_above_max_pending():
+    task, subs = _cases(4, 200)
+    service = GradingService(task, max_pending=150, batch_window=0.05)
+    results = _grade_all(service, [(None, s, "score") for s in subs])
+    rejected = [r for r in results if isinstance(r, Overloaded)]
+    assert len(rejected) == 50 and all(isinstance(r, Overloaded) for r in results[150:])
+    assert service.stats['graded'] == 150 and service.stats['rejected'] == 50
+    assert service.pending == 0
+
+
+def test_deadline_exceeded():
+    task, subs = _cases(5, 10)
+    service = GradingService(task, default_timeout=0.0)
+    results = _grade_all(service, [(None, s, "score") for s in subs])
+    assert all(isinstance(r, DeadlineExceeded) for r in results)
+    assert service.stats['expired'] == 10
+    assert service.stats['batches'] == 0  # expired requests are dropped before grading
+    status, body = _handle(task, {'task_id': None, 'forces': [], 'timeout': 0})
+    assert status == 504
+
+
+def test_process_pool_gives_same_results():
+    task, subs = _cases(6, 12)
+    requests = [(None, s, want) for s, want in zip(subs, ["score", "score+feedback", "full"] * 4)]
+    with ProcessPoolExecutor(max_workers=2) as pool:
+        in_pool = _grade_all(GradingService(task, executor=pool, max_batch=4), requests)
+    in_threads = _grade_all(GradingService(task, max_batch=4), requests)
+    for a, b in zip(in_pool, in_threads):
+        assert dict(a) == dict(b)
+        assert a.overlays == b.overlays
@@ -0,0 +1,68 @@
+import json
+import os
+
+import pytest
+
+from problem.headless import (
+    DEFAULT_IMPORT_BUDGET_MS,
+    IMPORT_BUDGET_ENV,
+    grade,
+    grade_line,
+    import_budget_ms,
+    import_time,
+)
+
+# Client task whose relation has a zero RHS for the forces below (N drawn horizontally)
+TASK = {
+    'id': 'headless',
+    'origin': [400, 300],
+    'scene': {'rects': [{'bottomCenter': [400, 340], 'width': 160, 'height': 80}]},
+    'expectedForces': [
+        {'name': 'G', 'dir': [0, 1], 'anchor': {'type': 'point', 'ref': 'rect0', 'point': 'center'}},
+        {'name': 'N', 'dir': [0, -1], 'anchor': {'type': 'point', 'ref': 'rect0', 'point': 'center'}},
+    ],
+    'relations': [{'lhs': [{'name': 'G'}], 'rhs': [{'name': 'N', 'component': 'vertical'}], 'ratio': 1}],
+}
+FORCES = [
+    {'name': 'G', 'anchor': [400, 300], 'arrowBase': [400, 300], 'arrowTip': [400, 400]},
+    {'name': 'N', 'anchor': [400, 300], 'arrowBase': [400, 300], 'arrowTip': [500, 300]},
+]
+
+
+def test_grade_inline_task():
+    result = grade(TASK, FORCES, want="score+feedback")
+    assert 0.0 <= result['score'] <= 1.0
+    assert grade(TASK, FORCES, want="score+feedback") == result
+
+
+def test_grade_line_is_strict_json(strict_loads):
+    line = json.dumps({'id': 7, 'task': TASK, 'forces': FORCES})
+    record = strict_loads(grade_line(None, line, want="full"))
+    assert 'error' not in record
+    assert record['id'] == 7
+
+
+def test_grade_line_without_task_reports_error(strict_loads):
+    record = strict_loads(grade_line(None, json.dumps({'id': 1, 'task_id': 'x', 'forces': []})))
+    assert 'error' in record
+
+
+def test_import_loads_no_deferred_modules():
+    _, loaded = import_time(runs=1)
+    assert loaded == []
+
+
+def test_import_budget_from_environment(monkeypatch):
+    monkeypatch.delenv(IMPORT_BUDGET_ENV, raising=False)
+    assert import_budget_ms() == DEFAULT_IMPORT_BUDGET_MS
+    monkeypatch.setenv(IMPORT_BUDGET_ENV, "150")
+    assert import_budget_ms() == 150.0
+    monkeypatch.setenv(IMPORT_BUDGET_ENV, "rask")
+    with pytest.raises(ValueError):
+        import_budget_ms()
+
+
+@pytest.mark.skipif(not os.environ.get(IMPORT_BUDGET_ENV), reason=f"set {IMPORT_BUDGET_ENV} to check the import time")
+def test_import_time_within_budget():
+    ms, _ = import_time()
+    assert ms <= import_budget_ms()
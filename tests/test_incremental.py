@@ -0,0 +1,66 @@
+import math
+import random
+
+import pytest
+
+from problem.benchmark import FORCE_NAMES, make_submission, make_task
+from problem.evaluate import WANT_LEVELS, evaluate_task
+from problem.incremental import Evaluator
+
+
+def _edit(rng, ev, task):
+    """One random delta, as the editor sends them."""
+    n = len(ev)
+    op = rng.random()
+    if op < 0.25 or n == 0:
+        ev.add(make_submission(rng, task, n_extra=1, p_missing=1.0)[0])
+    elif op < 0.55:
+        a = rng.uniform(0, 2 * math.pi)
+        if rng.random() < 0.5:
+            ev.move(rng.randrange(n), vec=(60 * math.cos(a), 60 * math.sin(a)) if rng.random() < 0.8 else None)
+        else:
+            ev.move(rng.randrange(n), anchor=(rng.uniform(0, 1000), rng.uniform(0, 640)))
+    elif op < 0.75:
+        ev.rename(rng.randrange(n), rng.choice(["", "X"] + FORCE_NAMES[:4]))
+    elif op < 0.85:
+        ev.set_editable(rng.randrange(n), rng.random() < 0.8)
+    else:
+        ev.delete(rng.randrange(n))
+
+
+@pytest.mark.parametrize("want", WANT_LEVELS)
+@pytest.mark.parametrize("seed", range(5))
+def test_edits_match_full_evaluation(seed, want):
+    rng = random.Random(seed)
+    for _ in range(10):
+        task = make_task(rng, rng.randint(1, 6), basis=rng.choice(["xy", "np"]), relations=rng.random() < 0.5)
+        ev = Evaluator(task, make_submission(rng, task, n_extra=rng.randint(0, 3)), want=want)
+        for _ in range(12):
+            _edit(rng, ev, task)
+            ref = evaluate_task(task, ev.forces, want=want)
+            got = ev.result()
+            assert got == ref
+            if want == "full":
+                assert got.overlays == ref.overlays
+
+
+def test_move_recomputes_one_column():
+    rng = random.Random(7)
+    task = make_task(rng, 5)
+    ev = Evaluator(task, make_submission(rng, task, p_missing=0.0, p_fixed=0.0))
+    ev.result()
+    columns, rescored = ev.columns_computed, ev.forces_rescored
+    ev.move(0, vec=(0.0, 80.0))
+    assert ev.result() == evaluate_task(task, ev.forces)
+    assert ev.columns_computed == columns + 1
+    assert ev.forces_rescored - rescored <= 2  # the moved force and whatever it displaced
+
+
+def test_result_is_cached_until_next_delta():
+    rng = random.Random(8)
+    task = make_task(rng, 3)
+    ev = Evaluator(task, make_submission(rng, task))
+    first = ev.result()
+    assert ev.result() is first
+    ev.rename(0, "X")
+    assert ev.result() is not first
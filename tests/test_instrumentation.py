@@ -0,0 +1,67 @@
+import random
+
+import pytest
+
+from problem import instrumentation
+from problem.benchmark import make_submission, make_task
+from problem.evaluate import evaluate_many, evaluate_task
+from problem.instrumentation import PHASES, EvalTimings, TimingAggregator
+
+
+@pytest.fixture
+def case():
+    rng = random.Random(10)
+    task = make_task(rng, 4)
+    return task, make_submission(rng, task, n_extra=2)
+
+
+@pytest.fixture
+def global_sink(monkeypatch):
+    agg = TimingAggregator()
+    monkeypatch.setattr(instrumentation, "_SINK", agg)
+    return agg
+
+
+def test_timings_on_result(case):
+    task, forces = case
+    result = evaluate_task(task, forces, want="full", instrument=True)
+    assert isinstance(result.timings, EvalTimings)
+    assert set(result.timings.phases) <= set(PHASES)
+    assert {"matching", "forces", "final", "overlays"} <= set(result.timings.phases)
+    assert result.timings.counters['pairs_scored'] > 0
+    assert result.timings.counters['overlays_built'] == sum(len(v) for v in result['overlays'].values())
+    assert 'timings' not in result
+    assert dict(result) == dict(evaluate_task(task, forces, want="full"))
+
+
+def test_timings_string(case):
+    task, forces = case
+    text = evaluate_task(task, forces, instrument=True).getTimingsString()
+    assert text.startswith("TIMINGS (1 call, ")
+    assert "matching" in text and "pairs_scored" in text
+    assert evaluate_task(task, forces).getTimingsString() == "TIMINGS: (not instrumented)"
+
+
+def test_per_call_and_global_sink_both_receive(case, global_sink):
+    task, forces = case
+    received = []
+    result = evaluate_task(task, forces, instrument=received.append)
+    assert received == [result.timings]
+    assert global_sink.calls == 1
+    assert global_sink.counters == result.timings.counters
+
+
+def test_sink_given_twice_receives_once(case, global_sink):
+    task, forces = case
+    evaluate_task(task, forces, instrument=global_sink)
+    assert global_sink.calls == 1
+
+
+def test_global_sink_alone(case, global_sink):
+    task, forces = case
+    results = list(evaluate_many(task, [forces, [], forces], want="score"))
+    assert global_sink.calls == 3
+    assert all(r.timings is not None for r in results)
+    assert global_sink.summary().startswith("TIMINGS (3 calls, ")
+    instrumentation.set_sink(None)
+    assert evaluate_task(task, forces).timings is None
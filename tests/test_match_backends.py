@@ -0,0 +1,62 @@
+import random
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from problem.benchmark import make_submission, make_task
+from problem.drawn_forces import DrawnForce
+from problem.evaluate import NUMPY_MIN_PAIRS, match_forces_to_expected
+
+STRATEGIES = ("greedy", "optimal")
+
+
+def _matched(task, forces, backend, strategy, ang_tol=10.0, ang_span=20.0):
+    expected = {spec.name: spec for spec in task.expected_forces}
+    matched = match_forces_to_expected(expected, forces, ang_tol, ang_span, backend=backend, strategy=strategy)
+    index = {id(f): i for i, f in enumerate(forces)}
+    return {name: index[id(f)] for name, f in matched.items()}
+
+
+def _assert_same(task, forces, **kw):
+    for strategy in STRATEGIES:
+        py = _matched(task, forces, "python", strategy, **kw)
+        vec = _matched(task, forces, "numpy", strategy, **kw)
+        assert py == vec, (strategy, py, vec)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_random_tasks(seed):
+    rng = random.Random(seed)
+    for _ in range(10):
+        task = make_task(rng, rng.randint(1, 12), basis=rng.choice(["xy", "np"]))
+        forces = make_submission(rng, task, n_extra=rng.randint(0, 10), p_missing=0.2)
+        _assert_same(task, forces, ang_span=rng.choice([0.0, 20.0]))
+
+
+@pytest.mark.parametrize("offset", (-1, 0, 1))
+def test_pair_counts_around_numpy_threshold(offset):
+    rng = random.Random(100 + offset)
+    n_expected = 8
+    for _ in range(20):
+        task = make_task(rng, n_expected)
+        forces = make_submission(rng, task, p_missing=0.0, p_fixed=0.0)
+        n_extra = max(0, (NUMPY_MIN_PAIRS + offset + n_expected - 1) // n_expected - len(forces))
+        forces += make_submission(rng, task, n_extra=n_extra, p_missing=1.0)
+        _assert_same(task, forces)
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_ties(seed):
+    # Identical arrows (same name and vector) score the same against every expected force
+    rng = random.Random(seed)
+    task = make_task(rng, rng.randint(2, 8))
+    forces = []
+    for spec in task.expected_forces:
+        name = rng.choice([spec.name, "", "X"])
+        vec = (100.0 * spec.dir_unit[0], 100.0 * spec.dir_unit[1])
+        for _ in range(rng.randint(1, 4)):
+            forces.append(DrawnForce(name=name, vec=vec, anchor=(0.0, 0.0)))
+    forces += [DrawnForce(name="", vec=(0.0, 50.0), anchor=(0.0, 0.0)) for _ in range(rng.randint(0, 60))]
+    rng.shuffle(forces)
+    _assert_same(task, forces)
@@ -0,0 +1,46 @@
+import random
+
+import pytest
+
+import problem.evaluate as evaluate
+from engine.forces import normalize_name
+from problem.benchmark import make_submission, make_task
+from problem.evaluate import clear_name_cache, evaluate_task, name_cache_info, name_matches
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    clear_name_cache()
+    yield
+    clear_name_cache()
+
+
+def test_counters_and_size_limit():
+    size = evaluate.NAME_CACHE_SIZE
+    names = [f"F_{k} " for k in range(size + 10)]
+    for name in names:
+        assert not name_matches(name, ())
+    info = name_cache_info()['names']
+    assert info == {'hits': 0, 'misses': size + 10, 'evictions': 10, 'size': size, 'maxsize': size}
+
+    assert name_matches(names[-1], [normalize_name(names[-1])])  # most recent: still cached
+    assert name_matches(names[0], [names[0]])                      # least recent: evicted
+    info = name_cache_info()['names']
+    # Hits: names[-1], then names[0] as its own alias; misses: the alias of names[-1], names[0]
+    assert (info['hits'], info['misses'], info['evictions'], info['size']) == (2, size + 12, 12, size)
+    assert [evaluate._normalize_name_cached(n) for n in names[-5:]] == [normalize_name(n) for n in names[-5:]]
+
+
+def test_results_do_not_depend_on_the_cache():
+    rng = random.Random(11)
+    task = make_task(rng, 5)
+    subs = [make_submission(rng, task, n_extra=2) for _ in range(10)]
+    cold = []
+    for forces in subs:
+        clear_name_cache()
+        cold.append(dict(evaluate_task(task, forces)))
+    # Fill the cache past its size so the task's names are evicted and normalized again
+    for k in range(evaluate.NAME_CACHE_SIZE + 1):
+        name_matches(f"N{k}", ())
+    assert [dict(evaluate_task(task, forces)) for forces in subs] == cold
+    assert name_cache_info()['names']['evictions'] > 0
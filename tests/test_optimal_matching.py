@@ -0,0 +1,105 @@
+import importlib
+import itertools
+import random
+import sys
+
+import pytest
+
+import problem.evaluate as evaluate
+from problem.benchmark import make_submission, make_task
+from problem.drawn_forces import ForceBatch
+from problem.evaluate import compile_task
+
+
+@pytest.fixture(params=("scipy", "python"))
+def backend(request, monkeypatch):
+    """Solver behind _linear_sum_assignment_max: SciPy, or the Hungarian fallback (SciPy import fails)."""
+    if request.param == "scipy":
+        pytest.importorskip("scipy.optimize")
+    else:
+        monkeypatch.setitem(sys.modules, "scipy.optimize", None)
+    return request.param
+
+
+def _brute_force(weights):
+    """Best total weight over all assignments of min(n, m) pairs."""
+    n, m = len(weights), len(weights[0])
+    if n <= m:
+        return max(sum(weights[i][j] for i, j in enumerate(cols)) for cols in itertools.permutations(range(m), n))
+    return max(sum(weights[i][j] for j, i in enumerate(rows)) for rows in itertools.permutations(range(n), m))
+
+
+def _random_matrix(rng, n, m):
+    kind = rng.choice(["uniform", "ties", "zero"])
+    if kind == "zero":
+        return [[0.0] * m for _ in range(n)]
+    if kind == "ties":
+        return [[rng.choice([0.0, 0.25, 0.5, 1.0]) for _ in range(m)] for _ in range(n)]
+    return [[rng.random() for _ in range(m)] for _ in range(n)]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_assignment_is_optimal(seed, backend):
+    rng = random.Random(seed)
+    for _ in range(60):
+        n, m = rng.randint(1, 5), rng.randint(1, 5)
+        weights = _random_matrix(rng, n, m)
+        pairs = evaluate._linear_sum_assignment_max(weights)
+        assert pairs == sorted(pairs)
+        assert len(pairs) == min(n, m)
+        assert len({i for i, _ in pairs}) == len({j for _, j in pairs}) == len(pairs)
+        assert sum(weights[i][j] for i, j in pairs) == pytest.approx(_brute_force(weights))
+
+
+def test_fallback_is_used_without_scipy(monkeypatch):
+    monkeypatch.setitem(sys.modules, "scipy.optimize", None)
+    with pytest.raises(ImportError):
+        importlib.import_module("scipy.optimize")
+    assert evaluate._linear_sum_assignment_max([[0.0, 1.0], [1.0, 0.0], [0.5, 0.5]]) == [(0, 1), (1, 0)]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_match_optimal_drops_pairs_at_threshold(seed, backend):
+    rng = random.Random(seed)
+    for _ in range(40):
+        plan = compile_task(make_task(rng, rng.randint(1, 5)))
+        m = rng.randint(0, 5)
+        rows = [[rng.choice([0.0, evaluate.MATCH_THRESHOLD, rng.random()]) for _ in range(m)] for _ in plan.forces]
+        matched = evaluate._match_optimal(plan.forces, m, rows)
+        index = {cf.name: i for i, cf in enumerate(plan.forces)}
+        assert len(set(matched.values())) == len(matched)
+        assert all(rows[index[name]][j] > evaluate.MATCH_THRESHOLD for name, j in matched.items())
+        if m:
+            weights = [[s if s > evaluate.MATCH_THRESHOLD else 0.0 for s in row] for row in rows]
+            total = sum(rows[index[name]][j] for name, j in matched.items())
+            assert total == pytest.approx(_brute_force(weights))
+        else:
+            assert matched == {}
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_unique_names_fast_path_agrees_with_full_matchers(seed, backend):
+    rng = random.Random(seed)
+    taken = 0
+    for _ in range(60):
+        plan = compile_task(make_task(rng, rng.randint(1, 6)))
+        forces = make_submission(rng, plan.task_spec, n_extra=rng.randint(0, 3), p_missing=0.1)
+        for f in forces:
+            if f.name and rng.random() < 0.3:
+                f.name = rng.choice([cf.name for cf in plan.forces])  # duplicates: no fast path
+        batch = ForceBatch.from_drawn(forces)
+        name_rows = [plan.alias_rows.get(evaluate._normalize_name_cached(n), ()) if n else () for n in batch.names]
+        units = evaluate._drawn_units(batch)
+        fast = evaluate._match_unique_names(plan.forces, units, name_rows, plan.ang_tol, plan.ang_span)
+        assert evaluate._match_unique_names(plan.forces, None, name_rows, plan.ang_tol, plan.ang_span, batch) == fast
+        if fast is None:
+            continue
+        taken += 1
+        named = [[i in name_rows[j] for j in range(len(batch))] for i in range(len(plan.forces))]
+        rows = [
+            [evaluate._pair_score(cf, u, named[i][j], plan.ang_tol, plan.ang_span) for j, u in enumerate(units)]
+            for i, cf in enumerate(plan.forces)
+        ]
+        assert list(fast.items()) == list(evaluate._match_greedy(plan.forces, rows).items())
+        assert fast == evaluate._match_optimal(plan.forces, len(batch), rows)
+    assert taken
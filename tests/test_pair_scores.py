@@ -0,0 +1,69 @@
+import random
+
+import pytest
+
+import problem.evaluate as evaluate
+from problem.benchmark import make_submission, make_task
+from problem.drawn_forces import ForceBatch
+from problem.evaluate import compile_task, evaluate_task
+
+
+def _brute_force(plan, batch, name, k):
+    """Top k (score, drawn) pairs for expected force `name`, scoring every pair directly."""
+    i = next(i for i, cf in enumerate(plan.forces) if cf.name == name)
+    cf = plan.forces[i]
+    scored = []
+    for j in range(len(batch)):
+        named = batch.names[j] and i in plan.alias_rows.get(evaluate._normalize_name_cached(batch.names[j]), ())
+        v = batch.vec_at(j)
+        u = evaluate.unit(v) if v is not None else None
+        scored.append((evaluate._pair_score(cf, u, bool(named), plan.ang_tol, plan.ang_span), j))
+    scored.sort(key=lambda s: (-s[0], s[1]))
+    return scored[:k]
+
+
+@pytest.mark.parametrize("backend", ("python", "numpy"))
+@pytest.mark.parametrize("seed", range(8))
+def test_top_k_matches_brute_force(seed, backend, monkeypatch):
+    if backend == "numpy":
+        pytest.importorskip("numpy")
+    monkeypatch.setattr(evaluate, "MATCH_BACKEND", backend)
+    rng = random.Random(seed)
+    for _ in range(15):
+        task = make_task(rng, rng.randint(1, 10))
+        plan = compile_task(task)
+        batch = ForceBatch.from_drawn(make_submission(rng, task, n_extra=rng.randint(0, 8), p_missing=0.3))
+        scores = evaluate_task(plan, batch, want="score", keep_scores=True).pair_scores
+        for cf in plan.forces:
+            k = rng.randint(1, 5)
+            got = scores.top_k(cf.name, k)
+            assert [(c['score'], c['drawn']) for c in got] == _brute_force(plan, batch, cf.name, k)
+            owner = {j: n for n, j in scores.matched.items()}
+            for c in got:
+                assert c['matched_to'] == owner.get(c['drawn'])
+                assert c['above_threshold'] == (c['score'] > evaluate.MATCH_THRESHOLD)
+        assert set(scores.near_misses()) == {cf.name for cf in plan.forces} - set(scores.matched)
+
+
+def test_fast_path_scores_on_first_query():
+    rng = random.Random(25)
+    task = make_task(rng, 4)
+    plan = compile_task(task)
+    names = [cf.name for cf in plan.forces]
+    # Only exact names: matching can skip the score matrix
+    forces = make_submission(rng, task, p_missing=0.0, p_fixed=0.0)
+    for f, name in zip(forces, names):
+        f.name = name
+    batch = ForceBatch.from_drawn(forces)
+    scores = evaluate_task(plan, batch, keep_scores=True).pair_scores
+    for name in names:
+        got = scores.top_k(name, len(batch))
+        assert [(c['score'], c['drawn']) for c in got] == _brute_force(plan, batch, name, len(batch))
+
+
+def test_without_keep_scores():
+    rng = random.Random(26)
+    task = make_task(rng, 2)
+    result = evaluate_task(task, make_submission(rng, task))
+    assert result.pair_scores is None
+    assert "keep_scores=False" in result.getNearMissesString()
@@ -0,0 +1,105 @@
+import io
+import json
+import random
+
+import pytest
+
+import problem.benchmark
+import problem.regrade
+from problem.benchmark import make_submission, make_task
+from problem.drawn_forces import ForceBatch
+from problem.evaluate import evaluate_task
+from problem.regrade import grade_line, load_tasks, main, read_checkpoint, regrade, with_tolerances
+
+
+@pytest.fixture
+def tasks_ref(monkeypatch, inf_case):
+    """--tasks reference to {'inf': task} (an attribute patched onto an importable module)."""
+    monkeypatch.setattr(problem.benchmark, 'REGRADE_TEST_TASKS', {'inf': inf_case[0]}, raising=False)
+    return 'problem.benchmark:REGRADE_TEST_TASKS'
+
+
+def _client_forces(forces):
+    return [{"name": f.name, "anchor": list(f.anchor), "arrowBase": list(f.anchor),
+             "arrowTip": [f.anchor[0] + f.vec[0], f.anchor[1] + f.vec[1]]} for f in forces]
+
+
+def test_output_is_strict_json(tasks_ref, inf_case, strict_loads):
+    line = json.dumps({'id': 1, 'task_id': 'inf', 'forces': _client_forces(inf_case[1])})
+    out = io.StringIO()
+    assert regrade(io.BytesIO(line.encode() + b"\n"), out, tasks_ref, want="full") == 1
+    record = strict_loads(out.getvalue())
+    assert 'error' not in record
+    assert record['id'] == 1
+
+
+@pytest.fixture
+def submissions(tmp_path, monkeypatch):
+    """(input path, --tasks reference) for 20 submissions over three random tasks."""
+    rng = random.Random(13)
+    tasks = {f"t{k}": make_task(rng, rng.randint(2, 5), relations=k == 0) for k in range(3)}
+    monkeypatch.setattr(problem.benchmark, 'REGRADE_TEST_TASKS', tasks, raising=False)
+    path = tmp_path / "subs.jsonl"
+    with open(path, 'w', encoding='utf-8') as fh:
+        for i in range(20):
+            task_id = rng.choice(sorted(tasks))
+            forces = make_submission(rng, tasks[task_id], n_extra=rng.randint(0, 2))
+            fh.write(json.dumps({'id': i, 'task_id': task_id, 'forces': _client_forces(forces)}) + "\n")
+    return path, 'problem.benchmark:REGRADE_TEST_TASKS'
+
+
+def test_resume_after_interruption(tmp_path, monkeypatch, submissions):
+    path, ref = submissions
+    full = tmp_path / "full.jsonl"
+    assert main([str(path), '-o', str(full), '--tasks', ref, '--window', '3']) == 0
+
+    out, ckpt = tmp_path / "out.jsonl", tmp_path / "out.ckpt"
+    calls = []
+
+    def interrupted(plans, line, want):
+        calls.append(line)
+        if len(calls) == 11:  # mid-window: lines 10-11 are written but not checkpointed
+            raise KeyboardInterrupt
+        return grade_line(plans, line, want)
+
+    monkeypatch.setattr(problem.regrade, 'grade_line', interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        main([str(path), '-o', str(out), '--tasks', ref, '--window', '3', '--checkpoint', str(ckpt)])
+    state = read_checkpoint(str(ckpt))
+    assert state['graded'] == 9
+    assert len(out.read_text(encoding='utf-8').splitlines()) == 10
+
+    monkeypatch.setattr(problem.regrade, 'grade_line', grade_line)
+    assert main([str(path), '-o', str(out), '--tasks', ref, '--window', '3',
+                 '--checkpoint', str(ckpt), '--resume']) == 0
+    assert out.read_text(encoding='utf-8') == full.read_text(encoding='utf-8')
+    assert read_checkpoint(str(ckpt))['graded'] == 20
+
+
+def test_tol_overrides_are_applied_per_loaded_task(tmp_path, monkeypatch):
+    task = {
+        'origin': [400, 300],
+        'scene': {'rects': [{'bottomCenter': [400, 340], 'width': 160, 'height': 80}]},
+        'expectedForces': [
+            {'name': 'G', 'dir': [0, 1], 'anchor': {'type': 'point', 'ref': 'rect0', 'point': 'center'}},
+            {'name': 'N', 'dir': [0, -1], 'anchor': {'type': 'point', 'ref': 'rect0', 'point': 'center'}},
+        ],
+    }
+    source = tmp_path / "taskset.json"
+    source.write_text(json.dumps({'tasks': [dict(task, id=f"t{k}") for k in range(5)]}), encoding='utf-8')
+    forces = [{'name': 'G', 'anchor': [400, 300], 'arrowBase': [400, 300], 'arrowTip': [400, 400]},
+              {'name': 'N', 'anchor': [400, 300], 'arrowBase': [400, 300], 'arrowTip': [430, 200]}]
+    line = json.dumps({'id': 1, 'task_id': 't3', 'forces': forces}).encode() + b"\n"
+    loaded = []
+    monkeypatch.setattr(problem.regrade, 'load_tasks', lambda ref: loaded.append(load_tasks(ref)) or loaded[-1])
+
+    with pytest.raises(ValueError, match="ukjent_tol"):
+        regrade(io.BytesIO(line), io.StringIO(), str(source), overrides={'ukjent_tol': 1.0})
+    assert loaded == []  # names are checked before any task is loaded
+
+    out = io.StringIO()
+    overrides = {'ang_tol_deg': 1.0, 'ang_span_deg': 5.0}
+    assert regrade(io.BytesIO(line), out, str(source), want="score", overrides=overrides) == 1
+    assert list(loaded[0]._specs) == ['t3']  # only the graded task was built
+    spec = with_tolerances(load_tasks(str(source))['t3'], overrides)
+    assert json.loads(out.getvalue())['score'] == evaluate_task(spec, ForceBatch.from_json(forces))['score']
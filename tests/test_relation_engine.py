@@ -0,0 +1,170 @@
+import math
+import random
+from types import SimpleNamespace
+
+import pytest
+
+import utils.geometry as vec
+import problem.evaluate as evaluate
+from problem import relation_engine
+from problem.benchmark import make_submission, make_task
+from problem.drawn_forces import DrawnForce, ForceBatch
+from problem.evaluate import compile_task, evaluate_many, evaluate_task, relation_score
+from problem.relation_engine import RelationTable
+
+
+def _term_sum(terms, forces):
+    """One side summed term by term, as evaluate_task did before RelationTable."""
+    acc = 0.0
+    for term in terms:
+        v = forces[term.force_name].vec
+        if v is None:
+            continue
+        acc += term.sign * (vec.norm(v) if term.e_unit is None else vec.dot(v, term.e_unit))
+    return acc
+
+
+def _drawing(rng, task, p_no_vec=0.0):
+    forces = {}
+    for spec in task.expected_forces:
+        a = rng.uniform(0, 2 * math.pi)
+        length = rng.uniform(20, 200)
+        v = None if rng.random() < p_no_vec else (length * math.cos(a), length * math.sin(a))
+        forces[spec.name] = DrawnForce(name=spec.name, vec=v, anchor=task.scene.rects[0].center)
+    return forces
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_sides_equal_per_term_sums(seed):
+    rng = random.Random(seed)
+    checked = 0
+    for _ in range(20):
+        plan = compile_task(make_task(rng, rng.randint(2, 8), basis=rng.choice(["xy", "np"]), relations=True))
+        if plan.relation_table is None:
+            continue
+        table = plan.relation_table
+        forces = _drawing(rng, plan.task_spec, p_no_vec=0.2)
+        names = list(forces)
+        batch = ForceBatch.from_drawn(forces[name] for name in names)
+        x = table.extract(batch, {name: j for j, name in enumerate(names)})
+        lhs, rhs = table.sides(x)
+        assert len(lhs) == len(rhs) == len(table) == len(plan.relations)
+        for r, rel in enumerate(plan.relations):
+            assert lhs[r] == _term_sum(rel.lhs, forces)
+            assert rhs[r] == _term_sum(rel.rhs, forces)
+        for err, l, r, rel in zip(table.errors(lhs, rhs), lhs, rhs, plan.relations):
+            if abs(r) < 1e-9:
+                assert err == math.inf
+            else:
+                assert err == abs(l / r - rel.ratio) / max(abs(rel.ratio), 1.0)
+        checked += 1
+    assert checked
+
+
+def test_unmatched_force_gives_nan():
+    plan = compile_task(make_task(random.Random(3), 4, relations=True))
+    table = plan.relation_table
+    x = table.extract(ForceBatch.from_drawn([]), {})
+    assert all(v != v for v in x)
+
+
+def test_shared_features_are_extracted_once():
+    rel = lambda lhs, rhs: SimpleNamespace(lhs=lhs, rhs=rhs, ratio=1.0)
+    term = lambda name, e: SimpleNamespace(force_name=name, sign=1.0, e_unit=e)
+    table = RelationTable([
+        rel([term("G", None)], [term("N", None)]),
+        rel([term("G", None)], [term("N", (1.0, 0.0)), term("R", None)]),
+    ])
+    assert table.features == (("G", None), ("N", None), ("N", (1.0, 0.0)), ("R", None))
+    assert table.lhs == (((0, 1.0),), ((0, 1.0),))
+    assert table.rhs == (((1, 1.0),), ((2, 1.0), (3, 1.0)))
+
+
+def test_evaluate_details_match_table(inf_case):
+    task, forces = inf_case
+    details = evaluate_task(task, forces)['details']['relation_0']
+    assert details['lhs'] == 100.0 and details['rhs'] == 0.0
+    assert details['error'] == math.inf and details['score'] == 0.0
+
+
+def _same(a, b):
+    return len(a) == len(b) and all(u == v or (u != u and v != v) for u, v in zip(a, b))
+
+
+@pytest.mark.parametrize("backend", ("numpy", "python"))
+@pytest.mark.parametrize("seed", range(4))
+def test_batch_equals_per_submission(seed, backend, monkeypatch):
+    if backend == "numpy":
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(relation_engine, "_numpy", lambda: None)
+    rng = random.Random(seed)
+    for _ in range(10):
+        plan = compile_task(make_task(rng, rng.randint(2, 8), basis=rng.choice(["xy", "np"]), relations=True))
+        table = plan.relation_table
+        if table is None:
+            continue
+        batches, matchings = [], []
+        for _ in range(12):
+            forces = _drawing(rng, plan.task_spec, p_no_vec=0.2)
+            names = [name for name in forces if rng.random() < 0.8]
+            batches.append(ForceBatch.from_drawn(forces[name] for name in names))
+            matchings.append({name: j for j, name in enumerate(names)})
+        rows = table.evaluate_batch(batches, matchings)
+        assert len(rows) == len(batches)
+        for (x, lhs, rhs, errs), batch, matched in zip(rows, batches, matchings):
+            assert all(type(v) is float for v in x + lhs + rhs + errs)
+            want = table.evaluate(batch, matched)
+            for got, ref in zip((x, lhs, rhs, errs), want):
+                assert _same(got, ref)
+            for r in range(len(table)):
+                table.check(r, x)  # no zero directions in generated tasks
+    assert RelationTable([]).evaluate_batch([], []) == []
+
+
+def test_batch_check_raises_like_per_submission(inf_case):
+    task, forces = inf_case
+    task.relation_requirements.relations[0].rhs[0].e_vec = (0.0, 0.0)
+    plan = compile_task(task)
+    batch = ForceBatch.from_drawn(forces)
+    matched = {f.name: j for j, f in enumerate(forces)}
+    (x, _, _, _), = plan.relation_table.evaluate_batch([batch], [matched])
+    with pytest.raises(ValueError):
+        plan.relation_table.check(0, x)
+    with pytest.raises(ValueError):
+        list(evaluate_many(plan, [forces]))
+
+
+@pytest.mark.parametrize("want", evaluate.WANT_LEVELS)
+def test_evaluate_many_batches_relations(want, monkeypatch):
+    monkeypatch.setattr(evaluate, "EVAL_CHUNK", 4)
+    rng = random.Random(7)
+    plan = compile_task(make_task(rng, 5, relations=True))
+    subs = [make_submission(rng, plan.task_spec, n_extra=rng.randint(0, 2), p_missing=0.2) for _ in range(10)]
+    subs[3] = []  # empty drawing inside a chunk
+    calls = []
+    real = RelationTable.evaluate_batch
+    monkeypatch.setattr(RelationTable, "evaluate_batch", lambda self, b, m: calls.append(len(b)) or real(self, b, m))
+    got = list(evaluate_many(plan, subs, want=want))
+    assert calls == [3, 4, 2]
+    assert [dict(r) for r in got] == [dict(evaluate_task(plan, s, want=want)) for s in subs]
+
+
+def test_relation_score_components():
+    forces = {
+        "G": SimpleNamespace(vec=(30.0, -40.0)),
+        "N": SimpleNamespace(vec=(0.0, 25.0)),
+    }
+    ratio = {"type": "ratio", "num": "G", "den": "N", "target": 2.0}
+    assert relation_score(forces, relation=ratio, n_vec=None, tol=0.1, span=0.4) == (1.0, 0.0)
+    score, err = relation_score(forces, relation=dict(ratio, component="y"), n_vec=None, tol=0.1, span=0.4)
+    assert err == pytest.approx(3.6)
+    # np basis with n = +y: the normal component equals y
+    assert relation_score(forces, relation=dict(ratio, component="n"), n_vec=(0.0, 2.0), tol=0.1, span=0.4) == (score, err)
+    summed = {"type": "ratio_sum", "num_terms": [("G", 1.0), ("R", 1.0)], "den_terms": [("N", 2.0)], "target": 1.0}
+    assert relation_score(forces, relation=summed, n_vec=None, tol=0.1, span=0.4) == (1.0, 0.0)  # missing R adds nothing
+    assert relation_score(forces, relation=dict(ratio, den="R"), n_vec=None, tol=0.1, span=0.4) == (0.0, math.inf)
+    with pytest.raises(ValueError):
+        relation_score(forces, relation=dict(ratio, component="n"), n_vec=None, tol=0.1, span=0.4)
+    with pytest.raises(ValueError):
+        relation_score(forces, relation=dict(ratio, component="z"), n_vec=None, tol=0.1, span=0.4)
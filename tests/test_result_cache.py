@@ -0,0 +1,102 @@
+import copy
+import json
+import os
+import pickle
+import random
+
+import pytest
+
+from problem.benchmark import make_submission, make_task
+from problem import result_cache
+from problem.evaluate import compile_task, evaluate_task
+from problem.result_cache import ResultCache
+
+
+def _case(seed=0):
+    rng = random.Random(seed)
+    task = make_task(rng, 4)
+    return task, make_submission(rng, task, n_extra=2, p_missing=0.0, p_fixed=0.0)
+
+
+def test_changing_a_returned_result_does_not_change_the_cache():
+    task, forces = _case()
+    cache = ResultCache()
+    first = cache.evaluate(task, forces, want="full")
+    expected = copy.deepcopy(dict(first))
+    first['score'] = -1.0
+    del first['feedback']
+    with pytest.raises(TypeError):
+        first['details'][task.expected_forces[0].name]['changed'] = True
+    with pytest.raises(TypeError):
+        cache.evaluate(task, forces, want="full")['overlays'].clear()
+    second = cache.evaluate(task, forces, want="full")
+    assert cache.hits == 2
+    assert dict(second) == expected
+    assert second == evaluate_task(task, forces, want="full")
+
+
+def test_hits_share_nested_values():
+    task, forces = _case()
+    cache = ResultCache()
+    first = cache.evaluate(task, forces, want="full")
+    second = cache.evaluate(task, forces, want="full")
+    assert first is not second
+    assert first['details'] is second['details']  # no per-hit copy of the nested values
+    plain = copy.deepcopy(second)
+    plain['details']['extra'] = {}
+    plain['feedback'].append("X")
+    assert type(pickle.loads(pickle.dumps(dict(second)))['details']) is dict
+    assert json.dumps(second) == json.dumps(evaluate_task(task, forces, want="full"))
+
+
+def test_spec_edited_in_place_is_graded_again():
+    task, forces = _case(4)
+    cache = ResultCache()
+    cache.evaluate(task, forces, want="score")
+    cache.evaluate(task, forces, want="score")
+    assert cache.hits == 1
+    task.tol.ang_tol_deg = 1.0
+    task.tol.ang_span_deg = 2.0
+    result = cache.evaluate(task, forces, want="score")
+    assert cache.misses == 2
+    assert result['score'] == evaluate_task(task, forces, want="score")['score']
+
+
+def test_compiled_task_is_cached_by_identity():
+    task, forces = _case(5)
+    plan = compile_task(task)
+    cache = ResultCache()
+    assert cache.evaluate(plan, forces) == cache.evaluate(task, forces)
+    assert cache.hits == 1  # same content: same fingerprint, same entry
+
+
+def test_disk_tier_round_trip(tmp_path):
+    task, forces = _case(1)
+    first = ResultCache(disk_dir=str(tmp_path)).evaluate(task, forces, want="score+feedback")
+    cache = ResultCache(disk_dir=str(tmp_path))
+    again = cache.evaluate(task, forces, want="score+feedback")
+    assert cache.disk_hits == 1
+    assert dict(again) == dict(first)
+
+
+def test_disk_tier_keyed_on_grader_source(tmp_path, monkeypatch):
+    task, forces = _case(2)
+    ResultCache(disk_dir=str(tmp_path)).evaluate(task, forces)
+    monkeypatch.setattr(result_cache, 'code_fingerprint', lambda: "changed grader")
+    cache = ResultCache(disk_dir=str(tmp_path))
+    cache.evaluate(task, forces)
+    assert cache.disk_hits == 0
+    assert cache.misses == 1
+
+
+def test_unreadable_disk_entry_is_a_miss(tmp_path):
+    task, forces = _case(3)
+    cache = ResultCache(disk_dir=str(tmp_path))
+    path = cache._disk_path(cache.key(task, forces))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Unpickling fails with AttributeError, as a pickle of a class that no longer exists would
+    with open(path, 'wb') as fh:
+        fh.write(b"cbuiltins\nno_such_attribute\n.")
+    result = cache.evaluate(task, forces)
+    assert cache.misses == 1
+    assert 'score' in result
@@ -0,0 +1,100 @@
+import os
+import random
+
+import pytest
+
+from problem.benchmark import make_submission, make_task
+from problem.drawn_forces import ForceBatch
+from problem.submission_archive import SubmissionArchive
+
+TASK_IDS = ("Intro 1", "skråplan", 3, None)
+STUDENTS = ("ola", "kari", "åse", None)
+
+
+def _fill(archive, n, seed=19, start=0):
+    """Append n random submissions; returns [(task_id, student, timestamp, record_id, batch)]."""
+    rng = random.Random(seed)
+    task = make_task(rng, 4)
+    out = []
+    for i in range(start, start + n):
+        batch = ForceBatch.from_drawn(make_submission(rng, task, n_extra=rng.randint(0, 2)))
+        row = (rng.choice(TASK_IDS), rng.choice(STUDENTS), 1000.0 + i if rng.random() < 0.9 else None,
+               rng.choice([i, f"s{i}", None]), batch)
+        assert archive.append(row[0], batch, student=row[1], timestamp=row[2], record_id=row[3]) == i
+        out.append(row)
+    return out
+
+
+def _check(archive, rows):
+    assert len(archive) == len(rows)
+    for i, (task_id, student, ts, record_id, batch) in enumerate(rows):
+        meta = archive.meta(i)
+        assert (meta.task_id, meta.student, meta.timestamp, meta.record_id) == (task_id, student, ts, record_id)
+        got_id, got_task, got = archive.get(i)
+        assert (got_id, got_task) == (record_id, task_id)
+        assert [f.as_tuple() for f in got] == [f.as_tuple() for f in batch]
+
+
+def test_append_and_reopen(tmp_path):
+    path = str(tmp_path / "arkiv")
+    with SubmissionArchive(path) as archive:
+        rows = _fill(archive, 40)
+        _check(archive, rows)
+    with SubmissionArchive(path, readonly=True) as archive:
+        _check(archive, rows)
+        with pytest.raises(ValueError):
+            archive.append("Intro 1", [])
+    with SubmissionArchive(path) as archive:
+        rows += _fill(archive, 10, seed=20, start=40)
+        _check(archive, rows)
+
+
+def test_select_matches_brute_force(tmp_path):
+    with SubmissionArchive(str(tmp_path / "arkiv")) as archive:
+        rows = _fill(archive, 60)
+        for task_id in TASK_IDS + ("ukjent",):
+            for student in STUDENTS + ("ukjent",):
+                for since, until in ((None, None), (1010.0, None), (None, 1030.0), (1005.0, 1050.0)):
+                    want = [i for i, (t, s, ts, _, _) in enumerate(rows)
+                            if t == task_id and s == student
+                            and (since is None and until is None
+                                 or ts is not None and (since or -1e300) <= ts < (until or 1e300))]
+                    assert archive.select(task_id=task_id, student=student, since=since, until=until) == want
+        assert archive.select(since=1010.0, until=1020.0) == [i for i, r in enumerate(rows)
+                                                              if r[2] is not None and 1010.0 <= r[2] < 1020.0]
+        assert archive.count("Intro 1") == sum(1 for r in rows if r[0] == "Intro 1")
+        selection = archive.select(task_id="skråplan")
+        assert [rid for rid, _, _ in archive.records(selection)] == [rows[i][3] for i in selection]
+
+
+def test_reopen_after_torn_write(tmp_path):
+    path = str(tmp_path / "arkiv")
+    with SubmissionArchive(path) as archive:
+        rows = _fill(archive, 12)
+    # A crash mid-append: a partial string and a partial index entry at the end
+    with open(os.path.join(path, "strings.bin"), "ab") as fh:
+        fh.write(b"\x20\x00\x00\x00ny-el")
+    with open(os.path.join(path, "index.bin"), "ab") as fh:
+        fh.write(b"\x00" * 17)
+    with SubmissionArchive(path, readonly=True) as reader:
+        _check(reader, rows)  # readers skip the torn tail without touching the files
+    with SubmissionArchive(path) as archive:
+        _check(archive, rows)
+        assert os.path.getsize(os.path.join(path, "index.bin")) % 32 == 0
+        rows += _fill(archive, 5, seed=21, start=12)
+    with SubmissionArchive(path, readonly=True) as reader:
+        _check(reader, rows)
+
+
+def test_reader_refresh_sees_new_records(tmp_path):
+    path = str(tmp_path / "arkiv")
+    with SubmissionArchive(path) as archive:
+        rows = _fill(archive, 5)
+        archive.flush()  # index entries reach other processes on flush
+        reader = SubmissionArchive(path, readonly=True)
+        assert len(reader) == 5
+        rows += _fill(archive, 3, seed=22, start=5)
+        archive.flush()
+        assert reader.refresh() == 3
+        _check(reader, rows)
+        reader.close()
@@ -0,0 +1,97 @@
+import io
+import json
+import random
+
+import pytest
+
+from problem.benchmark import make_submission, make_task
+from problem.drawn_forces import DrawnForce, ForceBatch
+from problem.evaluate import evaluate_task
+from problem.submission_format import (
+    SubmissionReader,
+    SubmissionWriter,
+    convert_jsonl,
+    is_binary,
+    to_jsonl,
+)
+
+
+def _records(seed=18, n=30):
+    rng = random.Random(seed)
+    tasks = {"t1": make_task(rng, 3), "skråplan": make_task(rng, 5), 7: make_task(rng, 2)}
+    records = []
+    for i in range(n):
+        task_id = rng.choice([None, "t1", "t1", "skråplan", 7])
+        forces = make_submission(rng, tasks[task_id or "t1"], n_extra=rng.randint(0, 2))
+        if forces and rng.random() < 0.3:
+            forces.append(DrawnForce(name="", vec=None, anchor=None, arrowBase=None, editable=False))
+        record_id = rng.choice([i, str(i), None])
+        records.append((record_id, task_id, ForceBatch.from_drawn(forces)))
+    return tasks, records
+
+
+def _write(records, float32=False) -> bytes:
+    fh = io.BytesIO()
+    with SubmissionWriter(fh, float32=float32) as writer:
+        for record in records:
+            writer.write(*record)
+    assert writer.records == len(records)
+    return fh.getvalue()
+
+
+def _fields(batch):
+    return [f.as_tuple() for f in batch]
+
+
+def test_round_trip_is_exact():
+    _, records = _records()
+    with SubmissionReader(_write(records)) as reader:
+        got = [(rid, tid, _fields(batch)) for rid, tid, batch in reader]
+    assert got == [(rid, tid, _fields(batch)) for rid, tid, batch in records]
+
+
+def test_float32_round_trip_is_close():
+    _, records = _records()
+    with SubmissionReader(_write(records, float32=True)) as reader:
+        assert reader.float32
+        for (rid, tid, batch), (rid0, tid0, batch0) in zip(reader, records):
+            assert (rid, tid, batch.names) == (rid0, tid0, batch0.names)
+            assert bytes(batch.editable) == bytes(batch0.editable)
+            for col, col0 in ((batch.vec, batch0.vec), (batch.anchor, batch0.anchor), (batch.base, batch0.base)):
+                for x, x0 in zip(col, col0):
+                    assert (x != x and x0 != x0) or x == pytest.approx(x0, rel=1e-6)
+
+
+def test_mapped_file_grades_like_the_original(tmp_path):
+    tasks, records = _records()
+    path = tmp_path / "subs.kpsb"
+    path.write_bytes(_write(records))
+    assert is_binary(str(path))
+    with SubmissionReader(str(path)) as reader:
+        for (_, tid, batch), (_, _, batch0) in zip(reader, records):
+            task = tasks[tid or "t1"]
+            assert evaluate_task(task, batch) == evaluate_task(task, batch0)
+
+
+def test_jsonl_conversion_round_trip(tmp_path):
+    _, records = _records()
+    kpsb, jsonl, back = tmp_path / "a.kpsb", tmp_path / "a.jsonl", tmp_path / "b.kpsb"
+    kpsb.write_bytes(_write(records))
+    assert to_jsonl(str(kpsb), str(jsonl)) == len(records)
+    assert not is_binary(str(jsonl))
+    assert convert_jsonl(str(jsonl), str(back)) == len(records)
+    assert back.read_bytes() == kpsb.read_bytes()
+    first = json.loads(jsonl.read_text(encoding="utf-8").splitlines()[0])
+    assert set(first) == {"id", "task_id", "forces"}
+
+
+def test_unfinished_file_is_rejected():
+    _, records = _records(n=3)
+    fh = io.BytesIO()
+    writer = SubmissionWriter(fh)
+    for record in records:
+        writer.write(*record)
+    with pytest.raises(ValueError):
+        SubmissionReader(fh.getvalue())  # close() was never called: no string table
+    with pytest.raises(ValueError):
+        SubmissionReader(b"KPSX" + bytes(12))
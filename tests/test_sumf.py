@@ -0,0 +1,52 @@
+import math
+import random
+
+import pytest
+
+import utils.geometry as vec
+from problem.drawn_forces import DrawnForce, ForceBatch
+from problem.evaluate import sumF, sumf_reduce
+
+
+def _two_pass(forces, basis, n_vec, angle_deg):
+    """ΣF and the largest force as evaluate_task computed them before sumf_reduce."""
+    drawn = [f for f in forces if f.vec is not None]
+    total_vec, c1, c2 = sumF(drawn, basis, n_vec=n_vec, angle_deg=angle_deg)
+    res = math.hypot(c1, c2)
+    max_force = max((vec.norm(f.vec) for f in drawn), default=0.0)
+    if max_force > 1e-9:
+        rel_err = res / max_force
+    else:
+        rel_err = float('inf') if res > 1e-9 else 0.0
+    return total_vec, c1, c2, res, max_force, rel_err
+
+
+@pytest.mark.parametrize("seed", range(6))
+def test_fused_reduction_equals_two_passes(seed):
+    rng = random.Random(seed)
+    for _ in range(200):
+        forces = [
+            DrawnForce(name="F", vec=None if rng.random() < 0.2 else (rng.uniform(-200, 200), rng.uniform(-200, 200)))
+            for _ in range(rng.randint(0, 8))
+        ]
+        rows = [j for j in range(len(forces)) if rng.random() < 0.8]
+        basis = rng.choice(["xy", "np"])
+        n_vec = (rng.uniform(-1, 1), rng.uniform(0.1, 1)) if basis == "np" else None
+        angle = rng.choice([0.0, 30.0, -45.0]) if basis == "xy" else 0.0
+        batch = ForceBatch.from_drawn(forces)
+        got = sumf_reduce(batch.vec, rows, basis, n_vec, angle)
+        assert got == _two_pass([forces[j] for j in rows], basis, n_vec, angle)
+
+
+def test_zero_forces():
+    assert sumf_reduce(ForceBatch.from_drawn([]).vec, [])[3:] == (0.0, 0.0, 0.0)
+    zero = [DrawnForce(name="G", vec=(0.0, 0.0))]
+    assert sumf_reduce(ForceBatch.from_drawn(zero).vec, [0]) == _two_pass(zero, "xy", None, 0.0)
+
+
+def test_bad_basis():
+    batch = ForceBatch.from_drawn([DrawnForce(name="G", vec=(1.0, 0.0))])
+    with pytest.raises(ValueError):
+        sumf_reduce(batch.vec, [0], "np", None)
+    with pytest.raises(ValueError):
+        sumf_reduce(batch.vec, [0], "ab")
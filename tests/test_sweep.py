@@ -0,0 +1,54 @@
+import random
+
+import pytest
+
+from problem.benchmark import make_submission, make_task
+from problem.evaluate import evaluate_task
+from problem import sweep as sweep_module
+from problem.regrade import with_tolerances
+from problem.relation_engine import RelationTable
+from problem.sweep import histogram, sweep, sweep_scores, tolerance_grid
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_scores_equal_evaluate_task_per_setting(seed):
+    rng = random.Random(seed)
+    task = make_task(rng, rng.randint(2, 6), basis=rng.choice(["xy", "np"]), relations=seed % 2 == 1)
+    subs = [make_submission(rng, task, n_extra=rng.randint(0, 3)) for _ in range(15)]
+    grid = tolerance_grid(ang_tol_deg=[3.0, 10.0, 25.0], ang_span_deg=[0.0, 20.0], pos_tol=[5.0, 30.0],
+                          rel_tol=[0.05])
+    for overrides, scores in zip(grid, sweep_scores(task, subs, grid)):
+        spec = with_tolerances(task, overrides)
+        assert scores == [evaluate_task(spec, s, want="score")['score'] for s in subs], overrides
+
+
+def test_relations_are_measured_per_chunk(monkeypatch):
+    monkeypatch.setattr(sweep_module, "SWEEP_CHUNK", 4)
+    calls = []
+    real = RelationTable.evaluate_batch
+    monkeypatch.setattr(RelationTable, "evaluate_batch", lambda self, b, m: calls.append(len(b)) or real(self, b, m))
+    rng = random.Random(8)
+    task = make_task(rng, 4, relations=True)
+    subs = [make_submission(rng, task, n_extra=1) for _ in range(10)]
+    grid = tolerance_grid(ang_tol_deg=[3.0, 25.0], rel_tol=[0.01, 0.2])
+    for overrides, scores in zip(grid, sweep_scores(task, subs, grid)):
+        assert scores == [evaluate_task(with_tolerances(task, overrides), s, want="score")['score'] for s in subs]
+    assert len(calls) == 3 and 10 <= sum(calls) <= 20  # one batch per chunk, one row per distinct matching
+
+
+def test_histogram_bins():
+    assert histogram([0.0, 0.05, 0.1, 0.55, 0.999, 1.0], bins=10) == [2, 1, 0, 0, 0, 1, 0, 0, 0, 2]
+    assert histogram([], bins=4) == [0, 0, 0, 0]
+
+
+def test_sweep_rows():
+    rng = random.Random(14)
+    task = make_task(rng, 3)
+    subs = [make_submission(rng, task) for _ in range(10)]
+    rows = sweep(task, subs, tolerance_grid(pos_tol=[5.0, 50.0]), bins=5)
+    assert [row['tolerances']['pos_tol'] for row in rows] == [5.0, 50.0]
+    for row in rows:
+        assert row['n'] == 10 and sum(row['histogram']) == 10
+        assert row['bin_edges'] == [0.0, 0.2, 0.4, 0.6, 0.8, 1.0]
+    with pytest.raises(ValueError):
+        tolerance_grid(ukjent=[1.0])
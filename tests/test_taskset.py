@@ -0,0 +1,106 @@
+import copy
+import json
+import os
+
+import pytest
+
+import problem.taskset
+from problem.drawn_forces import ForceBatch
+from problem.evaluate import _evaluate_compiled
+from problem.spec import Tolerances
+from problem.taskset import TaskSet
+
+TASK = {
+    'id': 'kloss',
+    'origin': [400, 300],
+    'scene': {'rects': [{'bottomCenter': [400, 340], 'width': 160, 'height': 80}]},
+    'expectedForces': [
+        {'name': 'G', 'dir': [0, 1], 'anchor': {'type': 'point', 'ref': 'rect0', 'point': 'center'}},
+        {'name': 'N', 'dir': [0, -1], 'anchor': {'type': 'point', 'ref': 'rect0', 'point': 'center'}},
+    ],
+}
+FORCES = ForceBatch.from_json([
+    {'name': 'G', 'anchor': [400, 300], 'arrowBase': [400, 300], 'arrowTip': [400, 400]},
+    {'name': 'N', 'anchor': [400, 300], 'arrowBase': [400, 300], 'arrowTip': [420, 200]},
+])
+
+
+def _tasks(kloss_dir=(0, 1)):
+    kloss = copy.deepcopy(TASK)
+    kloss['expectedForces'][0]['dir'] = list(kloss_dir)
+    other = copy.deepcopy(TASK)
+    other['id'] = 'annen'
+    return {'tasks': [kloss, other], 'metadata': {}}
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / "taskset.json"
+    path.write_text(json.dumps(_tasks()), encoding='utf-8')
+    return path
+
+
+def _score(tasks, task_id):
+    return _evaluate_compiled(tasks.plan(task_id), FORCES, "full")
+
+
+def test_second_load_uses_cached_plans(source):
+    first = TaskSet(str(source))
+    ref = _score(first, 'kloss')
+    assert first.stats['compiled'] == 1 and first.stats['plan_hits'] == 0
+
+    second = TaskSet(str(source))
+    assert sorted(second) == ['annen', 'kloss']
+    assert _score(second, 'kloss') == ref
+    assert second.stats == {'sources_parsed': 0, 'tasks_parsed': 0, 'compiled': 0, 'plan_hits': 1}
+    assert second.plan('kloss') is second.plan('kloss')
+
+
+def test_edited_task_is_compiled_again(source):
+    first = TaskSet(str(source))
+    first.warm()
+    before = _score(first, 'kloss')
+    source.write_text(json.dumps(_tasks(kloss_dir=(1, 0))), encoding='utf-8')
+
+    edited = TaskSet(str(source))
+    assert edited.stats['sources_parsed'] == 1
+    assert _score(edited, 'kloss') != before
+    edited.plan('annen')
+    assert edited.stats['compiled'] == 1 and edited.stats['plan_hits'] == 1  # 'annen' is unchanged
+
+
+def test_tolerances_and_grader_code_are_part_of_the_key(source, monkeypatch):
+    TaskSet(str(source)).warm()
+    loose = TaskSet(str(source), tol=Tolerances(ang_tol_deg=40.0))
+    loose.plan('kloss')
+    assert loose.stats['compiled'] == 1
+
+    monkeypatch.setattr(problem.taskset, 'code_fingerprint', lambda: 'endret-kode')
+    changed = TaskSet(str(source))
+    changed.plan('kloss')
+    assert changed.stats['compiled'] == 1
+
+
+def test_unreadable_plan_is_a_miss(source):
+    TaskSet(str(source)).warm()
+    plans = os.path.join(os.path.dirname(source), problem.taskset.DEFAULT_CACHE_NAME, 'plans')
+    for name in os.listdir(plans):
+        with open(os.path.join(plans, name), 'wb') as fh:
+            fh.write(b'ikke pickle')
+    tasks = TaskSet(str(source))
+    assert _score(tasks, 'kloss')['score'] == _score(TaskSet(str(source), cache_dir=False), 'kloss')['score']
+    assert tasks.stats['compiled'] == 1 and tasks.stats['plan_hits'] == 0
+
+
+def test_js_source_counts_skipped_blocks(tmp_path):
+    path = tmp_path / "tasks.js"
+    path.write_text(
+        "const TASKS = [];\n"
+        f"TASKS.push({json.dumps(TASK)});\n"
+        "TASKS.push({ id: 'js', dir: DOWN });\n",
+        encoding='utf-8',
+    )
+    tasks = TaskSet(str(path), cache_dir=False)
+    assert list(tasks) == ['kloss'] and tasks.skipped == 1
+    with pytest.raises(KeyError):
+        tasks.plan('js')
@@ -0,0 +1,53 @@
+import random
+
+import pytest
+
+from problem.benchmark import make_submission, make_task
+from problem.evaluate import compile_task, evaluate_task
+
+SCORES = ('score', 'coverage', 'equilibrium_score', 'relations_score')
+
+
+def _cases(seed):
+    rng = random.Random(seed)
+    for k in range(15):
+        plan = compile_task(make_task(rng, rng.randint(1, 6), basis=rng.choice(["xy", "np"]), relations=k % 3 == 0))
+        yield plan, make_submission(rng, plan.task_spec, n_extra=rng.randint(0, 3), p_missing=0.2)
+    yield plan, []
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_score(seed):
+    for plan, forces in _cases(seed):
+        full = evaluate_task(plan, forces, want="full")
+        result = evaluate_task(plan, forces, want="score")
+        assert set(result) == set(SCORES) or (not forces and set(result) == {'score'})
+        assert {k: result[k] for k in result} == {k: full[k] for k in result}
+        assert result.overlay_log is None and result.overlays == {}  # nothing recorded to build
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_score_feedback(seed):
+    for plan, forces in _cases(seed):
+        full = evaluate_task(plan, forces, want="full")
+        result = evaluate_task(plan, forces, want="score+feedback")
+        assert 'details' not in result and 'overlays' not in result
+        assert {k: result[k] for k in result} == {k: full[k] for k in result}
+        assert result['feedback'] == full['feedback']
+        assert result.overlays == full['overlays']  # built on first access
+        assert result['overlays'] == full['overlays'] and result.overlay_log is None
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_full(seed):
+    for plan, forces in _cases(seed):
+        result = evaluate_task(plan, forces, want="full")
+        assert {'score', 'feedback', 'details', 'overlays'} <= set(result)
+        assert result.overlay_log is None
+        assert result == evaluate_task(plan.task_spec, forces)  # "full" is the default
+
+
+def test_unknown_level():
+    plan, forces = next(_cases(0))
+    with pytest.raises(ValueError):
+        evaluate_task(plan, forces, want="details")
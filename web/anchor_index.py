@@ -0,0 +1,147 @@
+# ./problem/anchor_index.py
+"""
+Romlig indeks over ankerkandidater (punkt og segment) for én forventet kraft.
+
+AnchorGrid is a uniform grid with cells of GRID_STEP (the snap resolution). A point is
+stored in its cell; a segment in every cell its bounding box covers. Built once per
+compiled force (see evaluate._compile_force) when the force has many allowed anchors.
+
+Queries:
+  - nearest(p): (anchor index, distance) of the nearest anchor, searching squares of
+    doubling size around p until the best candidate lies inside the square
+  - within(p, radius): anchor indices (list order) of every anchor that may lie within
+    radius of p (a superset: callers compute exact distances)
+
+Distances are computed with the same utils.geometry calls as the linear scan, so results
+are identical to it.
+"""
+from __future__ import annotations
+from typing import Dict, List, Optional, Sequence, Tuple
+import math
+
+import utils.geometry as vec
+
+Vec2 = Tuple[float, float]
+
+# Anchors per force below which a linear scan is cheaper than the grid
+MIN_INDEXED_ANCHORS = 8
+# nearest() probes more cells than within() with the scoring radius; it pays off later
+MIN_NEAREST_ANCHORS = 32
+# Segments covering more cells than this are kept in a list that every query scans
+MAX_SEGMENT_CELLS = 256
+
+def anchor_distance(p: Vec2, is_point: bool, geom) -> float:
+    """Distance from p to a point anchor (geom = point) or segment anchor (geom = (a, b))."""
+    if is_point:
+        return vec.distance(p, geom)
+    return vec.dist_point_to_segment(p, geom[0], geom[1])
+
+class AnchorGrid:
+    """
+    Uniform grid over anchors given as (index, is_point, geometry).
+
+    cell: cell size (default GRID_STEP from utils.settings, read when a grid is built)
+    Indices are the caller's (position in CompiledForce.anchors); anchors that are neither a
+    point nor a segment are simply not passed in.
+    """
+
+    __slots__ = ('cell', 'items', 'cells', 'wide', 'bounds')
+
+    def __init__(self, anchors: Sequence[Tuple[int, bool, object]], cell: Optional[float] = None):
+        if cell is None:
+            from utils.settings import GRID_STEP
+            cell = GRID_STEP
+        self.cell = float(cell) if cell and cell > 0 else 1.0
+        self.items: List[Tuple[int, bool, object]] = sorted(anchors, key=lambda a: a[0])
+        self.cells: Dict[Tuple[int, int], List[int]] = {}
+        self.wide: List[int] = []   # item positions of segments too long to bin
+        lo_x = lo_y = math.inf
+        hi_x = hi_y = -math.inf
+        for pos, (_, is_point, geom) in enumerate(self.items):
+            if is_point:
+                x0 = x1 = geom[0]
+                y0 = y1 = geom[1]
+            else:
+                (ax, ay), (bx, by) = geom
+                x0, x1 = min(ax, bx), max(ax, bx)
+                y0, y1 = min(ay, by), max(ay, by)
+            cx0, cy0 = self._cell_of(x0, y0)
+            cx1, cy1 = self._cell_of(x1, y1)
+            if (cx1 - cx0 + 1) * (cy1 - cy0 + 1) > MAX_SEGMENT_CELLS:
+                self.wide.append(pos)
+            else:
+                for cx in range(cx0, cx1 + 1):
+                    for cy in range(cy0, cy1 + 1):
+                        self.cells.setdefault((cx, cy), []).append(pos)
+            lo_x, lo_y = min(lo_x, cx0), min(lo_y, cy0)
+            hi_x, hi_y = max(hi_x, cx1), max(hi_y, cy1)
+        self.bounds = (lo_x, lo_y, hi_x, hi_y) if self.items else None
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def _cell_of(self, x: float, y: float) -> Tuple[int, int]:
+        return math.floor(x / self.cell), math.floor(y / self.cell)
+
+    @property
+    def first(self) -> Optional[int]:
+        """Index of the first anchor in list order (None when empty)."""
+        return self.items[0][0] if self.items else None
+
+    def usable(self, p: Vec2) -> bool:
+        """False for points the grid cannot place (inf/NaN coordinates): scan linearly instead."""
+        return self.bounds is not None and math.isfinite(p[0]) and math.isfinite(p[1])
+
+    def _positions_within(self, p: Vec2, radius: float) -> Tuple[set, bool]:
+        """(item positions in the cells touching the square of half-side radius around p, square covers the grid)."""
+        lo_x, lo_y, hi_x, hi_y = self.bounds
+        qx0, qy0 = self._cell_of(p[0] - radius, p[1] - radius)
+        qx1, qy1 = self._cell_of(p[0] + radius, p[1] + radius)
+        covers = qx0 <= lo_x and qy0 <= lo_y and qx1 >= hi_x and qy1 >= hi_y
+        cx0, cy0 = max(qx0, lo_x), max(qy0, lo_y)
+        cx1, cy1 = min(qx1, hi_x), min(qy1, hi_y)
+        found = set(self.wide)
+        if cx0 > cx1 or cy0 > cy1:
+            pass  # square lies outside the grid
+        elif (cx1 - cx0 + 1) * (cy1 - cy0 + 1) >= len(self.cells):
+            for (cx, cy), positions in self.cells.items():
+                if cx0 <= cx <= cx1 and cy0 <= cy <= cy1:
+                    found.update(positions)
+        else:
+            for cx in range(cx0, cx1 + 1):
+                for cy in range(cy0, cy1 + 1):
+                    positions = self.cells.get((cx, cy))
+                    if positions:
+                        found.update(positions)
+        return found, covers
+
+    def within(self, p: Vec2, radius: float) -> List[int]:
+        """Indices (ascending) of anchors whose cells touch the square of half-side radius around p."""
+        if self.bounds is None:
+            return []
+        found, _ = self._positions_within(p, radius)
+        return [self.items[pos][0] for pos in sorted(found)]
+
+    def nearest(self, p: Vec2) -> Tuple[Optional[int], Optional[float]]:
+        """
+        (index, distance) of the nearest anchor; ties go to the lowest index. (None, None) when empty.
+        Searches squares of doubling radius: once the best candidate lies within the radius,
+        every anchor that could be closer (or as close) was a candidate.
+        """
+        if self.bounds is None:
+            return None, None
+        dist: Dict[int, float] = {}
+        radius = self.cell
+        while True:
+            found, covers = self._positions_within(p, radius)
+            for pos in found:
+                if pos not in dist:
+                    _, is_point, geom = self.items[pos]
+                    dist[pos] = anchor_distance(p, is_point, geom)
+            if dist:
+                best_pos = min(dist, key=lambda pos: (dist[pos], pos))
+                if dist[best_pos] <= radius or covers:
+                    return self.items[best_pos][0], dist[best_pos]
+            elif covers:
+                return None, None
+            radius *= 2.0
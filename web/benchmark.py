@@ -0,0 +1,391 @@
+# ./problem/benchmark.py
+"""
+Benchmark av retteren (evaluate_task / match_forces_to_expected) på syntetiske oppgaver.
+
+The generator is seeded, so the same seed always gives the same tasks and submissions.
+Tasks cover point and segment anchors (direct and rect-referenced), xy and np bases,
+magnitude relations and pre-drawn (non-editable) forces. The number of expected and
+drawn forces is scaled per case.
+
+Per case the suite reports latency percentiles (µs per call), throughput (calls/s) and
+allocations per call (tracemalloc peak bytes and net blocks). Results can be saved as a
+baseline JSON file and later compared against it to flag regressions.
+
+Usage:
+    python -m problem.benchmark --seed 1 --save bench_baseline.json
+    python -m problem.benchmark --seed 1 --compare bench_baseline.json --threshold 0.25
+"""
+from __future__ import annotations
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+import argparse
+import gc
+import json
+import math
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+from problem.spec import TaskSpec, AnchorType, Tolerances
+from problem.drawn_forces import DrawnForce, ForceBatch
+from problem.evaluate import compile_task, evaluate_task, match_forces_to_expected, _evaluate_compiled
+
+Vec2 = Tuple[float, float]
+
+FORCE_NAMES = ["G", "N", "R", "S", "F_a", "T", "L", "F_b", "F_c", "F_d", "F_e", "F_f"]
+DEFAULT_SIZES = ((2, 0), (4, 2), (8, 4), (12, 8))  # (expected forces, extra drawn forces)
+DEFAULT_SUBMISSIONS = 200
+DEFAULT_REPEATS = 3
+DEFAULT_THRESHOLD = 0.2   # Flag as regression when a metric is >20% worse than the baseline
+PERCENTILES = (50, 90, 99)
+
+# ------------------------------------------------------
+# Synthetic tasks and submissions
+# ------------------------------------------------------
+
+def _direction(angle_deg: float) -> Vec2:
+    a = math.radians(angle_deg)
+    return (math.cos(a), math.sin(a))
+
+def make_task(
+    rng: random.Random,
+    n_expected: int,
+    *,
+    basis: str = "xy",
+    relations: bool = False,
+    segment_ratio: float = 0.4,
+) -> TaskSpec:
+    """
+    Random task with n_expected forces around one rect (screen coordinates, y down).
+    Anchors are points or segments, given directly or as references to rect:0.
+    """
+    names = FORCE_NAMES[:n_expected] if n_expected <= len(FORCE_NAMES) else \
+        FORCE_NAMES + [f"F_{i}" for i in range(len(FORCE_NAMES), n_expected)]
+    cx, cy = rng.uniform(300, 700), rng.uniform(200, 400)
+    w, h = 160.0, 120.0
+    rect = SimpleNamespace(
+        center=(cx, cy),
+        bottom=((cx - w/2, cy + h/2), (cx + w/2, cy + h/2)),
+        top=((cx - w/2, cy - h/2), (cx + w/2, cy - h/2)),
+    )
+    # np basis needs a plane; xy tasks get one half of the time
+    plane = SimpleNamespace(n_vec=(0.0, -1.0)) if basis == "np" or rng.random() < 0.5 else None
+    scene = SimpleNamespace(plane=plane, rects=[rect], origin=(cx, cy))
+
+    forces = []
+    for name in names:
+        anchors = []
+        for _ in range(rng.randint(1, 2)):
+            r = rng.random()
+            if r < segment_ratio / 2:
+                anchors.append(SimpleNamespace(kind=AnchorType.SEGMENT, point=None, segment=rect.bottom,
+                                               ref=None, point_name=None, segment_name=None))
+            elif r < segment_ratio:
+                anchors.append(SimpleNamespace(kind="segment", point=None, segment=None,
+                                               ref="rect:0", point_name=None, segment_name="top"))
+            elif r < 0.5 + segment_ratio / 2:
+                anchors.append(SimpleNamespace(kind=AnchorType.POINT, point=(cx, cy), segment=None,
+                                               ref=None, point_name=None, segment_name=None))
+            else:
+                anchors.append(SimpleNamespace(kind="point", point=None, segment=None,
+                                               ref="rect:0", point_name="center", segment_name=None))
+        forces.append(SimpleNamespace(
+            name=name,
+            aliases=[name.lower(), name.replace("_", "")] if rng.random() < 0.5 else [],
+            dir_unit=_direction(rng.choice([0, 90, 180, 270, rng.uniform(0, 360)])),
+            anchor=anchors if len(anchors) > 1 else anchors[0],
+            w_name=1.0,
+            w_dir=1.0,
+            w_pos=1.0,
+        ))
+
+    relation_requirements = None
+    if relations and len(names) >= 2:
+        rels = []
+        for _ in range(max(1, len(names) // 3)):
+            a, b = rng.sample(names, 2)
+            rels.append(SimpleNamespace(
+                lhs=[SimpleNamespace(force_name=a, sign=1.0, e_vec=None)],
+                rhs=[SimpleNamespace(force_name=b, sign=1.0, e_vec=rng.choice([None, (0.0, 1.0)]))],
+                ratio=rng.choice([0.5, 1.0, 2.0]),
+            ))
+        relation_requirements = SimpleNamespace(relations=rels)
+
+    return TaskSpec(
+        expected_forces=forces,
+        scene=scene,
+        basis=basis,
+        tol=Tolerances(),
+        relation_requirements=relation_requirements,
+    )
+
+def make_submission(
+    rng: random.Random,
+    task: TaskSpec,
+    *,
+    n_extra: int = 0,
+    noise_deg: float = 12.0,
+    noise_pos: float = 15.0,
+    p_missing: float = 0.1,
+    p_fixed: float = 0.1,
+) -> List[DrawnForce]:
+    """
+    Noisy drawing of task: each expected force is drawn (prob 1 - p_missing) with angle
+    and anchor noise, a random name variant, and is pre-drawn with prob p_fixed.
+    n_extra unrelated forces are added; the order is shuffled.
+    """
+    out: List[DrawnForce] = []
+    scene = task.scene
+    rect = scene.rects[0]
+    for spec in task.expected_forces:
+        if rng.random() < p_missing:
+            continue
+        d = spec.dir_unit
+        a = math.atan2(d[1], d[0]) + math.radians(rng.gauss(0.0, noise_deg))
+        length = rng.uniform(40, 200)
+        anchor = (rect.center[0] + rng.gauss(0.0, noise_pos), rect.center[1] + rng.gauss(0.0, noise_pos))
+        name = rng.choice([spec.name, spec.name, spec.name.lower(), "", "X"] + list(spec.aliases))
+        out.append(DrawnForce(
+            name=name,
+            vec=(length * math.cos(a), length * math.sin(a)),
+            anchor=anchor,
+            arrowBase=anchor if rng.random() < 0.5 else None,
+            editable=rng.random() >= p_fixed,
+        ))
+    for _ in range(n_extra):
+        a = rng.uniform(0, 2 * math.pi)
+        length = rng.uniform(40, 200)
+        out.append(DrawnForce(
+            name=rng.choice(["", "Q", rng.choice(FORCE_NAMES)]),
+            vec=(length * math.cos(a), length * math.sin(a)),
+            anchor=(rng.uniform(0, 1000), rng.uniform(0, 640)),
+        ))
+    rng.shuffle(out)
+    return out
+
+def generate_cases(
+    seed: int = 0,
+    sizes: Sequence[Tuple[int, int]] = DEFAULT_SIZES,
+    submissions: int = DEFAULT_SUBMISSIONS,
+) -> List[Dict[str, object]]:
+    """
+    One case per (size, basis, relations) combination:
+    {'name', 'task', 'submissions', 'n_expected', 'n_extra', 'basis', 'relations'}.
+    """
+    rng = random.Random(seed)
+    cases = []
+    for n_expected, n_extra in sizes:
+        for basis in ("xy", "np"):
+            for relations in (False, True):
+                task = make_task(rng, n_expected, basis=basis, relations=relations)
+                subs = [make_submission(rng, task, n_extra=n_extra) for _ in range(submissions)]
+                cases.append({
+                    'name': f"e{n_expected}_x{n_extra}_{basis}{'_rel' if relations else ''}",
+                    'task': task,
+                    'submissions': subs,
+                    'n_expected': n_expected,
+                    'n_extra': n_extra,
+                    'basis': basis,
+                    'relations': relations,
+                })
+    return cases
+
+# ------------------------------------------------------
+# Measurement
+# ------------------------------------------------------
+
+def _percentile(sorted_values: Sequence[float], p: float) -> float:
+    """Nearest-rank percentile of an already sorted sequence."""
+    if not sorted_values:
+        return 0.0
+    k = max(0, min(len(sorted_values) - 1, int(math.ceil(p / 100.0 * len(sorted_values))) - 1))
+    return sorted_values[k]
+
+def measure(fn: Callable[[object], object], inputs: Sequence[object], *, repeats: int = DEFAULT_REPEATS) -> Dict[str, float]:
+    """
+    Time fn(x) for every x in inputs, repeats times (after one warm-up pass).
+    Returns latency percentiles in µs, mean, throughput (calls/s) and allocations per call.
+    """
+    for x in inputs:  # warm-up (caches, lazy imports)
+        fn(x)
+
+    latencies: List[float] = []
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        t_start = time.perf_counter()
+        for _ in range(repeats):
+            for x in inputs:
+                t0 = time.perf_counter()
+                fn(x)
+                latencies.append(time.perf_counter() - t0)
+        total = time.perf_counter() - t_start
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    # Allocations: separate pass, tracemalloc slows everything down
+    peaks = 0
+    blocks = 0
+    tracemalloc.start()
+    try:
+        for x in inputs:
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+            b0 = sys.getallocatedblocks()
+            fn(x)
+            _, peak = tracemalloc.get_traced_memory()
+            blocks += sys.getallocatedblocks() - b0
+            peaks += peak - before
+    finally:
+        tracemalloc.stop()
+
+    latencies.sort()
+    n = len(latencies)
+    out = {f'p{p}_us': _percentile(latencies, p) * 1e6 for p in PERCENTILES}
+    out['max_us'] = latencies[-1] * 1e6 if n else 0.0
+    out['mean_us'] = (sum(latencies) / n) * 1e6 if n else 0.0
+    out['throughput'] = n / total if total > 0 else float('inf')
+    out['alloc_peak_bytes'] = peaks / len(inputs) if inputs else 0.0
+    out['alloc_net_blocks'] = blocks / len(inputs) if inputs else 0.0
+    out['calls'] = n
+    return out
+
+def bench_case(case: Dict[str, object], *, repeats: int = DEFAULT_REPEATS) -> Dict[str, Dict[str, float]]:
+    """Benchmark one case with every grading entry point."""
+    task = case['task']
+    subs = case['submissions']
+    plan = compile_task(task)
+    tol = task.tol
+    expected = {spec.name: spec for spec in task.expected_forces}
+    batches = [ForceBatch.from_drawn(s) for s in subs]
+    return {
+        'evaluate_task': measure(lambda s: evaluate_task(task, s), subs, repeats=repeats),
+        'evaluate_compiled': measure(lambda b: _evaluate_compiled(plan, b), batches, repeats=repeats),
+        'evaluate_score_only': measure(lambda b: _evaluate_compiled(plan, b, "score"), batches, repeats=repeats),
+        'match_forces_to_expected': measure(
+            lambda s: match_forces_to_expected(expected, s, tol.ang_tol_deg, tol.ang_span_deg),
+            subs, repeats=repeats,
+        ),
+    }
+
+def run_suite(
+    seed: int = 0,
+    sizes: Sequence[Tuple[int, int]] = DEFAULT_SIZES,
+    *,
+    submissions: int = DEFAULT_SUBMISSIONS,
+    repeats: int = DEFAULT_REPEATS,
+) -> Dict[str, object]:
+    """Run all cases; returns a JSON-serializable report."""
+    results: Dict[str, object] = {}
+    for case in generate_cases(seed, sizes, submissions):
+        results[case['name']] = bench_case(case, repeats=repeats)
+    return {
+        'meta': {
+            'seed': seed,
+            'sizes': [list(s) for s in sizes],
+            'submissions': submissions,
+            'repeats': repeats,
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+        },
+        'results': results,
+    }
+
+# ------------------------------------------------------
+# Baseline
+# ------------------------------------------------------
+
+# Metrics compared against the baseline, and whether higher is better
+COMPARED_METRICS = {
+    'p50_us': False,
+    'p90_us': False,
+    'throughput': True,
+    'alloc_peak_bytes': False,
+}
+
+def save_baseline(report: Dict[str, object], path: str) -> None:
+    with open(path, 'w', encoding='utf-8') as fh:
+        json.dump(report, fh, indent=2, sort_keys=True)
+
+def load_baseline(path: str) -> Dict[str, object]:
+    with open(path, 'r', encoding='utf-8') as fh:
+        return json.load(fh)
+
+def compare_to_baseline(
+    report: Dict[str, object],
+    baseline: Dict[str, object],
+    threshold: float = DEFAULT_THRESHOLD,
+) -> List[Dict[str, object]]:
+    """
+    Regressions of report vs baseline: one entry per (case, entry point, metric) that is
+    worse by more than threshold (relative). Cases missing from either side are skipped.
+    """
+    regressions = []
+    base_results = baseline.get('results', {})
+    for case_name, entries in report.get('results', {}).items():
+        base_entries = base_results.get(case_name)
+        if not base_entries:
+            continue
+        for entry, metrics in entries.items():
+            base_metrics = base_entries.get(entry)
+            if not base_metrics:
+                continue
+            for metric, higher_is_better in COMPARED_METRICS.items():
+                old = base_metrics.get(metric)
+                new = metrics.get(metric)
+                if old is None or new is None or old <= 0:
+                    continue
+                change = (old - new) / old if higher_is_better else (new - old) / old
+                if change > threshold:
+                    regressions.append({
+                        'case': case_name,
+                        'entry': entry,
+                        'metric': metric,
+                        'baseline': old,
+                        'current': new,
+                        'change': change,
+                    })
+    return regressions
+
+def format_report(report: Dict[str, object]) -> str:
+    """Text table: one line per (case, entry point)."""
+    out = [f"{'case':<20} {'entry':<26} {'p50 µs':>9} {'p90 µs':>9} {'p99 µs':>9} {'calls/s':>10} {'peak B':>9}"]
+    for case_name, entries in report.get('results', {}).items():
+        for entry, m in entries.items():
+            out.append(
+                f"{case_name:<20} {entry:<26} {m['p50_us']:>9.1f} {m['p90_us']:>9.1f} {m['p99_us']:>9.1f} "
+                f"{m['throughput']:>10.0f} {m['alloc_peak_bytes']:>9.0f}"
+            )
+    return "\n".join(out)
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark av evaluate_task på syntetiske oppgaver")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--submissions', type=int, default=DEFAULT_SUBMISSIONS, help="submissions per case")
+    parser.add_argument('--repeats', type=int, default=DEFAULT_REPEATS)
+    parser.add_argument('--save', metavar='PATH', help="write the report as baseline JSON")
+    parser.add_argument('--compare', metavar='PATH', help="compare against a baseline JSON")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help="relative regression threshold")
+    args = parser.parse_args(argv)
+
+    report = run_suite(args.seed, submissions=args.submissions, repeats=args.repeats)
+    print(format_report(report))
+    if args.save:
+        save_baseline(report, args.save)
+        print(f"Baseline lagret: {args.save}")
+    if args.compare:
+        regressions = compare_to_baseline(report, load_baseline(args.compare), args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regresjon(er):")
+            for r in regressions:
+                print(f"  {r['case']:<20} {r['entry']:<26} {r['metric']:<16} "
+                      f"{r['baseline']:.1f} -> {r['current']:.1f} ({r['change']:+.0%})")
+            return 1
+        print("\nIngen regresjoner.")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
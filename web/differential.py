@@ -0,0 +1,501 @@
+# ./problem/differential.py
+"""
+Differensialtest: Python-retteren (evaluate.py) mot nettleser-retteren (evaluate.js).
+
+Both graders get the same generated cases: a task in the web client's JSON format and a
+drawing as client force dicts. The JS grader runs unmodified under Node
+(differential_runner.js loads geometry.js, scene_render.js and evaluate.js into a VM context
+that stands in for the window). The Python grader gets the same task through
+problem.task_json, with the JS tolerances (JS_TOLERANCES).
+
+Compared per case (FIELDS): final score, coverage and relations score. Deltas above eps are
+counted per field and the worst cases are kept with their task and drawing, so they can be
+dumped to JSONL and replayed.
+
+The graders are written independently and do not weigh things the same way (the JS grader
+has axis-aligned direction tolerances, a neatness factor and absolute ΣF targets), so the
+report is a map of where they disagree and by how much; the point is to see it change
+when either grader is optimized.
+
+Cases are generated from (seed, chunk) inside the workers, so only summaries cross process
+boundaries; every worker keeps one Node process for its whole life.
+
+--save stores the per-field stats (without the worst cases) as JSON; --compare runs the same
+cases and reports each stat that moved by more than --threshold against that stored report,
+so the effect of a grader change shows up as a delta. Compare runs with the same --cases,
+--seed and --eps.
+
+Usage:
+    python -m problem.differential --cases 100000 --workers 8 --seed 1 --eps 0.01 --dump diff.jsonl
+    python -m problem.differential --cases 100000 --seed 1 --save diff_base.json
+    python -m problem.differential --cases 100000 --seed 1 --compare diff_base.json
+    python -m problem.differential --replay diff.jsonl
+"""
+from __future__ import annotations
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import argparse
+import atexit
+import json
+import math
+import multiprocessing
+import os
+import random
+import shutil
+import subprocess
+import sys
+import time
+
+from problem.spec import Tolerances
+from problem.drawn_forces import ForceBatch
+from problem.evaluate import compile_task, _evaluate_compiled
+from problem.task_json import expected_dir, scene_lookup, task_spec_from_json
+
+Vec2 = Tuple[float, float]
+
+WEB_DIR = os.path.dirname(os.path.abspath(__file__))
+RUNNER = "differential_runner.js"
+
+# evaluate.js constants (DIR_TOL_DEG, DIR_SPAN_DEG, POS_TOL, POS_SPAN, default tol_rel)
+JS_TOLERANCES = dict(ang_tol_deg=2.0, ang_span_deg=24.0, pos_tol=22.0, pos_span=44.0, rel_tol=0.15, rel_span=0.3)
+
+# (field, Python result key, JS summary key)
+FIELDS = (
+    ('score', 'score', 'finalScore'),
+    ('coverage', 'coverage', 'coverage'),
+    ('relations', 'relations_score', 'relationsScore'),
+)
+
+DEFAULT_EPS = 0.01
+DEFAULT_CHUNK = 500
+DEFAULT_KEEP = 20   # worst cases kept per field
+DEFAULT_THRESHOLD = 0.0005  # --compare: absolute change of a stat that is reported
+
+FORCE_NAMES = ["G", "N", "R", "S", "F", "T"]
+POINT_ANCHORS = ("center", "top_center", "bottom_center", "left_middle", "right_middle")
+SEGMENT_ANCHORS = ("bottom", "top", "left", "right")
+
+# ------------------------------------------------------
+# Generated cases (client JSON format)
+# ------------------------------------------------------
+
+def _r(x: float) -> float:
+    return round(x, 2)
+
+def make_task(rng: random.Random) -> Dict:
+    """Random client task: a rect resting on a (possibly tilted) plane, 1-4 expected forces."""
+    angle = rng.choice([0, 0, 20, 30, 45])
+    a = math.radians(angle)
+    n = (-math.sin(a), -math.cos(a))
+    t = (math.cos(a), -math.sin(a))
+    cx, cy = _r(rng.uniform(300, 700)), _r(rng.uniform(300, 450))
+    # Planes carry n_vec/t_vec as in exported tasks (evaluate.js reads them directly)
+    plane = {'angleDeg': angle, 'through': [cx, cy], 'n_vec': list(n), 't_vec': list(t)}
+    rect = {'width': 160, 'height': 120, 'bottomCenter': [cx, cy], 'angleDeg': angle}
+    if angle or rng.random() < 0.5:
+        rect['n_vec'], rect['t_vec'] = list(n), list(t)
+    task = {
+        'id': 'diff',
+        'origin': [_r(cx + n[0] * 60), _r(cy + n[1] * 60)],
+        'scene': {'plane': plane, 'rects': [rect]},
+        'expectedForces': [],
+        'initialForces': [],
+        'sumF': rng.choice([{}, {'x': 0, 'y': 0}, {'n': 0}]),
+        'relations': [],
+    }
+    names = rng.sample(FORCE_NAMES, rng.randint(1, 4))
+    for name in names:
+        r = rng.random()
+        if r < 0.45:
+            anchor = {'type': 'point', 'ref': rng.choice(['rect0', 'rect0', 'origin']), 'point': 'center'}
+            if anchor['ref'] == 'rect0':
+                anchor['point'] = rng.choice(POINT_ANCHORS)
+        else:
+            anchor = {'type': 'segment', 'ref': 'rect0', 'segment': rng.choice(SEGMENT_ANCHORS)}
+        d = rng.random()
+        if d < 0.3:
+            direction = rng.choice([[0, 1], [0, -1], [1, 0], [-1, 0]])
+        elif d < 0.6:
+            direction = rng.choice(['planeNormal', 'planeTangent'])
+        else:
+            b = rng.uniform(0, 2 * math.pi)
+            direction = [_r(math.cos(b)), _r(math.sin(b))]
+        task['expectedForces'].append({
+            'name': name,
+            'aliases': [name.lower(), f"f{name.lower()}"] if rng.random() < 0.5 else [],
+            'dir': direction,
+            'anchor': anchor,
+        })
+    if len(names) >= 2 and rng.random() < 0.4:
+        for _ in range(rng.randint(1, 2)):
+            x, y = rng.sample(names, 2)
+            task['relations'].append({
+                'lhs': [{'name': x}],
+                'rhs': [dict({'name': y}, **({'component': rng.choice(['normal', 'tangent', 'vertical'])} if rng.random() < 0.3 else {}))],
+                'ratio': rng.choice([0.5, 1, 2]),
+                'tol_rel': 0.15,
+            })
+    return task
+
+def make_forces(rng: random.Random, task: Dict, *, noise_deg: float = 4.0, noise_pos: float = 12.0) -> List[Dict]:
+    """Noisy drawing of task as client force dicts (some forces missing, misnamed or extra)."""
+    lookup = scene_lookup(task)
+    names = [spec['name'] for spec in task['expectedForces']]
+    magnitude = {name: rng.uniform(60, 160) for name in names}
+    for rel in task['relations']:
+        # Make most relations hold: scale the lhs force to ratio x rhs
+        lhs, rhs = rel['lhs'][0]['name'], rel['rhs'][0]['name']
+        if rng.random() < 0.7 and 'component' not in rel['rhs'][0]:
+            magnitude[lhs] = rel['ratio'] * magnitude[rhs]
+    out = []
+
+    def force(name: str, anchor: Vec2, d: Vec2, length: float) -> Dict:
+        base = [_r(anchor[0]), _r(anchor[1])]
+        tip = [_r(base[0] + d[0] * length), _r(base[1] + d[1] * length)]
+        vec = [tip[0] - base[0], tip[1] - base[1]]
+        return {'name': name, 'anchor': base, 'arrowBase': base, 'arrowTip': tip,
+                'vec': vec, 'length': math.hypot(vec[0], vec[1])}
+
+    for spec in task['expectedForces']:
+        if rng.random() < 0.1:
+            continue
+        u = expected_dir(spec, task)
+        noise = 0.0 if rng.random() < 0.3 else rng.gauss(0.0, noise_deg)
+        b = math.atan2(u[1], u[0]) + math.radians(noise)
+        entry = lookup[spec['anchor']['ref']]
+        if spec['anchor']['type'] == 'point':
+            p = entry['points'][spec['anchor']['point']]
+        else:
+            s0, s1 = entry['segments'][spec['anchor']['segment']]
+            k = rng.random()
+            p = (s0[0] + k * (s1[0] - s0[0]), s0[1] + k * (s1[1] - s0[1]))
+        if rng.random() < 0.6:
+            p = (p[0] + rng.gauss(0.0, noise_pos), p[1] + rng.gauss(0.0, noise_pos))
+        name = rng.choice([spec['name']] * 3 + [spec['name'].lower(), '', 'X'] + list(spec.get('aliases') or []))
+        length = magnitude[spec['name']] * (1.0 if rng.random() < 0.5 else rng.uniform(0.7, 1.3))
+        out.append(force(name, p, (math.cos(b), math.sin(b)), length))
+    for _ in range(rng.choice([0, 0, 0, 1, 2])):
+        b = rng.uniform(0, 2 * math.pi)
+        out.append(force(rng.choice(['', 'Q'] + FORCE_NAMES),
+                         (rng.uniform(100, 900), rng.uniform(100, 540)),
+                         (math.cos(b), math.sin(b)), rng.uniform(40, 160)))
+    rng.shuffle(out)
+    return out
+
+def make_case(rng: random.Random) -> Tuple[Dict, List[Dict]]:
+    task = make_task(rng)
+    return task, make_forces(rng, task)
+
+def chunk_cases(seed: int, chunk: int, size: int) -> List[Tuple[Dict, List[Dict]]]:
+    """Cases of one chunk; the same (seed, chunk, size) always gives the same cases."""
+    rng = random.Random(seed * 1_000_003 + chunk)
+    return [make_case(rng) for _ in range(size)]
+
+# ------------------------------------------------------
+# Graders
+# ------------------------------------------------------
+
+class JsGrader:
+    """evaluate.js under Node, fed one chunk of cases per JSON line (see differential_runner.js)."""
+
+    def __init__(self, node: Optional[str] = None, web_dir: str = WEB_DIR):
+        node = node or shutil.which("node") or shutil.which("nodejs")
+        if not node:
+            raise RuntimeError("Fant ikke node: JS-retteren trenger Node.js (--node PATH)")
+        self.proc = subprocess.Popen(
+            [node, os.path.join(web_dir, RUNNER), web_dir],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, encoding='utf-8',
+        )
+
+    def grade(self, cases: Sequence[Tuple[Dict, List[Dict]]]) -> List[Dict]:
+        self.proc.stdin.write(json.dumps([{'task': t, 'forces': f} for t, f in cases]) + "\n")
+        self.proc.stdin.flush()
+        line = self.proc.stdout.readline()
+        if not line:
+            raise RuntimeError(f"JS-retteren avsluttet (kode {self.proc.poll()})")
+        return json.loads(line)
+
+    def close(self) -> None:
+        if self.proc.poll() is None:
+            self.proc.stdin.close()
+            self.proc.wait()
+
+def grade_python(task: Dict, forces: List[Dict]) -> Dict:
+    """Python grader on a client case: {'score', 'coverage', 'relations_score'} or {'error'}."""
+    try:
+        plan = compile_task(task_spec_from_json(task, tol=Tolerances(**JS_TOLERANCES)))
+        result = _evaluate_compiled(plan, ForceBatch.from_json(forces), "score")
+        return {key: result.get(key) for _, key, _ in FIELDS}
+    except Exception as exc:
+        return {'error': f"{type(exc).__name__}: {exc}"}
+
+def compare(py: Dict, js: Dict) -> Dict[str, float]:
+    """
+    |Python - JS| per field; inf when either grader failed. Fields a grader does not report
+    (the Python grader gives only a score for an empty drawing) are left out.
+    """
+    if 'error' in py or 'error' in js:
+        return {field: math.inf for field, _, _ in FIELDS}
+    out = {}
+    for field, py_key, js_key in FIELDS:
+        a, b = py.get(py_key), js.get(js_key)
+        if isinstance(a, (int, float)) and isinstance(b, (int, float)):
+            out[field] = abs(a - b)
+    return out
+
+# ------------------------------------------------------
+# Workers
+# ------------------------------------------------------
+
+_WORKER_JS: Optional[JsGrader] = None
+_WORKER_NODE: Optional[str] = None
+
+def _init_worker(node: Optional[str]) -> None:
+    global _WORKER_NODE
+    _WORKER_NODE = node
+
+def _js() -> JsGrader:
+    global _WORKER_JS
+    if _WORKER_JS is None:
+        _WORKER_JS = JsGrader(_WORKER_NODE)
+        atexit.register(_WORKER_JS.close)
+    return _WORKER_JS
+
+def _new_stats() -> Dict[str, object]:
+    return {
+        'cases': 0,
+        'errors': {'python': 0, 'js': 0},
+        'fields': {f: {'n': 0, 'over': 0, 'sum': 0.0, 'max': 0.0} for f, _, _ in FIELDS},
+        'worst': {f: [] for f, _, _ in FIELDS},
+    }
+
+def run_chunk(seed: int, chunk: int, size: int, eps: float, keep: int = DEFAULT_KEEP) -> Dict[str, object]:
+    """Grade one chunk with both graders; stats plus the `keep` worst cases per field."""
+    cases = chunk_cases(seed, chunk, size)
+    js_results = _js().grade(cases)
+    stats = _new_stats()
+    for k, ((task, forces), js) in enumerate(zip(cases, js_results)):
+        py = grade_python(task, forces)
+        stats['cases'] += 1
+        stats['errors']['python'] += 'error' in py
+        stats['errors']['js'] += 'error' in js
+        for field, delta in compare(py, js).items():
+            f = stats['fields'][field]
+            f['n'] += 1
+            if math.isfinite(delta):
+                f['sum'] += delta
+                f['max'] = max(f['max'], delta)
+            if delta > eps:
+                f['over'] += 1
+                stats['worst'][field].append({
+                    'delta': delta, 'case': [seed, chunk, k], 'python': py, 'js': js,
+                    'task': task, 'forces': forces,
+                })
+    for field in stats['worst']:
+        stats['worst'][field] = _top(stats['worst'][field], keep)
+    return stats
+
+def _top(items: List[Dict], keep: int) -> List[Dict]:
+    items.sort(key=lambda w: (-w['delta'], w['case']))
+    return items[:keep]
+
+def _merge(total: Dict[str, object], part: Dict[str, object], keep: int) -> None:
+    total['cases'] += part['cases']
+    for side in ('python', 'js'):
+        total['errors'][side] += part['errors'][side]
+    for field, f in part['fields'].items():
+        t = total['fields'][field]
+        t['n'] += f['n']
+        t['over'] += f['over']
+        t['sum'] += f['sum']
+        t['max'] = max(t['max'], f['max'])
+        total['worst'][field] = _top(total['worst'][field] + part['worst'][field], keep)
+
+def _run_chunk_args(args) -> Dict[str, object]:
+    return run_chunk(*args)
+
+# ------------------------------------------------------
+# Driver
+# ------------------------------------------------------
+
+def differential(
+    cases: int,
+    *,
+    seed: int = 0,
+    workers: Optional[int] = None,
+    chunk_size: int = DEFAULT_CHUNK,
+    eps: float = DEFAULT_EPS,
+    keep: int = DEFAULT_KEEP,
+    node: Optional[str] = None,
+) -> Dict[str, object]:
+    """
+    Grade `cases` generated cases with both graders.
+    Returns {'cases', 'seed', 'eps', 'seconds', 'errors', 'fields': {field: {'n', 'over', 'mean', 'max'}}, 'worst'}
+    (n: cases where both graders report the field; mean/max over finite deltas).
+    workers: processes (default: CPU count); 1 grades in this process.
+    """
+    workers = workers or os.cpu_count() or 1
+    chunk_size = max(1, int(chunk_size))
+    jobs = [(seed, c, min(chunk_size, cases - c * chunk_size), eps, keep)
+            for c in range((cases + chunk_size - 1) // chunk_size)]
+    total = _new_stats()
+    start = time.perf_counter()
+    if workers == 1:
+        _init_worker(node)
+        for job in jobs:
+            _merge(total, run_chunk(*job), keep)
+    else:
+        with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(node,)) as pool:
+            for part in pool.imap_unordered(_run_chunk_args, jobs):
+                _merge(total, part, keep)
+    return {
+        'cases': total['cases'],
+        'seed': seed,
+        'eps': eps,
+        'seconds': time.perf_counter() - start,
+        'errors': total['errors'],
+        'fields': {
+            field: {'n': f['n'], 'over': f['over'], 'mean': f['sum'] / max(f['n'], 1), 'max': f['max']}
+            for field, f in total['fields'].items()
+        },
+        'worst': total['worst'],
+    }
+
+def format_report(report: Dict[str, object], *, show: int = 5) -> str:
+    """Text summary: per field, cases with |Δ| > eps, mean and max |Δ|, and the worst cases."""
+    out = [
+        f"DIFF: {report['cases']} tilfeller på {report['seconds']:.1f} s, eps={report['eps']:g}, "
+        f"feil python={report['errors']['python']} js={report['errors']['js']}"
+    ]
+    for field, f in report['fields'].items():
+        share = f['over'] / f['n'] if f['n'] else 0.0
+        out.append(f"  {field:<10} n {f['n']:>7}  >eps {f['over']:>7} ({share:6.1%})  mean |Δ| {f['mean']:.4f}  max |Δ| {f['max']:.4f}")
+    for field, worst in report['worst'].items():
+        for w in worst[:show]:
+            py = w['python'].get('error') or w['python'].get(dict((f, k) for f, k, _ in FIELDS)[field])
+            js = w['js'].get('error') or w['js'].get(dict((f, k) for f, _, k in FIELDS)[field])
+            out.append(f"    {field} Δ={w['delta']:.4f} case={w['case']} python={py} js={js}")
+    return "\n".join(out)
+
+def dump_worst(report: Dict[str, object], path: str) -> int:
+    """Write the worst cases as JSONL ({'field', 'delta', 'case', 'python', 'js', 'task', 'forces'}); returns the count."""
+    n = 0
+    with open(path, 'w', encoding='utf-8') as fh:
+        for field, worst in report['worst'].items():
+            for w in worst:
+                fh.write(json.dumps(dict(w, field=field, delta=w['delta'] if math.isfinite(w['delta']) else None),
+                                    ensure_ascii=False) + "\n")
+                n += 1
+    return n
+
+# ------------------------------------------------------
+# Stored reports
+# ------------------------------------------------------
+
+def save_report(report: Dict[str, object], path: str) -> None:
+    """Write the report without its worst cases (stats only) as JSON."""
+    with open(path, 'w', encoding='utf-8') as fh:
+        json.dump({k: v for k, v in report.items() if k != 'worst'}, fh, indent=2, sort_keys=True)
+
+def load_report(path: str) -> Dict[str, object]:
+    with open(path, 'r', encoding='utf-8') as fh:
+        return json.load(fh)
+
+def _stats(report: Dict[str, object]) -> Dict[Tuple[str, str], float]:
+    """{(field, stat): value}: share of cases over eps, mean and max |Δ| per field, and error rates."""
+    out = {}
+    cases = max(report.get('cases', 0), 1)
+    for side, n in report.get('errors', {}).items():
+        out[('errors', side)] = n / cases
+    for field, f in report.get('fields', {}).items():
+        out[(field, 'over')] = f['over'] / f['n'] if f['n'] else 0.0
+        out[(field, 'mean')] = f['mean']
+        out[(field, 'max')] = f['max']
+    return out
+
+def compare_reports(
+    report: Dict[str, object],
+    baseline: Dict[str, object],
+    threshold: float = DEFAULT_THRESHOLD,
+) -> List[Dict[str, object]]:
+    """
+    Stats of report that moved by more than threshold (absolute) from baseline, either way:
+    [{'field', 'stat', 'baseline', 'current', 'delta'}]. Stats missing from either side are skipped.
+    """
+    old = _stats(baseline)
+    changes = []
+    for key, new in _stats(report).items():
+        if key not in old:
+            continue
+        delta = new - old[key]
+        if abs(delta) > threshold:
+            changes.append({'field': key[0], 'stat': key[1], 'baseline': old[key], 'current': new, 'delta': delta})
+    return changes
+
+def same_cases(report: Dict[str, object], baseline: Dict[str, object]) -> bool:
+    """True when both reports graded the same generated cases with the same eps."""
+    return all(report.get(k) == baseline.get(k) for k in ('cases', 'seed', 'eps'))
+
+def replay(lines: Iterable[str], *, node: Optional[str] = None) -> List[Dict]:
+    """Regrade dumped cases with both graders: [{'case', 'python', 'js', 'delta'}]."""
+    records = [json.loads(line) for line in lines if line.strip()]
+    js = JsGrader(node)
+    try:
+        js_results = js.grade([(r['task'], r['forces']) for r in records])
+    finally:
+        js.close()
+    out = []
+    for r, js_result in zip(records, js_results):
+        py = grade_python(r['task'], r['forces'])
+        out.append({'case': r.get('case'), 'python': py, 'js': js_result, 'delta': compare(py, js_result)})
+    return out
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Differensialtest: evaluate.py mot evaluate.js.")
+    parser.add_argument('--cases', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=None, help="prosesser (standard: antall CPU-er)")
+    parser.add_argument('--chunk', type=int, default=DEFAULT_CHUNK, help="tilfeller per Node-kall")
+    parser.add_argument('--eps', type=float, default=DEFAULT_EPS)
+    parser.add_argument('--keep', type=int, default=DEFAULT_KEEP, help="verste tilfeller per felt")
+    parser.add_argument('--node', default=None, help="sti til node")
+    parser.add_argument('--dump', default=None, metavar='JSONL', help="skriv de verste tilfellene hit")
+    parser.add_argument('--json', action='store_true', help="rapport som JSON")
+    parser.add_argument('--replay', default=None, metavar='JSONL', help="rett dumpede tilfeller på nytt")
+    parser.add_argument('--save', default=None, metavar='PATH', help="lagre statistikken som JSON")
+    parser.add_argument('--compare', default=None, metavar='PATH', help="sammenlign med en lagret rapport")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help="absolutt endring som rapporteres")
+    args = parser.parse_args(argv)
+
+    if args.replay:
+        with open(args.replay, encoding='utf-8') as fh:
+            for r in replay(fh, node=args.node):
+                print(json.dumps(r, ensure_ascii=False, default=str))
+        return 0
+
+    report = differential(args.cases, seed=args.seed, workers=args.workers, chunk_size=args.chunk,
+                          eps=args.eps, keep=args.keep, node=args.node)
+    if args.dump:
+        dump_worst(report, args.dump)
+    if args.json:
+        print(json.dumps({k: v for k, v in report.items() if k != 'worst'}, indent=2))
+    else:
+        print(format_report(report))
+    if args.save:
+        save_report(report, args.save)
+        print(f"Rapport lagret: {args.save}")
+    if args.compare:
+        baseline = load_report(args.compare)
+        if not same_cases(report, baseline):
+            print(f"\nMerk: {args.compare} er laget med andre tilfeller "
+                  f"(cases={baseline.get('cases')} seed={baseline.get('seed')} eps={baseline.get('eps')})")
+        changes = compare_reports(report, baseline, args.threshold)
+        if changes:
+            print(f"\n{len(changes)} endring(er) mot {args.compare}:")
+            for c in changes:
+                print(f"  {c['field']:<10} {c['stat']:<6} {c['baseline']:.4f} -> {c['current']:.4f} ({c['delta']:+.4f})")
+            return 1
+        print("\nIngen endringer.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,58 @@
+// differential_runner.js - Runs evaluate.js headless under Node for problem/differential.py
+//
+// Loads geometry.js, scene_render.js and evaluate.js into one VM context that stands in
+// for the browser window, then grades cases read from stdin:
+//   in:  one JSON line per chunk: [{task, forces}, ...]
+//   out: one JSON line per chunk: [{finalScore, baseScore, coverage, foundCount, extrasCount,
+//                                   relationsScore, sumFScore} | {error}, ...]
+// Usage: node differential_runner.js [webDir]
+'use strict';
+const fs = require('fs');
+const path = require('path');
+const vm = require('vm');
+const readline = require('readline');
+
+const webDir = process.argv[2] || __dirname;
+
+function makeWindow(){
+  const win = { GRID_STEP: 20, WIDTH: 1000, HEIGHT: 640, settings: { debug: false }, console };
+  win.window = win;
+  win.showFeedback = function(){};
+  vm.createContext(win);
+  ['geometry.js', 'scene_render.js', 'evaluate.js'].forEach(name => {
+    const file = path.join(webDir, name);
+    vm.runInContext(fs.readFileSync(file, 'utf8'), win, { filename: file });
+  });
+  return win;
+}
+
+const win = makeWindow();
+
+function grade(c){
+  try{
+    win.currentTask = c.task;
+    win.sceneLookup = win.buildAllScenePoints(c.task);
+    win.fm = { forces: c.forces };
+    win.lastEvaluation = null;
+    win.runEvaluation();
+    const s = win.lastEvaluation.summary;
+    return {
+      finalScore: s.finalScore,
+      baseScore: s.baseScore,
+      coverage: s.coverage,
+      foundCount: s.foundCount,
+      extrasCount: s.extrasCount,
+      relationsScore: s.relationsScore,
+      sumFScore: s.sumFResult ? s.sumFResult.score : null
+    };
+  } catch(e){
+    return { error: String(e && e.message || e) };
+  }
+}
+
+const rl = readline.createInterface({ input: process.stdin, crlfDelay: Infinity });
+rl.on('line', line => {
+  if(!line.trim()) return;
+  const cases = JSON.parse(line);
+  process.stdout.write(JSON.stringify(cases.map(grade)) + '\n');
+});
@@ -0,0 +1,225 @@
+# ./problem/drawn_forces.py
+"""
+Kompakte representasjoner av tegnede krefter for retting.
+
+DrawnForce: one drawn arrow with fixed fields (__slots__), duck-compatible with the
+engine Force attributes used by the grader (name, vec, anchor, arrowBase, editable).
+
+ForceBatch: one submission as parallel arrays (struct of arrays). Points are stored as
+flat float arrays [x0, y0, x1, y1, ...]; NaN marks a missing point (e.g. no vec).
+The evaluator reads ForceBatch directly; any other input is converted once on entry.
+"""
+from __future__ import annotations
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+import math
+
+Vec2 = Tuple[float, float]
+NAN = float('nan')
+
+def _point(p) -> Optional[Vec2]:
+    """(x, y) as floats, or None for missing/malformed points."""
+    if p is None:
+        return None
+    try:
+        if len(p) != 2:
+            return None
+        return (float(p[0]), float(p[1]))
+    except (TypeError, ValueError):
+        return None
+
+class DrawnForce:
+    """A drawn arrow: name, vector, anchor (attack point), arrow base and editable flag."""
+    __slots__ = ('name', 'vec', 'anchor', 'arrowBase', 'editable')
+
+    def __init__(
+        self,
+        name: str = '',
+        vec: Optional[Vec2] = None,
+        anchor: Optional[Vec2] = None,
+        arrowBase: Optional[Vec2] = None,
+        editable: bool = True,
+    ):
+        self.name = name or ''
+        self.vec = vec
+        self.anchor = anchor
+        self.arrowBase = arrowBase
+        self.editable = editable
+
+    @classmethod
+    def from_object(cls, f: object) -> "DrawnForce":
+        """From an engine Force (or any object with name/vec/anchor/arrowBase/editable)."""
+        if isinstance(f, DrawnForce):
+            return f
+        return cls(
+            name=getattr(f, 'name', '') or '',
+            vec=_point(getattr(f, 'vec', None)),
+            anchor=_point(getattr(f, 'anchor', None)),
+            arrowBase=_point(getattr(f, 'arrowBase', None)),
+            editable=bool(getattr(f, 'editable', True)),
+        )
+
+    @classmethod
+    def from_json(cls, d: Dict) -> "DrawnForce":
+        """
+        From the force JSON stored by the web client:
+        {name, anchor, arrowBase, arrowTip, editable | isExpected, ...}.
+        vec = arrowTip - arrowBase.
+        """
+        base = _point(d.get('arrowBase'))
+        tip = _point(d.get('arrowTip'))
+        vec = _point(d.get('vec'))
+        if vec is None and base is not None and tip is not None:
+            vec = (tip[0] - base[0], tip[1] - base[1])
+        if 'editable' in d:
+            editable = bool(d['editable'])
+        else:
+            # Web client: initial (pre-drawn) forces are stored with isExpected=false
+            editable = d.get('isExpected', True) is not False
+        return cls(
+            name=d.get('name') or '',
+            vec=vec,
+            anchor=_point(d.get('anchor')),
+            arrowBase=base,
+            editable=editable,
+        )
+
+    def as_tuple(self) -> Tuple[str, Optional[Vec2], Optional[Vec2], bool, Optional[Vec2]]:
+        """(name, vec, anchor, editable, arrowBase)"""
+        return (self.name, self.vec, self.anchor, self.editable, self.arrowBase)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, DrawnForce):
+            return NotImplemented
+        return self.as_tuple() == other.as_tuple()
+
+    def __repr__(self) -> str:
+        return (f"DrawnForce(name={self.name!r}, vec={self.vec}, anchor={self.anchor}, "
+                f"arrowBase={self.arrowBase}, editable={self.editable})")
+
+FORCE_JSON_POINTS = ('anchor', 'arrowBase', 'arrowTip', 'vec')
+FORCE_JSON_FLAGS = ('editable', 'isExpected')
+
+def check_force_json(d: object) -> None:
+    """
+    Raise ValueError unless d is a client force dict: an object with at least one of name,
+    anchor, arrowBase, arrowTip, vec; name a string (or null); points null or [x, y] of
+    finite numbers; editable / isExpected booleans.
+    """
+    if not isinstance(d, dict):
+        raise ValueError(f"en kraft må være et JSON-objekt, fikk {type(d).__name__}")
+    if not any(k in d for k in ('name',) + FORCE_JSON_POINTS):
+        raise ValueError("kraften mangler name, anchor, arrowBase, arrowTip og vec")
+    name = d.get('name')
+    if name is not None and not isinstance(name, str):
+        raise ValueError("'name' må være en streng")
+    for key in FORCE_JSON_POINTS:
+        p = d.get(key)
+        if p is None:
+            continue
+        if (not isinstance(p, (list, tuple)) or len(p) != 2
+                or not all(isinstance(c, (int, float)) and not isinstance(c, bool) and math.isfinite(c) for c in p)):
+            raise ValueError(f"'{key}' må være [x, y] med endelige tall")
+    for key in FORCE_JSON_FLAGS:
+        if key in d and not isinstance(d[key], bool):
+            raise ValueError(f"'{key}' må være true eller false")
+
+def _put(arr: array, p: Optional[Vec2]) -> None:
+    if p is None:
+        arr.append(NAN)
+        arr.append(NAN)
+    else:
+        arr.append(p[0])
+        arr.append(p[1])
+
+class ForceBatch:
+    """
+    One submission as parallel arrays.
+
+    names: list of drawn names ('' when unnamed)
+    vec, anchor, base: flat float sequences of length 2*n (array('d') or a memoryview of doubles)
+    editable: sequence of 0/1 of length n
+    """
+    __slots__ = ('names', 'vec', 'anchor', 'base', 'editable')
+
+    def __init__(self, names: List[str], vec, anchor, base, editable):
+        self.names = names
+        self.vec = vec
+        self.anchor = anchor
+        self.base = base
+        self.editable = editable
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    # --- Construction ---
+
+    @classmethod
+    def from_drawn(cls, forces: Iterable[DrawnForce]) -> "ForceBatch":
+        names: List[str] = []
+        vec, anchor, base = array('d'), array('d'), array('d')
+        editable = bytearray()
+        for f in forces:
+            names.append(f.name)
+            _put(vec, f.vec)
+            _put(anchor, f.anchor)
+            _put(base, f.arrowBase)
+            editable.append(1 if f.editable else 0)
+        return cls(names, vec, anchor, base, editable)
+
+    @classmethod
+    def from_forces(cls, forces: Iterable[object]) -> "ForceBatch":
+        """From engine Force objects (each attribute is probed once)."""
+        return cls.from_drawn(DrawnForce.from_object(f) for f in forces)
+
+    @classmethod
+    def from_tuples(cls, forces: Iterable[Sequence]) -> "ForceBatch":
+        """From (name, vec, anchor, editable[, arrowBase]) tuples."""
+        return cls.from_drawn(
+            DrawnForce(t[0], _point(t[1]), _point(t[2]), _point(t[4]) if len(t) > 4 else None, bool(t[3]))
+            for t in forces
+        )
+
+    @classmethod
+    def from_json(cls, forces: Iterable[Dict]) -> "ForceBatch":
+        """From the list of force dicts stored by the web client."""
+        return cls.from_drawn(DrawnForce.from_json(d) for d in forces)
+
+    # --- Access ---
+
+    def _pt(self, arr, i: int) -> Optional[Vec2]:
+        x = arr[2 * i]
+        if x != x:  # NaN: missing
+            return None
+        return (x, arr[2 * i + 1])
+
+    def vec_at(self, i: int) -> Optional[Vec2]:
+        return self._pt(self.vec, i)
+
+    def anchor_at(self, i: int) -> Optional[Vec2]:
+        return self._pt(self.anchor, i)
+
+    def base_at(self, i: int) -> Optional[Vec2]:
+        return self._pt(self.base, i)
+
+    def is_editable(self, i: int) -> bool:
+        return bool(self.editable[i])
+
+    def force(self, i: int) -> DrawnForce:
+        return DrawnForce(self.names[i], self.vec_at(i), self.anchor_at(i), self.base_at(i), self.is_editable(i))
+
+    def __iter__(self) -> Iterator[DrawnForce]:
+        for i in range(len(self.names)):
+            yield self.force(i)
+
+    def __getstate__(self):
+        return (self.names, array('d', self.vec), array('d', self.anchor), array('d', self.base), bytes(self.editable))
+
+    def __setstate__(self, state):
+        self.names, self.vec, self.anchor, self.base, self.editable = state
+
+def as_force_batch(forces: Union[ForceBatch, Iterable[object]]) -> ForceBatch:
+    """Return forces as a ForceBatch (unchanged if it already is one)."""
+    if isinstance(forces, ForceBatch):
+        return forces
+    return ForceBatch.from_forces(forces)
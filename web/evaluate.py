@@ -1,19 +1,53 @@
 # ./problem/evaluate.py
 from __future__ import annotations
-from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple, Union
+from array import array
+from dataclasses import dataclass
+import functools
+import heapq
+import itertools
+import json
 import math
 
 import utils.geometry as vec  # ditt eksisterende vektor-API
 from problem.spec import TaskSpec, AnchorType, Tolerances
 
 
-from utils.settings import GRID_STEP
-from engine.forces import normalize_name
+# engine.forces (normalize_name), utils.settings (GRID_STEP), NumPy and the debug string
+# formatting are imported where they are first used, so importing this module stays cheap
+# for headless grading (see problem.headless).
+from problem.drawn_forces import ForceBatch, as_force_batch
+from problem.instrumentation import EvalTimings, Sink, get_sink
+from problem.anchor_index import AnchorGrid, MIN_INDEXED_ANCHORS, MIN_NEAREST_ANCHORS, anchor_distance
+from problem.relation_engine import RHS_EPS, RelationTable, Values as RelationValues
+
+@functools.lru_cache(maxsize=None)
+def _numpy():
+    """NumPy (valgfri: vektorisert matching), importert ved første bruk; None uten NumPy."""
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
 
 Vec2 = Tuple[float, float]
 # Scoring configuration constants
 NAME_MISMATCH_PENALTY = 0.5  # Penalty multiplier if force name doesn't match expected
 COVERAGE_PENALTY_EXP = 1.5   # Exponent for coverage penalty (reduces score if forces are missing)
+MATCH_THRESHOLD = 0.2        # Pairs scoring at or below this are never matched
+# Matching backend: "auto" (NumPy for large problems when installed), "python" or "numpy"
+MATCH_BACKEND = "auto"
+NUMPY_MIN_PAIRS = 64         # "auto" uses NumPy from this many (expected, drawn) pairs
+ANGLE_BAND_EPS = 1e-9        # NumPy backend: cosine margin around the tolerance ramp (exact angles inside)
+# Matching strategy: "greedy" (best pair first) or "optimal" (max total score assignment)
+MATCH_STRATEGY = "greedy"
+NAME_CACHE_SIZE = 4096       # Max entries in the normalize_name LRU cache
+# Detail levels for evaluate_task(want=...):
+#   "score"          - scores only (no feedback, details or overlays)
+#   "score+feedback" - scores + feedback; overlays built on first access of EvaluationResult.overlays
+#   "full"           - everything, as a plain dict payload (default)
+WANT_LEVELS = ("score", "score+feedback", "full")
+EVAL_CHUNK = 256             # evaluate_many: submissions whose relations are evaluated as one batch
 
 # ------------------------------------------------------
 # Grunnleggende numerikk
@@ -63,6 +97,17 @@ def angle_error_deg(v: Vec2, target_unit: Vec2) -> float:
     d = clamp(vec.dot(u, t), -1.0, 1.0)
     return math.degrees(math.acos(d))
 
+def _angle_error_unit(v: Vec2, t: Vec2) -> float:
+    """angle_error_deg with target already normalized (t = unit(target))."""
+    return _angle_error_units(unit(v), t)
+
+def _angle_error_units(u: Vec2, t: Vec2) -> float:
+    """angle_error_deg with both vectors already normalized."""
+    if u == (0.0, 0.0) or t == (0.0, 0.0):
+        return 180.0
+    d = clamp(vec.dot(u, t), -1.0, 1.0)
+    return math.degrees(math.acos(d))
+
 # ------------------------------------------------------
 # Sum av krefter og komponenter
 # ------------------------------------------------------
@@ -85,10 +130,16 @@ def sumF(
     - basis="np": (c1, c2) = (normal, tangens) med gitt n_vec (normal opp fra plan),
       c1 = dot(total, e_n), c2 = dot(total, e_p), der e_p = (-e_n.y, e_n.x).
     """
+    return _basis_components(_vec_sum(f.vec for f in forces), basis, n_vec, angle_deg)
+
+def _vec_sum(vecs: Iterable[Vec2]) -> Vec2:
     total = (0.0, 0.0)
-    for f in forces:
-        total = vec.add(total, f.vec)
+    for v in vecs:
+        total = vec.add(total, v)
+    return total
 
+def _basis_components(total: Vec2, basis: str, n_vec: Optional[Vec2], angle_deg: float) -> Tuple[Vec2, float, float]:
+    """(total, c1, c2) for a summed force vector, see sumF."""
     if basis == "xy":
         # komponenter i rotert xy (e_x', e_y')
         # projeksjon = rotér vektor motsatt vei, og les av x,y
@@ -108,6 +159,41 @@ def sumF(
     else:
         raise ValueError(f"Ukjent basis: {basis}")
 
+def sumf_reduce(
+    vecs: Sequence[float],
+    rows: Iterable[int],
+    basis: str = "xy",
+    n_vec: Optional[Vec2] = None,
+    angle_deg: float = 0.0,
+) -> Tuple[Vec2, float, float, float, float, float]:
+    """
+    ΣF og største kraft i én gjennomgang.
+
+    vecs: flat force vectors [x0, y0, x1, y1, ...] (ForceBatch.vec; NaN x = no vector)
+    rows: force indices to include, summed in this order
+    Returns (ΣF vector, c1, c2, |ΣF| in the basis, largest |F|, |ΣF| / largest |F|);
+    rel. error is inf when all forces are ~0 but ΣF is not, 0.0 when both are ~0.
+    """
+    tx = ty = 0.0
+    max_force = 0.0
+    for i in rows:
+        x = vecs[2 * i]
+        if x != x:  # NaN: missing vector
+            continue
+        y = vecs[2 * i + 1]
+        tx += x
+        ty += y
+        m = math.hypot(x, y)
+        if m > max_force:
+            max_force = m
+    total_vec, c1, c2 = _basis_components((tx, ty), basis, n_vec, angle_deg)
+    res = math.hypot(c1, c2)
+    if max_force > 1e-9:
+        rel_err = res / max_force
+    else:
+        rel_err = float('inf') if res > 1e-9 else 0.0
+    return total_vec, c1, c2, res, max_force, rel_err
+
 def sumF_score(
     forces: Sequence[object],
     *,
@@ -146,11 +232,40 @@ def sumF_score(
 # Skåring: navn, retning, posisjon, dekning
 # ------------------------------------------------------
 
+@functools.lru_cache(maxsize=NAME_CACHE_SIZE)
+def _normalize_name_cached(name: str) -> str:
+    """normalize_name behind a bounded LRU cache (names repeat across pairs and submissions)."""
+    from engine.forces import normalize_name  # første navn: importeres her, ikke ved import
+    return normalize_name(name)
+
+@functools.lru_cache(maxsize=NAME_CACHE_SIZE)
+def _normalized_alias_set(aliases: Tuple[str, ...]) -> frozenset:
+    return frozenset(_normalize_name_cached(a) for a in aliases)
+
+def name_cache_info() -> Dict[str, Dict[str, int]]:
+    """
+    Hit/miss counters for the name normalization caches:
+    {'names': {...}, 'alias_sets': {...}} with keys hits, misses, evictions, size, maxsize.
+    Every miss adds an entry and entries only leave by eviction, so evictions = misses - size.
+    """
+    out = {}
+    for key, fn in (('names', _normalize_name_cached), ('alias_sets', _normalized_alias_set)):
+        info = fn.cache_info()
+        out[key] = {
+            'hits': info.hits, 'misses': info.misses, 'evictions': info.misses - info.currsize,
+            'size': info.currsize, 'maxsize': info.maxsize,
+        }
+    return out
+
+def clear_name_cache() -> None:
+    _normalize_name_cached.cache_clear()
+    _normalized_alias_set.cache_clear()
+
 def name_matches(name: Optional[str], aliases: Iterable[str]) -> bool:
     if not name:
         return False
-    n = normalize_name(name)
-    return n in {normalize_name(a) for a in aliases}
+    n = _normalize_name_cached(name)
+    return n in _normalized_alias_set(tuple(aliases))
 
 def score_name(force, *, aliases: Iterable[str], weight: float) -> Tuple[float, float]:
     ok = 1.0 if name_matches(force.name, aliases) else 0.0
@@ -212,56 +327,6 @@ def _mag_term_value(f, mag_term) -> float:
 
 Component = Optional[str]  # None | 'x' | 'y' | 'n' | 'p'
 
-def _force_component(f, comp: Component, n_vec: Optional[Vec2]) -> float:
-    """
-    [DEPRECATED] Hent komponent/magnitude for en kraft.
-    This function is kept for backwards compatibility.
-    New code should use _mag_term_value() with MagTerm objects instead.
-    
-      comp=None -> |f|
-      'x'/'y'   -> XY-komponent
-      'n'/'p'   -> komponent i np-basis (krever n_vec)
-      Component.* enum -> konvertert til string
-    """
-    # Convert Component enum to string if needed
-    if hasattr(comp, 'value'):
-        comp = comp.value
-    
-    if comp is None or comp == "full":
-        return vec.norm(f.vec)
-    if comp == "x":
-        return f.vec[0]
-    if comp == "y":
-        return f.vec[1]
-    if comp in ("n", "p"):
-        if n_vec is None:
-            raise ValueError("np-komponent krever n_vec")
-        e_n = unit(n_vec)
-        if e_n == (0.0, 0.0):
-            raise ValueError("np-komponent: n_vec cannot be zero vector")
-        e_p = (-e_n[1], e_n[0])
-        return vec.dot(f.vec, e_n) if comp == "n" else vec.dot(f.vec, e_p)
-    raise ValueError(f"Ukjent komponent: {comp}")
-
-def _linear_combo(
-    forces_by_key: Dict[str, object],
-    terms: Sequence[Tuple[str, float]],
-    comp: Component,
-    n_vec: Optional[Vec2],
-) -> float:
-    """
-    Beregn sum_i weight_i * component(force_i).
-    terms: [(key, weight), ...]
-    """
-    acc = 0.0
-    for key, w in terms:
-        f = forces_by_key.get(key)
-        if f is None:
-            # Manglende term => ikke bidra. (Alternativt: gjøre eval feil med None.)
-            continue
-        acc += w * _force_component(f, comp, n_vec)
-    return acc
-
 def relation_score(
     forces_by_key: Dict[str, object],
     *,
@@ -298,38 +363,32 @@ def relation_score(
     """
     rtype = relation.get("type", "ratio")
     component: Component = relation.get("component", None)
+    target = float(relation.get("target", 1.0))
 
     if rtype == "ratio":
         num_key = relation["num"]
         den_key = relation["den"]
-        target = float(relation.get("target", 1.0))
-        f_num = forces_by_key.get(num_key)
-        f_den = forces_by_key.get(den_key)
-        if (f_num is None) or (f_den is None):
-            return 0.0, float("inf")
-        a = _force_component(f_num, component, n_vec)
-        b = _force_component(f_den, component, n_vec)
-        if abs(b) < 1e-9:
+        if (forces_by_key.get(num_key) is None) or (forces_by_key.get(den_key) is None):
             return 0.0, float("inf")
-        ratio = a / b
-        err = abs(ratio - target)
-        return ramp_down_linear(err, tol, span), err
-
+        num_terms: Sequence[Tuple[str, float]] = [(num_key, 1.0)]
+        den_terms: Sequence[Tuple[str, float]] = [(den_key, 1.0)]
     elif rtype == "ratio_sum":
-        num_terms: Sequence[Tuple[str, float]] = relation.get("num_terms", [])
-        den_terms: Sequence[Tuple[str, float]] = relation.get("den_terms", [])
-        target = float(relation.get("target", 1.0))
-        a = _linear_combo(forces_by_key, num_terms, component, n_vec)
-        b = _linear_combo(forces_by_key, den_terms, component, n_vec)
-        if abs(b) < 1e-9:
-            return 0.0, float("inf")
-        ratio = a / b
-        err = abs(ratio - target)
-        return ramp_down_linear(err, tol, span), err
-
+        # Manglende term => ikke bidra
+        num_terms = [(k, w) for k, w in relation.get("num_terms", []) if forces_by_key.get(k) is not None]
+        den_terms = [(k, w) for k, w in relation.get("den_terms", []) if forces_by_key.get(k) is not None]
     else:
         raise ValueError(f"Ukjent relation type: {rtype}")
 
+    # Same feature extraction and mat-vec as the compiled relations (problem.relation_engine)
+    table = RelationTable.from_components([(num_terms, den_terms, target)], component, n_vec)
+    keys = [k for k, f in forces_by_key.items() if f is not None]
+    batch = ForceBatch.from_forces(forces_by_key[k] for k in keys)
+    _, (a,), (b,), _ = table.evaluate(batch, {k: j for j, k in enumerate(keys)})
+    if abs(b) < RHS_EPS:
+        return 0.0, float("inf")
+    err = abs(a / b - target)
+    return ramp_down_linear(err, tol, span), err
+
 # ------------------------------------------------------
 # Aggregat / total
 # ------------------------------------------------------
@@ -388,123 +447,248 @@ def component_tuple(forces: Sequence[object], *, basis: str, n_vec: Optional[Vec
 # Main Task Evaluation
 # ======================================================
 
-def evaluate_task(task_spec: object, drawn_forces: Sequence[object]) -> Dict[str, object]:
+def resolve_anchor_spec(anchor_spec, scene):
+    """Resolve an AnchorSpec to actual coordinates (point or segment)."""
+    # Note: anchor_spec.kind can be either enum (Task 1/2) or string (Task 3)
+    is_point = (anchor_spec.kind == AnchorType.POINT) or (anchor_spec.kind == "point") or (anchor_spec.kind == AnchorType.POINT.value)
+    is_segment = (anchor_spec.kind == AnchorType.SEGMENT) or (anchor_spec.kind == "segment") or (anchor_spec.kind == AnchorType.SEGMENT.value)
+
+    if is_point:
+        if anchor_spec.point:
+            return anchor_spec.point
+        elif anchor_spec.ref and anchor_spec.point_name:
+            # Resolve from scene geometry
+            try:
+                # Parse ref like "rect:0" to get shape and point name
+                if ':' in anchor_spec.ref:
+                    shape_type, shape_idx = anchor_spec.ref.split(':')
+                    if shape_type == 'rect' and scene and hasattr(scene, 'rects'):
+                        shape = scene.rects[int(shape_idx)]
+                        if hasattr(shape, anchor_spec.point_name):
+                            attr = getattr(shape, anchor_spec.point_name)
+                            # Properties are not callable
+                            return attr
+            except (IndexError, AttributeError, ValueError, TypeError):
+                pass
+    elif is_segment:
+        if anchor_spec.segment:
+            return anchor_spec.segment
+        elif anchor_spec.ref and anchor_spec.segment_name:
+            # Resolve from scene geometry
+            try:
+                if ':' in anchor_spec.ref:
+                    shape_type, shape_idx = anchor_spec.ref.split(':')
+                    if shape_type == 'rect' and scene and hasattr(scene, 'rects'):
+                        shape = scene.rects[int(shape_idx)]
+                        # Get segment property (e.g. .bottom, .top)
+                        if hasattr(shape, anchor_spec.segment_name):
+                            attr = getattr(shape, anchor_spec.segment_name)
+                            seg = attr  # Properties are not callable
+                            # seg should be a tuple of two points
+                            return seg if seg and len(seg) == 2 else None
+            except (IndexError, AttributeError, ValueError, TypeError):
+                pass
+    return None
+
+def get_component_weights(has_relations: bool):
     """
-    Evaluate drawn forces against task specification.
-    
+    Determine weights for equilibrium_score and relations_score in final calculation.
+
     Args:
-        task_spec: TaskSpec object defining expected forces, scene, basis, tolerances
-        drawn_forces: Sequence of Force objects drawn by user (have .name, .vec, .anchor attributes)
-    
+        has_relations: True if task_spec.relation_requirements has relations defined
+
     Returns:
-        Dictionary with keys:
-        - 'score': overall score [0, 1]
-        - 'feedback': list of feedback strings
-        - 'details': dict with per-force scoring details
+        (equilibrium_weight, relations_weight) tuple
     """
-    
-    # Helper function to resolve anchor specs to actual coordinates
-    def resolve_anchor_spec(anchor_spec, scene):
-        """Resolve an AnchorSpec to actual coordinates (point or segment)."""
-        # Note: anchor_spec.kind can be either enum (Task 1/2) or string (Task 3)
-        is_point = (anchor_spec.kind == AnchorType.POINT) or (anchor_spec.kind == "point") or (anchor_spec.kind == AnchorType.POINT.value)
-        is_segment = (anchor_spec.kind == AnchorType.SEGMENT) or (anchor_spec.kind == "segment") or (anchor_spec.kind == AnchorType.SEGMENT.value)
-        
-        if is_point:
-            if anchor_spec.point:
-                return anchor_spec.point
-            elif anchor_spec.ref and anchor_spec.point_name:
-                # Resolve from scene geometry
-                try:
-                    # Parse ref like "rect:0" to get shape and point name
-                    if ':' in anchor_spec.ref:
-                        shape_type, shape_idx = anchor_spec.ref.split(':')
-                        if shape_type == 'rect' and scene and hasattr(scene, 'rects'):
-                            shape = scene.rects[int(shape_idx)]
-                            if hasattr(shape, anchor_spec.point_name):
-                                attr = getattr(shape, anchor_spec.point_name)
-                                # Properties are not callable
-                                return attr
-                except (IndexError, AttributeError, ValueError, TypeError):
-                    pass
-        elif is_segment:
-            if anchor_spec.segment:
-                return anchor_spec.segment
-            elif anchor_spec.ref and anchor_spec.segment_name:
-                # Resolve from scene geometry
-                try:
-                    if ':' in anchor_spec.ref:
-                        shape_type, shape_idx = anchor_spec.ref.split(':')
-                        if shape_type == 'rect' and scene and hasattr(scene, 'rects'):
-                            shape = scene.rects[int(shape_idx)]
-                            # Get segment property (e.g. .bottom, .top)
-                            if hasattr(shape, anchor_spec.segment_name):
-                                attr = getattr(shape, anchor_spec.segment_name)
-                                seg = attr  # Properties are not callable
-                                # seg should be a tuple of two points
-                                return seg if seg and len(seg) == 2 else None
-                except (IndexError, AttributeError, ValueError, TypeError):
-                    pass
+    if has_relations:
+        return 0.0, 1.0  # relations defined: use relations, skip equilibrium
+    else:
+        return 1.0, 0.0  # no relations: use equilibrium, skip relations
+
+def _is_point_kind(kind) -> bool:
+    # kind can be either enum (Task 1/2) or string (Task 3)
+    return (kind == AnchorType.POINT) or (kind == "point") or (kind == AnchorType.POINT.value)
+
+def _is_segment_kind(kind) -> bool:
+    return (kind == AnchorType.SEGMENT) or (kind == "segment") or (kind == AnchorType.SEGMENT.value)
+
+# ------------------------------------------------------
+# Kompilert oppgave (alt som kun avhenger av TaskSpec)
+# ------------------------------------------------------
+
+@dataclass(frozen=True)
+class CompiledAnchor:
+    """One allowed anchor of an expected force, with its kind already classified."""
+    spec: object
+    is_point: bool
+    is_segment: bool
+    point: Optional[Vec2]                   # anchor_spec.point as used for scoring
+    segment: Optional[Tuple[Vec2, Vec2]]    # anchor_spec.segment as used for scoring
+
+@dataclass(frozen=True)
+class CompiledForce:
+    """An expected force with normalized aliases, unit direction and anchors."""
+    name: str
+    spec: object
+    aliases: frozenset                      # normalized canonical name + aliases
+    dir_unit: Optional[Vec2]                # unit(spec.dir_unit), None when spec has no direction
+    heading_deg: Optional[float]            # atan2 heading of spec.dir_unit (wedge overlay)
+    has_anchor: bool
+    anchors: Tuple[CompiledAnchor, ...]
+    # Position overlays for all anchor candidates: ('circle', pt) or ('stadium', a, b)
+    anchor_overlays: Tuple[tuple, ...]
+    w_name: float
+    w_dir: float
+    w_pos: float
+    # Grid over the scorable anchors, only for forces with many of them (see _best_anchor)
+    anchor_index: Optional[AnchorGrid] = None
+
+@dataclass(frozen=True)
+class CompiledTerm:
+    """A MagTerm with its direction normalized: e_unit=None means magnitude."""
+    force_name: str
+    sign: float
+    e_unit: Optional[Vec2]
+
+@dataclass(frozen=True)
+class CompiledRelation:
+    lhs: Tuple[CompiledTerm, ...]
+    rhs: Tuple[CompiledTerm, ...]
+    ratio: float
+    force_names: Tuple[str, ...]            # lhs + rhs names, in order
+
+@dataclass(frozen=True)
+class CompiledTask:
+    """
+    Immutable grading plan for a TaskSpec (see compile_task).
+    Holds everything evaluate_task derives from the spec, so that grading a
+    submission only does the work that depends on the drawing.
+    """
+    task_spec: TaskSpec
+    ang_tol: float
+    ang_span: float
+    pos_tol: float
+    pos_span: float
+    sumf_tol: float
+    sumf_span: float
+    rel_tol: float
+    rel_span: float
+    basis: str
+    n_vec: Optional[Vec2]
+    expected_dict: Dict[str, object]
+    alias_sets: Dict[str, frozenset]
+    forces: Tuple[CompiledForce, ...]
+    relations: Tuple[CompiledRelation, ...]
+    has_relations: bool
+    eq_origin: Vec2
+    match_strategy: str
+    # Normalized alias -> indices into forces of the expected forces accepting it
+    alias_rows: Dict[str, Tuple[int, ...]]
+    # relations as feature list + sparse coefficient rows (None without relations)
+    relation_table: Optional[RelationTable] = None
+
+    def resolve_name(self, drawn_name: Optional[str]) -> Tuple[str, ...]:
+        """Canonical names of the expected forces that accept drawn_name (one dict lookup)."""
+        if not drawn_name:
+            return ()
+        return tuple(self.forces[i].name for i in self.alias_rows.get(_normalize_name_cached(drawn_name), ()))
+
+def _compile_anchor_overlays(anchors_to_show: Sequence[object], scene) -> Tuple[tuple, ...]:
+    items = []
+    try:
+        for anchor_candidate in anchors_to_show:
+            if _is_point_kind(anchor_candidate.kind):
+                pt = resolve_anchor_spec(anchor_candidate, scene)
+                if pt:
+                    items.append(('circle', pt))
+            elif _is_segment_kind(anchor_candidate.kind):
+                seg = resolve_anchor_spec(anchor_candidate, scene)
+                if seg and len(seg) == 2:
+                    p1, p2 = seg
+                    items.append(('stadium', p1, p2))
+    except Exception:
+        pass  # If resolution fails, skip overlay generation
+    return tuple(items)
+
+def _compile_force(name: str, spec: object, scene=None, accepted: Optional[frozenset] = None) -> CompiledForce:
+    if accepted is None:
+        accepted = _normalized_alias_set(tuple(spec.aliases)) | {_normalize_name_cached(name)}
+    dir_u = None
+    heading = None
+    if spec.dir_unit:
+        dir_u = unit(spec.dir_unit)
+        heading = math.degrees(math.atan2(spec.dir_unit[1], spec.dir_unit[0]))
+    anchors: Tuple[CompiledAnchor, ...] = ()
+    anchor_overlays: Tuple[tuple, ...] = ()
+    if spec.anchor:
+        # Handle both single anchor and list of anchors
+        anchors_to_try = spec.anchor if isinstance(spec.anchor, list) else [spec.anchor]
+        anchors = tuple(
+            CompiledAnchor(
+                spec=a,
+                is_point=_is_point_kind(a.kind),
+                is_segment=_is_segment_kind(a.kind),
+                point=a.point,
+                segment=a.segment,
+            )
+            for a in anchors_to_try
+        )
+        anchor_overlays = _compile_anchor_overlays(anchors_to_try, scene)
+    return CompiledForce(
+        name=name,
+        spec=spec,
+        aliases=accepted,
+        dir_unit=dir_u,
+        heading_deg=heading,
+        has_anchor=bool(spec.anchor),
+        anchors=anchors,
+        anchor_overlays=anchor_overlays,
+        w_name=spec.w_name,
+        w_dir=spec.w_dir,
+        w_pos=spec.w_pos,
+        anchor_index=_compile_anchor_index(anchors),
+    )
+
+def _compile_anchor_index(anchors: Sequence[CompiledAnchor]) -> Optional[AnchorGrid]:
+    scorable = [
+        (k, True, a.point) if a.is_point and a.point else (k, False, a.segment)
+        for k, a in enumerate(anchors)
+        if (a.is_point and a.point) or (a.is_segment and a.segment)
+    ]
+    if len(scorable) < MIN_INDEXED_ANCHORS:
         return None
-    
-    # ===== SCORING CONFIGURATION (All weights and parameters in one place) =====
-    # Extract all tolerances from task_spec.tol
-    tol = task_spec.tol if hasattr(task_spec, 'tol') else Tolerances()
-    
-    # Component weights function (local to evaluate_task)
-    def get_component_weights(has_relations: bool):
-        """
-        Determine weights for equilibrium_score and relations_score in final calculation.
-        
-        Args:
-            has_relations: True if task_spec.relation_requirements has relations defined
-        
-        Returns:
-            (equilibrium_weight, relations_weight) tuple
-        """
-        if has_relations:
-            return 0.0, 1.0  # relations defined: use relations, skip equilibrium
-        else:
-            return 1.0, 0.0  # no relations: use equilibrium, skip relations
-    
-    # ===== END CONFIGURATION =====
-    
+    return AnchorGrid(scorable)
+
+def _compile_term(term) -> CompiledTerm:
+    e_unit = None if term.e_vec is None else unit(term.e_vec)
+    return CompiledTerm(force_name=term.force_name, sign=term.sign, e_unit=e_unit)
+
+def compile_task(task_spec: object, *, match_strategy: Optional[str] = None) -> CompiledTask:
+    """
+    Precompute everything evaluate_task derives from a TaskSpec:
+    tolerances, basis/n_vec, normalized alias sets, unit directions and headings,
+    classified and resolved anchors, and the relation coefficient table.
+
+    match_strategy: "greedy" or "optimal" force matching (default MATCH_STRATEGY).
+
+    The result is immutable and can be passed to evaluate_task / evaluate_many
+    in place of the TaskSpec.
+    """
     if not isinstance(task_spec, TaskSpec):
         raise TypeError(f"task_spec must be TaskSpec, got {type(task_spec)}")
-    
-    feedback: List[str] = []
-    details: Dict[str, object] = {}
-    overlays: Dict[Union[str, int], List[Dict]] = {}  # Store overlays per feedback index (0, 1, 2, ...)
-    
-    # Empty drawing?
-    # Check for non-editable forces in drawn_forces
-    editable_forces = [f for f in drawn_forces if getattr(f, 'editable', True)]
-    if not editable_forces:
-        feedback.append("Ingen andre enn forhåndstegnet kraft er tegnet")
-        return {
-            'score': 0.0,
-            'feedback': feedback,
-            'details': details,
-            'overlays': overlays,
-        }
-    
-    
-    # --- Extract tolerances ---
-    ANG_TOL = tol.ang_tol_deg
-    ANG_SPAN = tol.ang_span_deg
-    POS_TOL = tol.pos_tol
-    POS_SPAN = tol.pos_span
-    SUMF_TOL = tol.sumF_tol
-    SUMF_SPAN = tol.sumF_span
-    REL_TOL = tol.rel_tol
-    REL_SPAN = tol.rel_span
-    
+    match_strategy = match_strategy or MATCH_STRATEGY
+    if match_strategy not in ("greedy", "optimal"):
+        raise ValueError(f"Ukjent matching-strategi: {match_strategy}")
+
+    # Extract all tolerances from task_spec.tol
+    tol = task_spec.tol if hasattr(task_spec, 'tol') else Tolerances()
+
     # --- Get basis ---
     basis = task_spec.basis  # "xy" or "np"
     n_vec = None
     if basis == "np" and task_spec.scene.plane is not None:
         n_vec = task_spec.scene.plane.n_vec
-    
+
     # --- Build canonical force dict by name ---
     expected_forces = task_spec.expected_forces
     if isinstance(expected_forces, dict):
@@ -514,232 +698,523 @@ def evaluate_task(task_spec: object, drawn_forces: Sequence[object]) -> Dict[str
         # If list, convert to dict by .name
         expected_dict = {f.name: f for f in expected_forces}
 
+    forces = tuple(_compile_force(name, spec, task_spec.scene) for name, spec in expected_dict.items())
+
+    has_relations = bool(task_spec.relation_requirements and task_spec.relation_requirements.relations)
+    relations: Tuple[CompiledRelation, ...] = ()
+    if has_relations:
+        relations = tuple(
+            CompiledRelation(
+                lhs=tuple(_compile_term(t) for t in mag_rel.lhs),
+                rhs=tuple(_compile_term(t) for t in mag_rel.rhs),
+                ratio=mag_rel.ratio,
+                force_names=tuple(t.force_name for t in mag_rel.lhs) + tuple(t.force_name for t in mag_rel.rhs),
+            )
+            for mag_rel in task_spec.relation_requirements.relations
+        )
+
+    # Use scene origin if available, otherwise use a default position
+    eq_origin = getattr(task_spec.scene, 'origin', None) or (320, 240)  # fallback to approximate center
+
+    return CompiledTask(
+        task_spec=task_spec,
+        ang_tol=tol.ang_tol_deg,
+        ang_span=tol.ang_span_deg,
+        pos_tol=tol.pos_tol,
+        pos_span=tol.pos_span,
+        sumf_tol=tol.sumF_tol,
+        sumf_span=tol.sumF_span,
+        rel_tol=tol.rel_tol,
+        rel_span=tol.rel_span,
+        basis=basis,
+        n_vec=n_vec,
+        expected_dict=expected_dict,
+        alias_sets={cf.name: cf.aliases for cf in forces},
+        forces=forces,
+        relations=relations,
+        has_relations=has_relations,
+        eq_origin=eq_origin,
+        match_strategy=match_strategy,
+        alias_rows=_alias_rows(forces),
+        relation_table=RelationTable(relations) if relations else None,
+    )
+
+def _as_compiled(task_spec: object) -> CompiledTask:
+    return task_spec if isinstance(task_spec, CompiledTask) else compile_task(task_spec)
+
+def evaluate_task(
+    task_spec: object,
+    drawn_forces: Sequence[object],
+    *,
+    want: str = "full",
+    instrument: Union[bool, Sink, None] = None,
+    keep_scores: bool = False,
+) -> "EvaluationResult":
+    """
+    Evaluate drawn forces against task specification.
+
+    Args:
+        task_spec: TaskSpec object defining expected forces, scene, basis, tolerances,
+            or a CompiledTask from compile_task(task_spec)
+        drawn_forces: Sequence of Force objects drawn by user (have .name, .vec, .anchor attributes),
+            DrawnForce records, or a ForceBatch (read directly, no per-force probing)
+        want: detail level, one of WANT_LEVELS. "score" skips feedback, details and all
+            overlay work (bulk regrading); "score+feedback" defers overlays until accessed.
+        instrument: True to attach phase timings/counters as result.timings, or a sink
+            callable receiving the EvalTimings. The global sink (instrumentation.set_sink)
+            receives them as well. Default None: no instrumentation unless a global sink is set.
+        keep_scores: True to keep the matching's pair scores as result.pair_scores (PairScores)
+            for near-miss queries, e.g. result.near_misses(k=3). Off by default.
+
+    Returns:
+        EvaluationResult (dict) with keys:
+        - 'score': overall score [0, 1]
+        - 'coverage', 'equilibrium_score', 'relations_score'
+        - 'feedback': list of feedback strings (not for want="score")
+        - 'details': dict with per-force scoring details (want="full")
+        - 'overlays': overlays per feedback index (want="full"; lazy for "score+feedback")
+    """
+    return _evaluate_compiled(_as_compiled(task_spec), drawn_forces, want, instrument, keep_scores=keep_scores)
+
+def evaluate_many(
+    task_spec: object,
+    submissions: Iterable[Sequence[object]],
+    *,
+    want: str = "full",
+    instrument: Union[bool, Sink, None] = None,
+    keep_scores: bool = False,
+) -> Iterator["EvaluationResult"]:
+    """
+    Evaluate many submissions of the same task.
+
+    The task is compiled once (unless a CompiledTask is given), then one
+    EvaluationResult is yielded per drawn-force list, in input order.
+    Each result is identical to evaluate_task(task_spec, drawn_forces).
+
+    With relations, submissions are read EVAL_CHUNK at a time: each is matched and
+    scored per force, then the relations of the whole chunk are evaluated as one batch
+    (RelationTable.evaluate_batch) before the results are finished and yielded.
+    """
+    plan = _as_compiled(task_spec)
+    table = plan.relation_table
+    if table is None:
+        for drawn_forces in submissions:
+            yield _evaluate_compiled(plan, drawn_forces, want, instrument, keep_scores=keep_scores)
+        return
+    it = iter(submissions)
+    while True:
+        chunk = list(itertools.islice(it, EVAL_CHUNK))
+        if not chunk:
+            return
+        started = [_start_evaluation(plan, d, want, instrument, keep_scores) for d in chunk]
+        scored = [st for st in started if isinstance(st, _Scored)]
+        values = iter(table.evaluate_batch([st.batch for st in scored], [st.matched for st in scored]))
+        for st in started:
+            yield _finish_scored(st, next(values)) if isinstance(st, _Scored) else st
+
+def _build_overlays(plan: CompiledTask, overlay_log: List[tuple]) -> Dict[Union[str, int], List[Dict]]:
+    """
+    Turn the compact overlay log recorded during evaluation into overlay dicts per feedback index:
+      (fb_idx, 'wedge', center, heading_deg, force_length)
+      (fb_idx, 'anchors', force_idx)       - circles/stadiums for all anchor candidates of plan.forces[force_idx]
+      (fb_idx, 'sumF', max_force)          - tolerance circle at the scene origin
+    """
+    from utils.settings import GRID_STEP
+
+    overlays: Dict[Union[str, int], List[Dict]] = {}
+    for entry in overlay_log:
+        fb_idx, kind = entry[0], entry[1]
+        if kind == 'wedge':
+            _, _, center, heading_deg, force_length = entry
+            # Set r_ok to half the drawn force length, r_span to full force length
+            overlays[fb_idx] = [{
+                'type': 'wedge',
+                'center': center,
+                'heading_deg': heading_deg,
+                'ang_ok': plan.ang_tol,
+                'ang_span': plan.ang_span,
+                'r_ok': clamp(force_length/2, 2*GRID_STEP,10*GRID_STEP),
+                'r_span': clamp(force_length/2, 2*GRID_STEP,10*GRID_STEP),
+            }]
+        elif kind == 'anchors':
+            for ov in plan.forces[entry[2]].anchor_overlays:
+                if ov[0] == 'circle':
+                    overlay_item = {
+                        'type': 'circle',
+                        'center': ov[1],
+                        'r_ok': plan.pos_tol,
+                        'r_span': plan.pos_span,
+                    }
+                else:
+                    overlay_item = {
+                        'type': 'stadium',
+                        'a': ov[1],
+                        'b': ov[2],
+                        'r_ok': plan.pos_tol,
+                        'r_span': plan.pos_span,
+                    }
+                if fb_idx not in overlays:
+                    overlays[fb_idx] = []
+                overlays[fb_idx].append(overlay_item)
+        elif kind == 'sumF':
+            max_force = entry[2]
+            overlays[fb_idx] = [{
+                'type': 'circle',
+                'center': plan.eq_origin,
+                'r_ok': plan.sumf_tol * max_force if max_force > 1e-9 else 10,
+                'r_span': plan.sumf_span * max_force if max_force > 1e-9 else 50,
+            }]
+    return overlays
+
+def _finish_result(
+    plan: CompiledTask,
+    want: str,
+    result: Dict[str, object],
+    overlay_log: List[tuple],
+    timings: Optional[EvalTimings] = None,
+    sinks: Tuple[Sink, ...] = (),
+) -> "EvaluationResult":
+    out = EvaluationResult(result)
+    if want == "full":
+        out['overlays'] = _build_overlays(plan, overlay_log)
+    elif want == "score+feedback":
+        out.defer_overlays(plan, overlay_log)
+    if timings is not None:
+        if want == "full":
+            timings.mark('overlays')
+            timings.count('overlays_built', sum(len(items) for items in out['overlays'].values()))
+        elif overlay_log:
+            timings.count('overlays_deferred', len(overlay_log))
+        out.timings = timings
+        for sink in sinks:
+            sink(timings)
+    return out
+
+class _Scored(NamedTuple):
+    """A submission after matching and per-force scoring; _finish_scored completes it."""
+    plan: CompiledTask
+    batch: ForceBatch
+    matched: Dict[str, int]
+    details: Dict[str, object]
+    feedback: List[str]
+    overlay_log: List[tuple]
+    total_score: float
+    total_weight: float
+    editable_weight: float
+    want: str
+    timings: Optional[EvalTimings]
+    sinks: Tuple[Sink, ...]
+    pair_scores: Optional["PairScores"]
+
+def _evaluate_compiled(
+    plan: CompiledTask,
+    drawn_forces: Union[ForceBatch, Sequence[object]],
+    want: str = "full",
+    instrument: Union[bool, Sink, None] = None,
+    *,
+    keep_scores: bool = False,
+) -> "EvaluationResult":
+    """Evaluate one submission (ForceBatch or drawn force objects) against a compiled task."""
+    started = _start_evaluation(plan, drawn_forces, want, instrument, keep_scores)
+    return _finish_scored(started) if isinstance(started, _Scored) else started
+
+def _finish_scored(st: _Scored, relation_values: Optional[RelationValues] = None) -> "EvaluationResult":
+    """Names, equilibrium, relations and the final score of a _Scored submission."""
+    result = _finish_evaluation(
+        st.plan, st.batch, st.matched, st.details, st.feedback, st.overlay_log,
+        st.total_score, st.total_weight, st.editable_weight, st.want, st.timings, st.sinks,
+        relation_values=relation_values,
+    )
+    if st.pair_scores is not None:
+        result.pair_scores = st.pair_scores
+    return result
+
+def _start_evaluation(
+    plan: CompiledTask,
+    drawn_forces: Union[ForceBatch, Sequence[object]],
+    want: str,
+    instrument: Union[bool, Sink, None],
+    keep_scores: bool,
+) -> Union["EvaluationResult", _Scored]:
+    """Match and score each expected force; the finished result already for an empty drawing."""
+    if want not in WANT_LEVELS:
+        raise ValueError(f"Ukjent want: {want}")
+    with_feedback = want != "score"
+    with_details = want == "full"
+    # Instrumentation: timings is None when disabled (one None-check per phase)
+    # Per-call sink and global sink both receive the timings (once if they are the same)
+    sinks: Tuple[Sink, ...] = (instrument,) if callable(instrument) else ()
+    global_sink = get_sink()
+    if global_sink is not None and global_sink is not instrument:
+        sinks += (global_sink,)
+    timings = EvalTimings() if (instrument or sinks) else None
+
+    batch = as_force_batch(drawn_forces)
+    feedback: List[str] = []
+    details: Dict[str, object] = {}
+    # Overlays are recorded compactly per feedback index (0, 1, 2, ...) and built by _build_overlays
+    overlay_log: List[tuple] = []
+
+    # Empty drawing?
+    # Check for non-editable forces in drawn_forces
+    if not any(batch.editable):
+        result = {'score': 0.0}
+        if with_feedback:
+            feedback.append("Ingen andre enn forhåndstegnet kraft er tegnet")
+            result['feedback'] = feedback
+        if with_details:
+            result['details'] = details
+        if timings is not None:
+            timings.mark('prepare')
+        return _finish_result(plan, want, result, overlay_log, timings, sinks)
+
+
+    if timings is not None:
+        timings.mark('prepare')
+
     #################################################
     # --- Try to match drawn forces to expected ---
     ##################################################
-    matched = match_forces_to_expected(expected_dict, drawn_forces, ANG_TOL, ANG_SPAN)
-    
+    pair_scores = PairScores() if keep_scores else None
+    matched = _match_compiled(
+        plan.forces, batch, plan.ang_tol, plan.ang_span,
+        strategy=plan.match_strategy, alias_rows=plan.alias_rows, stats=timings, pair_scores=pair_scores,
+    )  # expected name -> drawn index
+    if timings is not None:
+        timings.mark('matching')
+
     # --- Score each expected force ---
     total_score = 0.0
     total_weight = 0.0
     editable_weight = 0.0
-    
-    for task_force_name, expected_spec in expected_dict.items():
-        force_detail = {
-            'expected': task_force_name,
-            'found': False,
-            'name_score': 0.0,
-            'dir_score': 0.0,
-            'pos_score': 0.0,
-            'combined': 0.0,
-        }
-        
-        if task_force_name in matched:
-            drawn_f = matched[task_force_name]
-            force_detail['found'] = True
-            # Check if force is editable
-            is_editable = getattr(drawn_f, 'editable', True)  # Default to True if not specified
-            force_detail['is_editable'] = is_editable
-            
-            # Only score editable forces
-            if is_editable:
-                # --- Name score ---
-                name_ok = False
-                drawn_name_str = ""
-                if hasattr(drawn_f, 'name') and drawn_f.name:
-                    drawn_name_str = drawn_f.name
-                name_ok = is_name_expected(drawn_f, task_force_name, expected_spec)
-                name_score = 1.0 if name_ok else 0.5
-                force_detail['name_score'] = name_score
-                force_detail['drawn_name'] = drawn_name_str  # Store drawn name for later use in feedback
-                
-                # Add feedback if name is wrong AND a name was provided (not empty)
-                if not name_ok and drawn_name_str and drawn_name_str.strip():
-                    feedback.append(f"Feil navn på kraften: '{drawn_name_str}'")
-                
-                # --- Direction score ---
-                dir_score = 0.0
-                angle_err = None
-                if hasattr(drawn_f, 'vec') and expected_spec.dir_unit:
-                    angle_err = angle_error_deg(drawn_f.vec, expected_spec.dir_unit)
-                    dir_score = ramp_down_linear(angle_err, ANG_TOL, ANG_SPAN)
-                    force_detail['angle_error_deg'] = angle_err
-                    # Add feedback/overlay only if direction is wrong AND name is accepted
-                    if dir_score < 1.0 and name_ok:
-                        fb_idx = len(feedback)
-                        feedback.append(f"Juster retningen til {task_force_name}")
-                        # Generate direction overlay (wedge) - assumes drawn_f.anchor is available
-                        if hasattr(drawn_f, 'anchor') and drawn_f.anchor:
-                            expected_angle_deg = math.degrees(math.atan2(expected_spec.dir_unit[1], expected_spec.dir_unit[0]))
-                            # Set r_ok to half the drawn force length, r_span to full force length
-                            force_length = vec.norm(drawn_f.vec) if hasattr(drawn_f, 'vec') else 30
-                            overlay_item = {
-                                'type': 'wedge',
-                                'center': drawn_f.arrowBase if hasattr(drawn_f, 'arrowBase') else drawn_f.anchor,
-                                'heading_deg': expected_angle_deg,
-                                'ang_ok': ANG_TOL,
-                                'ang_span': ANG_SPAN,
-                                'r_ok': clamp(force_length/2, 2*GRID_STEP,10*GRID_STEP),
-                                'r_span': clamp(force_length/2, 2*GRID_STEP,10*GRID_STEP),
-                            }
-                            overlays[fb_idx] = [overlay_item]
-                
-                    force_detail['dir_score'] = dir_score
-                
-                # --- Position score ---
-                pos_score = 0.0
-                selected_anchor = None  # Track which anchor was used
-                
-                # Only show position feedback if name is accepted
-                if name_ok:
-                    if hasattr(drawn_f, 'anchor') and drawn_f.anchor and expected_spec.anchor:
-                        # Handle both single anchor and list of anchors
-                        anchors_to_try = expected_spec.anchor if isinstance(expected_spec.anchor, list) else [expected_spec.anchor]
-                        best_pos_score = 0.0
-                        best_anchor = None  # Track best anchor even if score is 0
-                        
-                        for anchor in anchors_to_try:
-                            # Handle both enum (Task 1/2) and string (Task 3) kinds
-                            is_point = (anchor.kind == AnchorType.POINT) or (anchor.kind == "point") or (anchor.kind == AnchorType.POINT.value)
-                            is_segment = (anchor.kind == AnchorType.SEGMENT) or (anchor.kind == "segment") or (anchor.kind == AnchorType.SEGMENT.value)
-                            
-                            curr_score = 0.0
-                            if is_point and anchor.point:
-                                d = vec.distance(drawn_f.anchor, anchor.point)
-                                curr_score = ramp_down_linear(d, POS_TOL, POS_SPAN)
-                                if curr_score > best_pos_score or best_anchor is None:  # Set anchor even if curr_score=0
-                                    best_pos_score = curr_score
-                                    pos_score = curr_score
-                                    selected_anchor = anchor
-                                    best_anchor = anchor
-                                    force_detail['pos_error'] = d
-                            elif is_segment and anchor.segment:
-                                d = vec.dist_point_to_segment(drawn_f.anchor, anchor.segment[0], anchor.segment[1])
-                                curr_score = ramp_down_linear(d, POS_TOL, POS_SPAN)
-                                if curr_score > best_pos_score or best_anchor is None:  # Set anchor even if curr_score=0
-                                    best_pos_score = curr_score
-                                    pos_score = curr_score
-                                    selected_anchor = anchor
-                                    best_anchor = anchor
-                                    force_detail['pos_error'] = d
-                
-                force_detail['pos_score'] = pos_score
-                
-                # Add feedback and overlays if position is wrong (including when pos_score = 0)
-                # Only show position feedback if name is accepted
-                if name_ok and expected_spec.anchor and selected_anchor and pos_score < 1.0:
-                    pos_err = force_detail.get('pos_error')
-                    # Determine anchor type from selected anchor (handle both enum and string kinds)
-                    is_point = (selected_anchor.kind == AnchorType.POINT) or (selected_anchor.kind == "point") or (selected_anchor.kind == AnchorType.POINT.value)
-                    is_segment = (selected_anchor.kind == AnchorType.SEGMENT) or (selected_anchor.kind == "segment") or (selected_anchor.kind == AnchorType.SEGMENT.value)
-                    
-                    if pos_err is not None:
-                        anchor_type = "massemidtpunkt" if is_point else "kontaktflaten"
-                        fb_idx = len(feedback)
-                        feedback.append(f"Angrepspunkt til {drawn_name_str}  bør ligge i {anchor_type}")
-                        
-                        # Generate position overlays for ALL anchor candidates when position is wrong
-                        anchors_to_show = expected_spec.anchor if isinstance(expected_spec.anchor, list) else [expected_spec.anchor]
-                        try:
-                            for anchor_candidate in anchors_to_show:
-                                is_cand_point = (anchor_candidate.kind == AnchorType.POINT) or (anchor_candidate.kind == "point") or (anchor_candidate.kind == AnchorType.POINT.value)
-                                is_cand_segment = (anchor_candidate.kind == AnchorType.SEGMENT) or (anchor_candidate.kind == "segment") or (anchor_candidate.kind == AnchorType.SEGMENT.value)
-                                
-                                if is_cand_point:
-                                    pt = resolve_anchor_spec(anchor_candidate, task_spec.scene)
-                                    if pt:
-                                        overlay_item = {
-                                            'type': 'circle',
-                                            'center': pt,
-                                            'r_ok': POS_TOL,
-                                            'r_span': POS_SPAN,
-                                        }
-                                        if fb_idx not in overlays:
-                                            overlays[fb_idx] = []
-                                        overlays[fb_idx].append(overlay_item)
-                                elif is_cand_segment:
-                                    seg = resolve_anchor_spec(anchor_candidate, task_spec.scene)
-                                    if seg and len(seg) == 2:
-                                        p1, p2 = seg
-                                        overlay_item = {
-                                            'type': 'stadium',
-                                            'a': p1,
-                                            'b': p2,
-                                            'r_ok': POS_TOL,
-                                            'r_span': POS_SPAN,
-                                        }
-                                        if fb_idx not in overlays:
-                                            overlays[fb_idx] = []
-                                        overlays[fb_idx].append(overlay_item)
-                        except Exception:
-                            pass  # If resolution fails, skip overlay generation
-                    else:
-                        # pos_score is 0 but no pos_error recorded - anchor type might be unsupported
-                        anchor_type = "massemidtpunkt" if is_point else "kontaktflaten"
-                        fb_idx = len(feedback)
-                        feedback.append(f"Angrepspunkt til {drawn_name_str}  bør ligge i {anchor_type}")
-                        # Still try to show expected anchor positions for all candidates
-                        anchors_to_show = expected_spec.anchor if isinstance(expected_spec.anchor, list) else [expected_spec.anchor]
-                        try:
-                            for anchor_candidate in anchors_to_show:
-                                is_cand_point = (anchor_candidate.kind == AnchorType.POINT) or (anchor_candidate.kind == "point") or (anchor_candidate.kind == AnchorType.POINT.value)
-                                is_cand_segment = (anchor_candidate.kind == AnchorType.SEGMENT) or (anchor_candidate.kind == "segment") or (anchor_candidate.kind == AnchorType.SEGMENT.value)
-                                
-                                if is_cand_point:
-                                    pt = resolve_anchor_spec(anchor_candidate, task_spec.scene)
-                                    if pt:
-                                        overlay_item = {
-                                            'type': 'circle',
-                                            'center': pt,
-                                            'r_ok': POS_TOL,
-                                            'r_span': POS_SPAN,
-                                        }
-                                        if fb_idx not in overlays:
-                                            overlays[fb_idx] = []
-                                        overlays[fb_idx].append(overlay_item)
-                                elif is_cand_segment:
-                                    seg = resolve_anchor_spec(anchor_candidate, task_spec.scene)
-                                    if seg and len(seg) == 2:
-                                        p1, p2 = seg
-                                        overlay_item = {
-                                            'type': 'stadium',
-                                            'a': p1,
-                                            'b': p2,
-                                            'r_ok': POS_TOL,
-                                            'r_span': POS_SPAN,
-                                        }
-                                        if fb_idx not in overlays:
-                                            overlays[fb_idx] = []
-                                        overlays[fb_idx].append(overlay_item)
-                        except Exception:
-                            pass  # If resolution fails, skip overlay generation
-            
-                # --- Combined score (weighted average) ---
-                w_n = expected_spec.w_name
-                w_d = expected_spec.w_dir
-                w_p = expected_spec.w_pos
-                w_sum = w_n + w_d + w_p
-                
-                if w_sum > 0:
-                    combined = (w_n * name_score + w_d * dir_score + w_p * pos_score) / w_sum
-                else:
-                    combined = 0.0
-                
-                total_score += combined
-                editable_weight += 1.0  # Only count editable forces
-            else:
-                # Non-editable force: skip all scoring but mark as found
-                force_detail['name_score'] = 1.0  # Accept as-is for relations
-                force_detail['drawn_name'] = getattr(drawn_f, 'name', '')
-                force_detail['dir_score'] = 1.0
-                force_detail['pos_score'] = 1.0
-                force_detail['combined'] = 0.0  # Don't contribute to force scoring
-            
-            total_weight += 1.0  # All forces count for coverage
+
+    for force_idx, cf in enumerate(plan.forces):
+        force_detail, score, weight, events = _score_force(
+            plan, force_idx, batch, matched.get(cf.name), with_feedback, timings,
+        )
+        total_score += score
+        editable_weight += weight
+        total_weight += 1.0  # All forces count for coverage
+        for message, overlay in events:
+            if overlay is not None:
+                overlay_log.append((len(feedback),) + overlay)
+            feedback.append(message)
+        details[cf.name] = force_detail
+
+    if timings is not None:
+        timings.mark('forces')
+
+    return _Scored(
+        plan, batch, matched, details, feedback, overlay_log,
+        total_score, total_weight, editable_weight, want, timings, sinks, pair_scores,
+    )
+
+# (message, overlay) in feedback order; overlay is an overlay log entry without fb_idx
+ForceEvent = Tuple[str, Optional[tuple]]
+
+def _best_anchor(
+    cf: CompiledForce,
+    p: Vec2,
+    pos_tol: float,
+    pos_span: float,
+) -> Tuple[Optional[CompiledAnchor], Optional[float], float, int]:
+    """
+    Anchor of cf that position-scores p: the first in list order with the highest score
+    (the first scorable anchor when all score 0). Returns (anchor, distance, score, anchors tried).
+    With cf.anchor_index only anchors near enough to score > 0 are tried.
+    """
+    anchors: Sequence[CompiledAnchor] = cf.anchors
+    index = cf.anchor_index
+    if index is not None and index.usable(p):
+        # Margin so rounding in ramp_down_linear cannot give a score > 0 just outside the radius
+        reach = pos_tol + max(pos_span, 0.0)
+        anchors = [cf.anchors[k] for k in index.within(p, reach * (1.0 + 1e-9) + 1e-9)]
+    best_anchor = None  # Track best anchor even if score is 0
+    best_d = None
+    best_score = 0.0
+    for anchor in anchors:
+        if anchor.is_point and anchor.point:
+            d = vec.distance(p, anchor.point)
+        elif anchor.is_segment and anchor.segment:
+            d = vec.dist_point_to_segment(p, anchor.segment[0], anchor.segment[1])
         else:
-            total_weight += 1.0
-        
-        details[task_force_name] = force_detail
+            continue
+        curr_score = ramp_down_linear(d, pos_tol, pos_span)
+        if curr_score > best_score or best_anchor is None:  # Set anchor even if curr_score=0
+            best_score = curr_score
+            best_anchor = anchor
+            best_d = d
+    tried = len(anchors)
+    if index is not None and best_score <= 0.0 and anchors is not cf.anchors:
+        # Nothing in reach scores: the linear scan would keep the first scorable anchor
+        best_anchor = cf.anchors[index.first]
+        best_d = anchor_distance(p, best_anchor.is_point, best_anchor.point if best_anchor.is_point else best_anchor.segment)
+        best_score = ramp_down_linear(best_d, pos_tol, pos_span)
+        tried += 1
+    return best_anchor, best_d, best_score, tried
+
+def nearest_anchor_distance(cf: CompiledForce, p: Vec2) -> Optional[float]:
+    """Distance from p to the nearest scorable anchor of cf (None when it has none)."""
+    index = cf.anchor_index
+    if index is not None and len(index) >= MIN_NEAREST_ANCHORS and index.usable(p):
+        return index.nearest(p)[1]
+    best = None
+    for anchor in cf.anchors:
+        if anchor.is_point and anchor.point:
+            d = vec.distance(p, anchor.point)
+        elif anchor.is_segment and anchor.segment:
+            d = vec.dist_point_to_segment(p, anchor.segment[0], anchor.segment[1])
+        else:
+            continue
+        if best is None or d < best:
+            best = d
+    return best
+
+def _score_force(
+    plan: CompiledTask,
+    force_idx: int,
+    batch: ForceBatch,
+    drawn_idx: Optional[int],
+    with_feedback: bool = True,
+    timings: Optional[EvalTimings] = None,
+) -> Tuple[Dict[str, object], float, float, List[ForceEvent]]:
+    """
+    Score expected force plan.forces[force_idx] against drawn force drawn_idx (None = not matched).
+    Returns (force_detail, combined score, editable weight, feedback events).
+    Depends only on the expected force and the drawn force's own data (not on its index).
+    """
+    cf = plan.forces[force_idx]
+    task_force_name = cf.name
+    events: List[ForceEvent] = []
+    force_detail = {
+        'expected': task_force_name,
+        'found': False,
+        'name_score': 0.0,
+        'dir_score': 0.0,
+        'pos_score': 0.0,
+        'combined': 0.0,
+    }
+    if drawn_idx is None:
+        return force_detail, 0.0, 0.0, events
+
+    force_detail['found'] = True
+    # Check if force is editable
+    is_editable = batch.is_editable(drawn_idx)
+    force_detail['is_editable'] = is_editable
+
+    # Only score editable forces
+    if not is_editable:
+        # Non-editable force: skip all scoring but mark as found
+        force_detail['name_score'] = 1.0  # Accept as-is for relations
+        force_detail['drawn_name'] = batch.names[drawn_idx]
+        force_detail['dir_score'] = 1.0
+        force_detail['pos_score'] = 1.0
+        force_detail['combined'] = 0.0  # Don't contribute to force scoring
+        return force_detail, 0.0, 0.0, events
+
+    drawn_vec = batch.vec_at(drawn_idx)
+    drawn_anchor = batch.anchor_at(drawn_idx)
+
+    # --- Name score ---
+    name_ok = False
+    drawn_name_str = batch.names[drawn_idx]
+    if drawn_name_str:
+        name_ok = _normalize_name_cached(drawn_name_str) in cf.aliases
+    name_score = 1.0 if name_ok else 0.5
+    force_detail['name_score'] = name_score
+    force_detail['drawn_name'] = drawn_name_str  # Store drawn name for later use in feedback
+
+    # Add feedback if name is wrong AND a name was provided (not empty)
+    if with_feedback and not name_ok and drawn_name_str and drawn_name_str.strip():
+        events.append((f"Feil navn på kraften: '{drawn_name_str}'", None))
+
+    # --- Direction score ---
+    dir_score = 0.0
+    angle_err = None
+    if drawn_vec is not None and cf.dir_unit is not None:
+        angle_err = _angle_error_unit(drawn_vec, cf.dir_unit)
+        dir_score = ramp_down_linear(angle_err, plan.ang_tol, plan.ang_span)
+        force_detail['angle_error_deg'] = angle_err
+        # Add feedback/overlay only if direction is wrong AND name is accepted
+        if with_feedback and dir_score < 1.0 and name_ok:
+            overlay = None
+            # Direction overlay (wedge) - assumes the drawn anchor is available
+            if drawn_anchor is not None:
+                drawn_base = batch.base_at(drawn_idx)
+                overlay = (
+                    'wedge',
+                    drawn_base if drawn_base is not None else drawn_anchor,
+                    cf.heading_deg,
+                    vec.norm(drawn_vec),
+                )
+            events.append((f"Juster retningen til {task_force_name}", overlay))
+
+        force_detail['dir_score'] = dir_score
+
+    # --- Position score ---
+    pos_score = 0.0
+    selected_anchor = None  # Track which anchor was used
+
+    # Only show position feedback if name is accepted
+    if name_ok:
+        if drawn_anchor is not None and cf.has_anchor:
+            selected_anchor, d, pos_score, tried = _best_anchor(cf, drawn_anchor, plan.pos_tol, plan.pos_span)
+            if timings is not None:
+                timings.count('anchors_tried', tried)
+            if selected_anchor is not None:
+                force_detail['pos_error'] = d
+
+    force_detail['pos_score'] = pos_score
+
+    # Add feedback and overlays if position is wrong (including when pos_score = 0)
+    # Only show position feedback if name is accepted
+    if with_feedback and name_ok and cf.has_anchor and selected_anchor and pos_score < 1.0:
+        # pos_error is None when the anchor type is unsupported; feedback is the same
+        anchor_type = "massemidtpunkt" if selected_anchor.is_point else "kontaktflaten"
+        # Position overlays for ALL anchor candidates when position is wrong
+        events.append((f"Angrepspunkt til {drawn_name_str}  bør ligge i {anchor_type}", ('anchors', force_idx)))
+
+    # --- Combined score (weighted average) ---
+    w_n = cf.w_name
+    w_d = cf.w_dir
+    w_p = cf.w_pos
+    w_sum = w_n + w_d + w_p
+
+    if w_sum > 0:
+        combined = (w_n * name_score + w_d * dir_score + w_p * pos_score) / w_sum
+    else:
+        combined = 0.0
+
+    return force_detail, combined, 1.0, events  # Only count editable forces
+
+def _finish_evaluation(
+    plan: CompiledTask,
+    batch: ForceBatch,
+    matched: Dict[str, int],
+    details: Dict[str, object],
+    feedback: List[str],
+    overlay_log: List[tuple],
+    total_score: float,
+    total_weight: float,
+    editable_weight: float,
+    want: str,
+    timings: Optional[EvalTimings] = None,
+    sinks: Tuple[Sink, ...] = (),
+    *,
+    relation_values: Optional[RelationValues] = None,
+) -> "EvaluationResult":
+    """
+    Name/missing feedback, equilibrium, relations and the final score, given the per-force results.
+    relation_values: this submission's RelationTable.evaluate() output when already computed
+    for a batch (evaluate_many); computed here otherwise.
+    """
+    with_feedback = want != "score"
+    with_details = want == "full"
+    basis = plan.basis
+    SUMF_TOL = plan.sumf_tol
+    SUMF_SPAN = plan.sumf_span
+    REL_TOL = plan.rel_tol
+    REL_SPAN = plan.rel_span
 
     # --- Count forces without a provided name (found but no drawn name) ---
     # Details entries set 'drawn_name' (possibly empty) for found forces.
@@ -752,152 +1227,105 @@ def evaluate_task(task_spec: object, drawn_forces: Sequence[object]) -> Dict[str
     num_wrong_names = num_missing_names    
     
     # Add consolidated feedback for forces with wrong names (only if names were provided)
-    if num_wrong_names > 0:
+    if with_feedback and num_wrong_names > 0:
         if num_wrong_names == 1:
             feedback.insert(0, "Det mangler navn på en kraft.")
         else:
             feedback.insert(0, f"Det mangler navn på {num_wrong_names} krefter.")
 
     # --- Check for missing forces ---
-    missing_forces = [name for name in expected_dict.keys() if name not in matched]
-    if missing_forces:
+    missing_forces = [name for name in plan.expected_dict.keys() if name not in matched]
+    if with_feedback and missing_forces:
         num_missing = len(missing_forces)
         if num_missing > 0:
             feedback.append(f"Det mangler en eller flere krefter.")
     
+    if timings is not None:
+        timings.mark('names')
+
     # --- Compute force sum equilibrium bonus ---
     equilibrium_score = 1.0
     # Only compute equilibrium if NO relation_requirements are defined
-    has_relations = bool(task_spec.relation_requirements and task_spec.relation_requirements.relations)
+    has_relations = plan.has_relations
     
     if not has_relations and matched and basis in ("xy", "np"):
         # Fallback: compute equilibrium only if relations not defined
-        matched_forces = list(matched.values())      
-        total_vec, c1, c2 = sumF(matched_forces, basis=basis, n_vec=n_vec, angle_deg=0.0)
-        
-        # ΣF magnitude (combined component check)
-        res = math.hypot(c1, c2)
-             
-        # Find largest force magnitude for relative error calculation
-        max_force = 0.0
-        for f in matched_forces:
-            if hasattr(f, 'vec') and f.vec:
-                force_mag = vec.norm(f.vec)
-                max_force = max(max_force, force_mag)
-        
-        # Compute relative error: |ΣF| / max_force
-        if max_force > 1e-9:
-            rel_err = res / max_force
-        else:
-            rel_err = float('inf') if res > 1e-9 else 0.0
+        total_vec, c1, c2, res, max_force, rel_err = _equilibrium_measure(plan, batch, matched)
         
         eq_score = ramp_down_linear(rel_err, SUMF_TOL, SUMF_SPAN)
         equilibrium_score = eq_score
         
-        details['equilibrium'] = {
-            'total_vec': total_vec,
-            'c1': c1,
-            'c2': c2,
-            'magnitude': res,
-            'max_force': max_force,
-            'relative_error': rel_err,
-            'score': eq_score,
-        }
+        if with_details:
+            details['equilibrium'] = {
+                'total_vec': total_vec,
+                'c1': c1,
+                'c2': c2,
+                'magnitude': res,
+                'max_force': max_force,
+                'relative_error': rel_err,
+                'score': eq_score,
+            }
         
-        if eq_score < 1.0:
+        if with_feedback and eq_score < 1.0:
             fb_idx = len(feedback)
             feedback.append(f"ΣF bør være ≈ 0 (basis={basis})")
-            # Generate equilibrium overlay (circle at scene origin showing tolerance)
-            # Use scene origin if available, otherwise use a default position
-            origin = getattr(task_spec.scene, 'origin', None) or (320, 240)  # fallback to approximate center
-            overlay_item = {
-                'type': 'circle',
-                'center': origin,
-                'r_ok': SUMF_TOL * max_force if max_force > 1e-9 else 10,
-                'r_span': SUMF_SPAN * max_force if max_force > 1e-9 else 50,
-            }
-            overlays[fb_idx] = [overlay_item]
+            # Equilibrium overlay (circle at scene origin showing tolerance)
+            overlay_log.append((fb_idx, 'sumF', max_force))
     
+    if timings is not None:
+        timings.mark('equilibrium')
+
     # --- Compute relation requirements scores (if any) ---
     relations_score = 1.0
     if has_relations:
-        rel_req = task_spec.relation_requirements
-        
         relation_scores = []
-        for mag_rel in rel_req.relations:
+        table = plan.relation_table
+        # One feature extraction and one mat-vec for all relations
+        x, lhs_vals, rhs_vals, errors = relation_values or table.evaluate(batch, matched)
+        for r, mag_rel in enumerate(plan.relations):
             # Check if all related forces are present AND have correct names (not just direction guesses)
             all_names_correct = True
-            for term in mag_rel.lhs:
-                if term.force_name not in matched:
+            for force_name in mag_rel.force_names:
+                if force_name not in matched:
                     all_names_correct = False
                     break
                 # Check if the name was actually accepted (name_ok was True)
-                if not details[term.force_name].get('found', False):
+                if not details[force_name].get('found', False):
                     all_names_correct = False
                     break
                 # Check if name_score indicates the name was correct (1.0 for correct, 0.5 for wrong)
-                if details[term.force_name].get('name_score', 0.0) < 1.0:
+                if details[force_name].get('name_score', 0.0) < 1.0:
                     all_names_correct = False
                     break
             
-            if all_names_correct:
-                for term in mag_rel.rhs:
-                    if term.force_name not in matched:
-                        all_names_correct = False
-                        break
-                    # Check if the name was actually accepted (name_ok was True)
-                    if not details[term.force_name].get('found', False):
-                        all_names_correct = False
-                        break
-                    # Check if name_score indicates the name was correct (1.0 for correct, 0.5 for wrong)
-                    if details[term.force_name].get('name_score', 0.0) < 1.0:
-                        all_names_correct = False
-                        break
-            
             # Skip feedback for this relation if any related force has incorrect name
             if not all_names_correct:
                 continue
             
-            # Compute LHS = sum of (sign * mag_term_value(force, term))
-            lhs_val = 0.0
-            for term in mag_rel.lhs:
-                if term.force_name in matched:
-                    f = matched[term.force_name]
-                    mag_val = _mag_term_value(f, term)
-                    lhs_val += term.sign * mag_val
+            table.check(r, x)
+            lhs_val, rhs_val, err = lhs_vals[r], rhs_vals[r], errors[r]
             
-            # Compute RHS
-            rhs_val = 0.0
-            for term in mag_rel.rhs:
-                if term.force_name in matched:
-                    f = matched[term.force_name]
-                    mag_val = _mag_term_value(f, term)
-                    rhs_val += term.sign * mag_val
-            
-            # Ratio check
-            if abs(rhs_val) < 1e-9:
+            # Ratio check (err is inf when the RHS is ≈ 0)
+            if abs(rhs_val) < RHS_EPS:
                 rel_score = 0.0
-                err = float('inf')
             else:
-                measured_ratio = lhs_val / rhs_val
-                target_ratio = mag_rel.ratio
-                err = abs(measured_ratio - target_ratio) / max(abs(target_ratio), 1.0)
                 # Use ramp_down_linear with REL_TOL and REL_SPAN from tolerances
                 rel_score = ramp_down_linear(err, REL_TOL, REL_SPAN)
             
             relation_scores.append(rel_score)
             rel_idx = len(relation_scores) - 1
-            details[f'relation_{rel_idx}'] = {
-                'lhs': lhs_val,
-                'rhs': rhs_val,
-                'ratio': (lhs_val / rhs_val) if abs(rhs_val) > 1e-9 else float('inf'),
-                'target': mag_rel.ratio,
-                'error': err,
-                'score': rel_score,
-            }
+            if with_details:
+                details[f'relation_{rel_idx}'] = {
+                    'lhs': lhs_val,
+                    'rhs': rhs_val,
+                    'ratio': (lhs_val / rhs_val) if abs(rhs_val) > 1e-9 else float('inf'),
+                    'target': mag_rel.ratio,
+                    'error': err,
+                    'score': rel_score,
+                }
             
             # Add feedback if relation check fails
-            if rel_score < 1.0:
+            if with_feedback and rel_score < 1.0:
                 # Build descriptive relation name from lhs and rhs force names (use drawn names)
                 lhs_names = [details[term.force_name].get('drawn_name', term.force_name) for term in mag_rel.lhs]
                 rhs_names = [details[term.force_name].get('drawn_name', term.force_name) for term in mag_rel.rhs]
@@ -920,17 +1348,61 @@ def evaluate_task(task_spec: object, drawn_forces: Sequence[object]) -> Dict[str
             relations_score = sum(relation_scores) / len(relation_scores)
     
     details['relations'] = {'score': relations_score}
+    if timings is not None:
+        timings.mark('relations')
     
     # --- Final score ---
+    num_found = len([d for d in details.values() if isinstance(d, dict) and d.get('found', False)])
+    final_score, coverage = _combine_scores(
+        has_relations, total_score, total_weight, editable_weight, num_found,
+        equilibrium_score, relations_score,
+    )
+    
+    result: Dict[str, object] = {'score': final_score}
+    if with_feedback:
+        result['feedback'] = feedback
+    if with_details:
+        result['details'] = details
+    result['coverage'] = coverage
+    result['equilibrium_score'] = equilibrium_score
+    result['relations_score'] = relations_score
+    if timings is not None:
+        timings.mark('final')
+    return _finish_result(plan, want, result, overlay_log, timings, sinks)
+
+def _equilibrium_measure(
+    plan: CompiledTask,
+    batch: ForceBatch,
+    matched: Dict[str, int],
+) -> Tuple[Vec2, float, float, float, float, float]:
+    """(ΣF vector, c1, c2, |ΣF|, largest force, |ΣF| / largest force) over the matched drawn forces."""
+    return sumf_reduce(batch.vec, matched.values(), plan.basis, plan.n_vec)
+
+def _combine_scores(
+    has_relations: bool,
+    total_score: float,
+    total_weight: float,
+    editable_weight: float,
+    num_found: int,
+    equilibrium_score: float,
+    relations_score: float,
+    *,
+    coverage_exp: float = COVERAGE_PENALTY_EXP,
+    quality_floor: float = 0.5,
+) -> Tuple[float, float]:
+    """
+    (final score, coverage) from the summed per-force scores and the quality components.
+    coverage_exp / quality_floor: scoring policy (defaults are the grading policy).
+    """
     if editable_weight > 0:
-        coverage = len([d for d in details.values() if isinstance(d, dict) and d.get('found', False)]) / total_weight
+        coverage = num_found / total_weight
         base_score = total_score / editable_weight  # Only divide by editable forces
     else:
         coverage = 0.0
         base_score = 0.0
     
     # Apply coverage penalty
-    coverage_factor = coverage ** COVERAGE_PENALTY_EXP  # Penalize missing forces
+    coverage_factor = coverage ** coverage_exp  # Penalize missing forces
     
     # Get component weights based on whether relations are defined
     equilibrium_weight, relations_weight = get_component_weights(has_relations)
@@ -953,32 +1425,28 @@ def evaluate_task(task_spec: object, drawn_forces: Sequence[object]) -> Dict[str
     if relations_weight > 0.0:
         # Relations defined: relations score affects 50% of final quality
         # min_quality = 0.5 (even if relations completely fail)
-        quality_multiplier = 0.5 + 0.5 * relations_score
+        quality_multiplier = quality_floor + (1.0 - quality_floor) * relations_score
     else:
         # No relations: use equilibrium score similarly
         # min_quality = 0.5 (even if equilibrium completely fails)
-        quality_multiplier = 0.5 + 0.5 * equilibrium_score
+        quality_multiplier = quality_floor + (1.0 - quality_floor) * equilibrium_score
     
     final_score = base_score * coverage_factor * quality_multiplier
     
     # Clamp to [0, 1]
     final_score = clamp(final_score, 0.0, 1.0)
-    
-    return {
-        'score': final_score,
-        'feedback': feedback,
-        'details': details,
-        'coverage': coverage,
-        'equilibrium_score': equilibrium_score,
-        'relations_score': relations_score,
-        'overlays': overlays,
-    }
+    return final_score, coverage
 
 def match_forces_to_expected(
     expected_dict: Dict[str, object],
     drawn_forces: Sequence[object],
     ang_tol: float,
     ang_span: float,
+    *,
+    alias_sets: Optional[Dict[str, frozenset]] = None,
+    backend: Optional[str] = None,
+    strategy: Optional[str] = None,
+    pair_scores: Optional[PairScores] = None,
 ) -> Dict[str, object]:
     """
     Match drawn forces to expected forces.
@@ -988,64 +1456,523 @@ def match_forces_to_expected(
       - Sort pairs by score descending and greedily assign unique matches so each expected and drawn is used at most once.
       - Uses same scoring heuristic and threshold (0.2) as before.
 
-    Returns (matched, used_indices).
+    alias_sets: optional precomputed {task_force_name: frozenset of normalized name + aliases}
+    (see compile_task). Built here when not given.
+    backend: "python", "numpy" or "auto" (default MATCH_BACKEND). The NumPy backend
+    computes the whole score matrix in array operations and gives the same matches.
+    strategy: "greedy" (default MATCH_STRATEGY) or "optimal", which maximizes the summed
+    score with a linear-assignment solver under the same threshold.
+
+    When every expected force is named by exactly one drawn arrow, the named pairs are
+    taken directly without scoring or sorting all pairs (same result for both strategies).
+
+    pair_scores: optional empty PairScores; it keeps the pair scores and the matching for
+    near-miss queries (pair_scores.top_k(name), pair_scores.near_misses()).
+
+    Returns {expected name: matched drawn force}: the drawn force object itself, or a
+    DrawnForce (ForceBatch.force) when drawn_forces is a ForceBatch. Unmatched expected
+    forces are absent.
     """
-    # Collect all pairwise scores
-    pairs = []  # (score, task_force_name, drawn_idx)
-    for task_force_name, expected_spec in expected_dict.items():
-        for idx, drawn_f in enumerate(drawn_forces):
-            # Name match?
-            name_match = False
-            if hasattr(drawn_f, 'name') and drawn_f.name:
-                drawn_name = normalize_name(drawn_f.name)
-                task_force_name_norm = normalize_name(task_force_name)
-                if drawn_name == task_force_name_norm:
-                    name_match = True
-                elif drawn_name in {normalize_name(a) for a in expected_spec.aliases}:
-                    name_match = True
-
-            # Direction match?
-            if hasattr(drawn_f, 'vec') and expected_spec.dir_unit:
-                angle_err = angle_error_deg(drawn_f.vec, expected_spec.dir_unit)
-            else:
-                angle_err = 180.0
+    alias_sets = alias_sets or {}
+    forces = [
+        _compile_force(name, spec, accepted=alias_sets.get(name))
+        for name, spec in expected_dict.items()
+    ]
+    batch = as_force_batch(drawn_forces)
+    matched = _match_compiled(
+        forces, batch, ang_tol, ang_span, backend=backend, strategy=strategy, pair_scores=pair_scores,
+    )
+    if isinstance(drawn_forces, ForceBatch):
+        return {name: batch.force(idx) for name, idx in matched.items()}
+    return {name: drawn_forces[idx] for name, idx in matched.items()}
+
+def _resolve_backend(backend: Optional[str], num_pairs: int) -> str:
+    backend = backend or MATCH_BACKEND
+    if backend == "auto":
+        # Small problems never import NumPy
+        return "numpy" if (num_pairs >= NUMPY_MIN_PAIRS and _numpy() is not None) else "python"
+    if backend == "numpy" and _numpy() is None:
+        raise ImportError("match backend 'numpy' krever NumPy")
+    if backend not in ("python", "numpy"):
+        raise ValueError(f"Ukjent backend: {backend}")
+    return backend
+
+def _alias_rows(forces: Sequence[CompiledForce]) -> Dict[str, Tuple[int, ...]]:
+    """Reverse alias index: normalized alias -> indices of the expected forces accepting it."""
+    rows: Dict[str, List[int]] = {}
+    for i, cf in enumerate(forces):
+        for alias in cf.aliases:
+            rows.setdefault(alias, []).append(i)
+    return {alias: tuple(idx) for alias, idx in rows.items()}
+
+def _pair_score(cf: CompiledForce, drawn_unit: Optional[Vec2], name_match: bool, ang_tol: float, ang_span: float) -> float:
+    """Match score for one (expected, drawn) pair; drawn_unit = unit(drawn vec), None without vec."""
+    # Direction match?
+    if drawn_unit is not None and cf.dir_unit is not None:
+        angle_err = _angle_error_units(drawn_unit, cf.dir_unit)
+    else:
+        angle_err = 180.0
 
-            dir_match = ramp_down_linear(angle_err, ang_tol, ang_span)
+    dir_match = ramp_down_linear(angle_err, ang_tol, ang_span)
 
-            if name_match:
-                combined = 0.5 + 0.5 * dir_match
-            else:
-                combined = NAME_MISMATCH_PENALTY * dir_match
+    if name_match:
+        return 0.5 + 0.5 * dir_match
+    return NAME_MISMATCH_PENALTY * dir_match
+
+def _drawn_units(batch: ForceBatch) -> List[Optional[Vec2]]:
+    """unit(vec) per drawn force, computed once per submission (None when the force has no vec)."""
+    out: List[Optional[Vec2]] = []
+    for j in range(len(batch)):
+        v = batch.vec_at(j)
+        out.append(unit(v) if v is not None else None)
+    return out
+
+def _match_compiled(
+    forces: Sequence[CompiledForce],
+    batch: ForceBatch,
+    ang_tol: float,
+    ang_span: float,
+    *,
+    backend: Optional[str] = None,
+    strategy: Optional[str] = None,
+    alias_rows: Optional[Dict[str, Tuple[int, ...]]] = None,
+    stats: Optional[EvalTimings] = None,
+    pair_scores: Optional["PairScores"] = None,
+) -> Dict[str, int]:
+    """
+    match_forces_to_expected on compiled expected forces; returns {expected name: drawn index}.
+    stats: optional EvalTimings receiving the pairs_scored / fast_path counters.
+    pair_scores: optional PairScores that keeps the score matrix and the matching (near-miss queries).
+    """
+    strategy = strategy or MATCH_STRATEGY
+    if strategy not in ("greedy", "optimal"):
+        raise ValueError(f"Ukjent matching-strategi: {strategy}")
+    if alias_rows is None:
+        alias_rows = _alias_rows(forces)
+
+    # Resolve each drawn name once: expected rows it names (one dict lookup per drawn force)
+    name_rows = [
+        alias_rows.get(_normalize_name_cached(name), ()) if name else ()
+        for name in batch.names
+    ]
+
+    if pair_scores is None:
+        return _match_named(forces, batch, name_rows, ang_tol, ang_span, backend, strategy, stats)
+    pair_scores.bind(forces, batch, name_rows, ang_tol, ang_span)
+    matched = _match_named(forces, batch, name_rows, ang_tol, ang_span, backend, strategy, stats, pair_scores)
+    pair_scores.matched = matched
+    return matched
+
+def _match_named(
+    forces: Sequence[CompiledForce],
+    batch: ForceBatch,
+    name_rows: Sequence[Tuple[int, ...]],
+    ang_tol: float,
+    ang_span: float,
+    backend: Optional[str],
+    strategy: str,
+    stats: Optional[EvalTimings],
+    pair_scores: Optional["PairScores"] = None,
+) -> Dict[str, int]:
+    """_match_compiled once drawn names are resolved to expected rows (name_rows)."""
+    if _resolve_backend(backend, len(forces) * len(batch)) == "numpy":
+        fast = _match_unique_names(forces, None, name_rows, ang_tol, ang_span, batch)
+        if fast is not None:
+            if stats is not None:
+                stats.count('fast_path')
+                stats.count('pairs_scored', len(forces))
+            return fast
+        if stats is not None:
+            stats.count('pairs_scored', len(forces) * len(batch))
+        scores = _pair_scores_numpy(forces, batch, name_rows, ang_tol, ang_span)
+        if pair_scores is not None:
+            pair_scores.scores = scores.ravel()
+        if strategy == "optimal":
+            return _match_optimal(forces, len(batch), scores.tolist())
+        return _match_numpy(forces, len(batch), scores)
+
+    units = _drawn_units(batch)
+    fast = _match_unique_names(forces, units, name_rows, ang_tol, ang_span)
+    if fast is not None:
+        if stats is not None:
+            stats.count('fast_path')
+            stats.count('pairs_scored', len(forces))
+        return fast
+    if stats is not None:
+        stats.count('pairs_scored', len(forces) * len(batch))
+
+    # Collect all pairwise scores
+    named = [[False] * len(batch) for _ in forces]
+    for idx, rows_for_name in enumerate(name_rows):
+        for i in rows_for_name:
+            named[i][idx] = True
+    rows = [
+        [
+            _pair_score(cf, u, named[i][idx], ang_tol, ang_span)
+            for idx, u in enumerate(units)
+        ]
+        for i, cf in enumerate(forces)
+    ]
+    if pair_scores is not None:
+        pair_scores.scores = array('d', itertools.chain.from_iterable(rows))
+    if strategy == "optimal":
+        return _match_optimal(forces, len(batch), rows)
+    return _match_greedy(forces, rows)
+
+class PairScores:
+    """
+    The (expected x drawn) pair scores of one matching, kept for near-miss diagnostics.
+
+    Pass an empty PairScores to _match_compiled / match_forces_to_expected (or use
+    evaluate_task(keep_scores=True)); matching stores the score matrix it computed anyway,
+    flat and row-major (array('d'), or the NumPy matrix on that backend), plus the matching.
+    Queries rank candidates by that stored score and recompute the name/direction breakdown
+    only for the candidates they return. When matching took the named-pairs fast path there
+    is no matrix; the first query scores all pairs then (matching is not run again).
+    """
 
-            pairs.append((combined, task_force_name, idx))
+    __slots__ = ('forces', 'batch', 'name_rows', 'ang_tol', 'ang_span', 'scores', 'matched', '_units')
+
+    def __init__(self):
+        self.forces: Sequence[CompiledForce] = ()
+        self.batch: Optional[ForceBatch] = None
+        self.name_rows: Sequence[Tuple[int, ...]] = ()
+        self.ang_tol = self.ang_span = 0.0
+        self.scores = None
+        self.matched: Dict[str, int] = {}
+        self._units: Optional[List[Optional[Vec2]]] = None
+
+    def bind(self, forces, batch: ForceBatch, name_rows, ang_tol: float, ang_span: float) -> None:
+        self.forces, self.batch, self.name_rows = forces, batch, name_rows
+        self.ang_tol, self.ang_span = ang_tol, ang_span
+        self.scores = None
+        self.matched = {}
+        self._units = None
+
+    def _drawn_units(self) -> List[Optional[Vec2]]:
+        if self._units is None:
+            self._units = _drawn_units(self.batch)
+        return self._units
+
+    def _row(self, i: int) -> Sequence[float]:
+        D = len(self.batch)
+        if self.scores is None:
+            units = self._drawn_units()
+            self.scores = array('d', (
+                _pair_score(cf, u, k in self.name_rows[j], self.ang_tol, self.ang_span)
+                for k, cf in enumerate(self.forces)
+                for j, u in enumerate(units)
+            ))
+        return self.scores[i * D:(i + 1) * D]
+
+    def _index(self, name: str) -> int:
+        for i, cf in enumerate(self.forces):
+            if cf.name == name:
+                return i
+        raise KeyError(f"Ukjent kraft: {name}")
+
+    def score(self, name: str, drawn_idx: int) -> float:
+        """Match score of (expected force name, drawn force drawn_idx)."""
+        return float(self._row(self._index(name))[drawn_idx])
+
+    def top_k(self, name: str, k: int = 3) -> List[Dict[str, object]]:
+        """
+        The k drawn forces scoring highest against expected force `name` (score descending,
+        ties in drawn order), each as a dict:
+            drawn, drawn_name   - drawn index and name
+            score               - pair score used by matching
+            name_match          - the drawn name is the force's name or an alias
+            dir_match           - direction score in [0, 1]
+            angle_err           - degrees between drawn and expected direction (None without one)
+            matched_to          - expected force this drawn force was matched to, or None
+            above_threshold     - score > MATCH_THRESHOLD (could be matched at all)
+        """
+        i = self._index(name)
+        cf = self.forces[i]
+        row = self._row(i)
+        units = self._drawn_units()
+        owner = {j: n for n, j in self.matched.items()}
+        out = []
+        for j in heapq.nlargest(k, range(len(row)), key=row.__getitem__):
+            u = units[j]
+            angle_err = _angle_error_units(u, cf.dir_unit) if (u is not None and cf.dir_unit is not None) else None
+            score = float(row[j])
+            out.append({
+                'drawn': j,
+                'drawn_name': self.batch.names[j],
+                'score': score,
+                'name_match': i in self.name_rows[j],
+                'dir_match': ramp_down_linear(180.0 if angle_err is None else angle_err, self.ang_tol, self.ang_span),
+                'angle_err': angle_err,
+                'matched_to': owner.get(j),
+                'above_threshold': score > MATCH_THRESHOLD,
+            })
+        return out
+
+    def near_misses(self, k: int = 3) -> Dict[str, List[Dict[str, object]]]:
+        """{expected name: top_k(name, k)} for every expected force left unmatched."""
+        return {cf.name: self.top_k(cf.name, k) for cf in self.forces if cf.name not in self.matched}
+
+def _match_greedy(forces: Sequence[CompiledForce], rows: List[List[float]]) -> Dict[str, int]:
+    """Greedy unique matching from the pair score matrix rows[expected][drawn]."""
+    pairs = []  # (score, task_force_name, drawn_idx)
+    for cf, row in zip(forces, rows):
+        for idx, combined in enumerate(row):
+            pairs.append((combined, cf.name, idx))
 
     # Sort pairs by score descending and greedily pick unique matches
     pairs.sort(key=lambda x: x[0], reverse=True)
-    matched: Dict[str, object] = {}
+    matched: Dict[str, int] = {}
     used_drawn = set()
     used_expected = set()
     for score, task_name, idx in pairs:
-        if score <= 0.2:
+        if score <= MATCH_THRESHOLD:
             continue
         if task_name in used_expected or idx in used_drawn:
             continue
-        matched[task_name] = drawn_forces[idx]
+        matched[task_name] = idx
         used_drawn.add(idx)
         used_expected.add(task_name)
 
     return matched
 
-def is_name_expected(drawn_f: object, task_force_name: str, expected_spec: object) -> bool:
+def _match_unique_names(
+    forces: Sequence[CompiledForce],
+    units: Optional[Sequence[Optional[Vec2]]],
+    name_rows: Sequence[Tuple[int, ...]],
+    ang_tol: float,
+    ang_span: float,
+    batch: Optional[ForceBatch] = None,
+) -> Optional[Dict[str, int]]:
+    """
+    Fast path: when every expected force is named by exactly one drawn force (and no drawn
+    force names two of them), and every such pair has a direction score > 0, the named pairs
+    all score above 0.5 while any other pair scores at most 0.5. Both greedy and optimal then
+    pick exactly the named pairs, so no pair matrix or sort is needed.
+
+    name_rows[j]: indices of the expected forces named by drawn force j.
+    units: drawn unit vectors (or None to compute the few needed ones from batch).
+    Returns None when the precondition does not hold.
+    """
+    if not forces:
+        return None
+    pick = [-1] * len(forces)
+    for j, rows_for_name in enumerate(name_rows):
+        if len(rows_for_name) > 1:
+            return None  # drawn name accepted by two expected forces
+        for i in rows_for_name:
+            if pick[i] != -1:
+                return None  # two drawn forces name the same expected force
+            pick[i] = j
+    if -1 in pick:
+        return None
+
+    scored = []
+    for i, (cf, j) in enumerate(zip(forces, pick)):
+        if units is not None:
+            u = units[j]
+        else:
+            v = batch.vec_at(j)
+            u = unit(v) if v is not None else None
+        score = _pair_score(cf, u, True, ang_tol, ang_span)
+        if score <= max(0.5, NAME_MISMATCH_PENALTY):
+            return None  # may tie with an unnamed pair: let the full matcher decide
+        scored.append((score, i, j))
+    # Insert in the order the greedy loop would (score descending, stable)
+    scored.sort(key=lambda x: x[0], reverse=True)
+    return {forces[i].name: j for _, i, j in scored}
+
+def _match_optimal(
+    forces: Sequence[CompiledForce],
+    num_drawn: int,
+    rows: List[List[float]],
+) -> Dict[str, int]:
+    """
+    Optimal unique assignment: maximize the summed pair score over pairs above MATCH_THRESHOLD.
+    Pairs at or below the threshold get weight 0 and are dropped after solving.
+    """
+    matched: Dict[str, int] = {}
+    if not forces or not num_drawn:
+        return matched
+    weights = [[s if s > MATCH_THRESHOLD else 0.0 for s in row] for row in rows]
+    for i, j in _linear_sum_assignment_max(weights):
+        if weights[i][j] > 0.0:
+            matched[forces[i].name] = j
+    return matched
+
+def _linear_sum_assignment_max(weights: List[List[float]]) -> List[Tuple[int, int]]:
+    """
+    Maximum-weight assignment on a rectangular matrix, as (row, col) pairs sorted by row.
+    Uses SciPy when installed, otherwise a pure-Python Hungarian algorithm (O(n^2 m)).
+    """
+    try:
+        from scipy.optimize import linear_sum_assignment
+    except ImportError:
+        linear_sum_assignment = None
+    if linear_sum_assignment is not None:
+        r, c = linear_sum_assignment(weights, maximize=True)
+        return list(zip(r.tolist(), c.tolist()))
+
+    n, m = len(weights), len(weights[0])
+    transposed = n > m
+    if transposed:
+        weights = [list(col) for col in zip(*weights)]
+        n, m = m, n
+    # Minimize -w; potentials u (rows), v (cols), p[j] = row assigned to col j (1-based)
+    INF = float('inf')
+    u = [0.0] * (n + 1)
+    v = [0.0] * (m + 1)
+    p = [0] * (m + 1)
+    way = [0] * (m + 1)
+    for i in range(1, n + 1):
+        p[0] = i
+        j0 = 0
+        minv = [INF] * (m + 1)
+        used = [False] * (m + 1)
+        while True:
+            used[j0] = True
+            i0 = p[j0]
+            delta = INF
+            j1 = 0
+            row = weights[i0 - 1]
+            for j in range(1, m + 1):
+                if not used[j]:
+                    cur = -row[j - 1] - u[i0] - v[j]
+                    if cur < minv[j]:
+                        minv[j] = cur
+                        way[j] = j0
+                    if minv[j] < delta:
+                        delta = minv[j]
+                        j1 = j
+            for j in range(m + 1):
+                if used[j]:
+                    u[p[j]] += delta
+                    v[j] -= delta
+                else:
+                    minv[j] -= delta
+            j0 = j1
+            if p[j0] == 0:
+                break
+        while True:
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+            if j0 == 0:
+                break
+    pairs = [(p[j] - 1, j - 1) for j in range(1, m + 1) if p[j]]
+    if transposed:
+        pairs = [(j, i) for i, j in pairs]
+    return sorted(pairs)
+
+def _pair_scores_numpy(
+    forces: Sequence[CompiledForce],
+    batch: ForceBatch,
+    name_rows: Sequence[Tuple[int, ...]],
+    ang_tol: float,
+    ang_span: float,
+):
+    """
+    (E, D) matrix of match scores, same heuristic as the pure-Python loop in _match_compiled:
+    0.5 + 0.5*dir_match if the name matches, else NAME_MISMATCH_PENALTY*dir_match.
+
+    Scores are bit-identical to _pair_score, so both backends make the same choices even
+    between tied pairs or tied assignments: drawn unit vectors come from unit() (math.hypot),
+    and angles are only taken where they matter, with math.acos (np.arccos differs in the
+    last bit). Pairs whose cosine is clearly inside the tolerance or clearly past the ramp
+    get their dir_match from the comparison alone.
+    """
+    np = _numpy()
+    E, D = len(forces), len(batch)
+
+    # Drawn unit vectors as in the Python path (invalid rows -> 180° error)
+    units = _drawn_units(batch)
+    U = np.array([u if u is not None else (0.0, 0.0) for u in units], dtype=np.float64).reshape(D, 2)
+    v_ok = np.array([u is not None and u != (0.0, 0.0) for u in units], dtype=bool)
+
+    # Expected unit directions (precomputed in CompiledForce)
+    T = np.zeros((E, 2))
+    t_ok = np.zeros(E, dtype=bool)
+    for i, cf in enumerate(forces):
+        if cf.dir_unit is not None and cf.dir_unit != (0.0, 0.0):
+            T[i] = cf.dir_unit
+            t_ok[i] = True
+
+    cos = np.clip(T[:, 0:1] * U[:, 0] + T[:, 1:2] * U[:, 1], -1.0, 1.0)
+    ok = t_ok[:, None] & v_ok[None, :]
+    # Angle stand-ins outside the ramp band: 0° (within tolerance) or 180° (past the ramp)
+    ang = np.full((E, D), 180.0)
+    lo_deg = ang_tol + max(ang_span, 0.0)
+    cos_in = math.cos(math.radians(ang_tol)) + ANGLE_BAND_EPS if ang_tol > 0.0 else math.inf
+    cos_out = math.cos(math.radians(lo_deg)) - ANGLE_BAND_EPS if lo_deg < 180.0 else -math.inf
+    ang[ok & (cos > cos_in)] = 0.0
+    band = ok & (cos <= cos_in) & (cos >= cos_out)
+    if band.any():
+        ang[band] = [math.degrees(math.acos(c)) for c in cos[band].tolist()]
+
+    # ramp_down_linear, elementwise
+    a = np.abs(ang)
+    if ang_span <= 0.0:
+        dir_match = np.where(a <= ang_tol, 1.0, 0.0)
+    else:
+        dir_match = np.where(a <= ang_tol, 1.0, np.clip(1.0 - (a - ang_tol) / ang_span, 0.0, 1.0))
+
+    # Name matches from the per-drawn-force alias lookups
+    name_match = np.zeros((E, D), dtype=bool)
+    for j, rows in enumerate(name_rows):
+        if rows:
+            name_match[list(rows), j] = True
+
+    return np.where(name_match, 0.5 + 0.5 * dir_match, NAME_MISMATCH_PENALTY * dir_match)
+
+def _match_numpy(
+    forces: Sequence[CompiledForce],
+    num_drawn: int,
+    scores,
+) -> Dict[str, int]:
+    """Greedy unique assignment on the NumPy score matrix (same order and threshold as the Python path)."""
+    E, D = len(forces), num_drawn
+    matched: Dict[str, int] = {}
+    if E == 0 or D == 0:
+        return matched
+    np = _numpy()
+    flat = scores.ravel()
+    # Stable sort keeps (expected, drawn) row-major order among ties, like list.sort
+    order = np.argsort(-flat, kind='stable')
+    used_expected = [False] * E
+    used_drawn = [False] * D
+    n_max = min(E, D)
+    for k in order.tolist():
+        if flat[k] <= MATCH_THRESHOLD:
+            break  # sorted: the rest is below threshold too
+        i, j = divmod(k, D)
+        if used_expected[i] or used_drawn[j]:
+            continue
+        matched[forces[i].name] = j
+        used_expected[i] = True
+        used_drawn[j] = True
+        if len(matched) == n_max:
+            break
+    return matched
+
+def is_name_expected(
+    drawn_f: object,
+    task_force_name: str,
+    expected_spec: object,
+    accepted: Optional[frozenset] = None,
+) -> bool:
     """
     Return True if drawn_f.name matches canonical task_force_name or any alias (case-insensitive).
+
+    accepted: optional precomputed frozenset of normalized name + aliases.
     """
     if not (hasattr(drawn_f, 'name') and drawn_f.name):
         return False
-    drawn_name = normalize_name(drawn_f.name)
-    task_force_name_norm = normalize_name(task_force_name)
-    if drawn_name == task_force_name_norm:
+    drawn_name = _normalize_name_cached(drawn_f.name)
+    if accepted is not None:
+        return drawn_name in accepted
+    if drawn_name == _normalize_name_cached(task_force_name):
         return True
-    if drawn_name in {normalize_name(a) for a in expected_spec.aliases}:
+    if drawn_name in _normalized_alias_set(tuple(expected_spec.aliases)):
         return True
     return False
 
@@ -1062,7 +1989,40 @@ class EvaluationResult(dict):
         print(result.getScoresString())
         print(result.getFeedbackString())
         print(result.getOverlaysString())
+
+    With want="score+feedback" the 'overlays' key is absent until result.overlays is read;
+    the overlay dicts are then built once from the compact log and stored under 'overlays'.
+
+    With instrumentation enabled, result.timings holds the EvalTimings (not a dict key,
+    so the JSON payload is unchanged). Likewise result.pair_scores with keep_scores=True.
     """
+    # (plan, overlay_log) until overlays are materialized
+    _overlay_source: Optional[Tuple[CompiledTask, List[tuple]]] = None
+    timings: Optional[EvalTimings] = None
+    pair_scores: Optional[PairScores] = None
+
+    def defer_overlays(self, plan: CompiledTask, overlay_log: List[tuple]) -> None:
+        """Build overlays from overlay_log (see _build_overlays) on first access of .overlays."""
+        self._overlay_source = (plan, overlay_log)
+
+    @property
+    def overlay_log(self) -> Optional[List[tuple]]:
+        """The compact overlay log while overlays are still deferred, else None."""
+        return self._overlay_source[1] if self._overlay_source is not None else None
+
+    @property
+    def overlays(self) -> Dict[Union[str, int], List[Dict]]:
+        if self._overlay_source is not None:
+            plan, overlay_log = self._overlay_source
+            self['overlays'] = _build_overlays(plan, overlay_log)
+            self._overlay_source = None
+        return self.get('overlays', {})
+
+    def near_misses(self, k: int = 3) -> Dict[str, List[Dict[str, object]]]:
+        """Nearest drawn candidates of every unmatched expected force (needs keep_scores=True)."""
+        if self.pair_scores is None:
+            raise ValueError("near_misses krever evaluate_task(..., keep_scores=True)")
+        return self.pair_scores.near_misses(k)
     
     def getScoresString(self) -> str:
         """Return formatted scores as a string."""
@@ -1081,6 +2041,13 @@ class EvaluationResult(dict):
             f"  Relations Score:    {rel_str}"
         )
     
+    def getTimingsString(self) -> str:
+        """Return formatted phase timings and counters as a string."""
+        if self.timings is None:
+            return "TIMINGS: (not instrumented)"
+        from problem.instrumentation import format_timings
+        return format_timings(self.timings.phases, self.timings.counters)
+    
     def getFeedbackString(self) -> str:
         """Return formatted feedback as a string."""
         feedback = self.get('feedback', [])
@@ -1094,7 +2061,7 @@ class EvaluationResult(dict):
     
     def getOverlaysString(self) -> str:
         """Return formatted overlays as a string."""
-        overlays = self.get('overlays', {})
+        overlays = self.overlays
         if not overlays:
             return "OVERLAYS: (none)"
         out = ["OVERLAYS:"]
@@ -1105,6 +2072,27 @@ class EvaluationResult(dict):
                 out.append(f"    - {ov.get('type')}: {ov}")
         return "\n".join(out)
     
+    def getNearMissesString(self, k: int = 3) -> str:
+        """Return the near misses of unmatched forces as a string (keep_scores=True)."""
+        if self.pair_scores is None:
+            return "NEAR MISSES: (keep_scores=False)"
+        misses = self.pair_scores.near_misses(k)
+        if not misses:
+            return "NEAR MISSES: (alle krefter funnet)"
+        out = [f"NEAR MISSES (top {k}):"]
+        for name, candidates in misses.items():
+            out.append(f"  {name}:")
+            if not candidates:
+                out.append("      (ingen tegnede krefter)")
+            for c in candidates:
+                angle = "-" if c['angle_err'] is None else f"{c['angle_err']:.1f}°"
+                taken = f", brukt av {c['matched_to']}" if c['matched_to'] is not None else ""
+                out.append(
+                    f"      #{c['drawn']} '{c['drawn_name']}': score {c['score']:.3f} "
+                    f"(navn {'ja' if c['name_match'] else 'nei'}, retning {c['dir_match']:.2f}, vinkel {angle}{taken})"
+                )
+        return "\n".join(out)
+
     def getDetailsString(self) -> str:
         """Return formatted details as a string."""
         details = self.get('details', {})
@@ -1124,3 +2112,21 @@ class EvaluationResult(dict):
             else:
                 out.append(f"  {key}: {value}")
         return "\n".join(out)
+
+def json_safe(obj):
+    """
+    Copy of a result payload that strict JSON can hold: non-finite floats (inf ratio errors,
+    positions without an anchor) become None, tuples become lists. Browsers' JSON.parse
+    rejects the Infinity/NaN tokens json.dumps would otherwise write.
+    """
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None
+    if isinstance(obj, dict):
+        return {k: json_safe(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [json_safe(v) for v in obj]
+    return obj
+
+def result_json(obj) -> str:
+    """json.dumps of json_safe(obj); allow_nan=False so a missed non-finite value fails loudly."""
+    return json.dumps(json_safe(obj), ensure_ascii=False, allow_nan=False)
@@ -0,0 +1,144 @@
+# ./problem/grading_pool.py
+"""
+Prosess-pool for retting: mange besvarelser av samme oppgave fordelt på flere kjerner.
+
+Each worker receives the compiled task once (pool initializer) and then only
+lightweight force tuples (name, vec, anchor, editable[, arrowBase]).
+Results are returned in submission order.
+
+With want="score+feedback" workers send back only the compact overlay log;
+overlays are built in the parent (against its own plan) when accessed.
+
+Usage:
+    with GradingPool(task_spec, workers=4, chunksize=32) as pool:
+        for result in pool.grade(submissions):
+            print(result['score'])
+"""
+from __future__ import annotations
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+import multiprocessing
+import os
+import time
+
+from problem.drawn_forces import DrawnForce, ForceBatch
+from problem.evaluate import CompiledTask, EvaluationResult, WANT_LEVELS, compile_task, _evaluate_compiled
+
+Vec2 = Tuple[float, float]
+ForceTuple = Tuple[str, Optional[Vec2], Optional[Vec2], bool, Optional[Vec2]]
+
+DEFAULT_CHUNKSIZE = 16
+
+# ------------------------------------------------------
+# Wire format (parent -> worker)
+# ------------------------------------------------------
+
+def force_tuple(f: object) -> ForceTuple:
+    """Reduce a drawn force (engine Force or similar) to (name, vec, anchor, editable, arrowBase)."""
+    return DrawnForce.from_object(f).as_tuple()
+
+# ------------------------------------------------------
+# Worker side
+# ------------------------------------------------------
+
+_WORKER_PLAN: Optional[CompiledTask] = None
+_WORKER_WANT = "full"
+
+def _init_worker(plan: CompiledTask, want: str = "full") -> None:
+    global _WORKER_PLAN, _WORKER_WANT
+    _WORKER_PLAN = plan
+    _WORKER_WANT = want
+
+def _grade_one(forces: Sequence[ForceTuple]) -> Tuple[Dict[str, object], Optional[List[tuple]]]:
+    """(plain result dict, overlay log if overlays are deferred)"""
+    result = _evaluate_compiled(_WORKER_PLAN, ForceBatch.from_tuples(forces), _WORKER_WANT)
+    return dict(result), result.overlay_log
+
+# ------------------------------------------------------
+# Pool
+# ------------------------------------------------------
+
+class GradingPool:
+    """
+    Process pool grading submissions of one task.
+
+    workers: number of processes (default os.cpu_count())
+    chunksize: submissions per task message sent to a worker
+    want: detail level passed to the evaluator ("score", "score+feedback" or "full")
+    """
+
+    def __init__(
+        self,
+        task_spec: object,
+        *,
+        workers: Optional[int] = None,
+        chunksize: int = DEFAULT_CHUNKSIZE,
+        want: str = "full",
+    ):
+        if want not in WANT_LEVELS:
+            raise ValueError(f"Ukjent want: {want}")
+        self.plan = task_spec if isinstance(task_spec, CompiledTask) else compile_task(task_spec)
+        self.workers = workers or os.cpu_count() or 1
+        self.chunksize = max(1, int(chunksize))
+        self.want = want
+        self._pool = multiprocessing.Pool(self.workers, initializer=_init_worker, initargs=(self.plan, want))
+
+    def grade(self, submissions: Iterable[Sequence[object]]) -> Iterator[EvaluationResult]:
+        """Grade submissions (lists of drawn forces), yielding results in submission order."""
+        wire = ([force_tuple(f) for f in forces] for forces in submissions)
+        for result, overlay_log in self._pool.imap(_grade_one, wire, self.chunksize):
+            out = EvaluationResult(result)
+            if overlay_log is not None:
+                out.defer_overlays(self.plan, overlay_log)
+            yield out
+
+    def close(self) -> None:
+        self._pool.close()
+        self._pool.join()
+
+    def terminate(self) -> None:
+        self._pool.terminate()
+        self._pool.join()
+
+    def __enter__(self) -> "GradingPool":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.terminate()
+
+def grade_parallel(
+    task_spec: object,
+    submissions: Iterable[Sequence[object]],
+    *,
+    workers: Optional[int] = None,
+    chunksize: int = DEFAULT_CHUNKSIZE,
+    want: str = "full",
+) -> List[EvaluationResult]:
+    """Grade all submissions with a temporary pool; same order as the input."""
+    with GradingPool(task_spec, workers=workers, chunksize=chunksize, want=want) as pool:
+        return list(pool.grade(submissions))
+
+def benchmark_scaling(
+    task_spec: object,
+    submissions: Sequence[Sequence[object]],
+    worker_counts: Sequence[int] = (1, 2, 4),
+    *,
+    chunksize: int = DEFAULT_CHUNKSIZE,
+    want: str = "full",
+) -> Dict[int, float]:
+    """
+    Throughput (submissions per second) per worker count.
+    Pool start-up is excluded; each run grades the full submission list once.
+    """
+    plan = task_spec if isinstance(task_spec, CompiledTask) else compile_task(task_spec)
+    out: Dict[int, float] = {}
+    for n in worker_counts:
+        with GradingPool(plan, workers=n, chunksize=chunksize, want=want) as pool:
+            t0 = time.perf_counter()
+            for _ in pool.grade(submissions):
+                pass
+            dt = time.perf_counter() - t0
+        out[n] = len(submissions) / dt if dt > 0 else float('inf')
+    return out
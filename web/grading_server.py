@@ -0,0 +1,314 @@
+# ./problem/grading_server.py
+"""
+Asynkron rettetjeneste: evaluate_task bak et web-endepunkt uten å blokkere event-loopen.
+
+GradingService collects concurrent requests per (task, want) for up to batch_window
+seconds (or max_batch requests) and grades them as one batch in an executor, so one
+compiled plan is sent once per batch instead of once per request.
+
+Limits:
+  - max_pending: requests queued or being graded; beyond it grade() raises Overloaded at once
+  - max_batches: batches graded concurrently (executor slots); other batches wait
+  - timeout: per-request deadline (default_timeout unless given). A request whose deadline
+    passes while it waits is dropped from its batch before grading; one that expires
+    during grading gets DeadlineExceeded and its result is discarded.
+
+The executor defaults to the event loop's thread pool. A concurrent.futures.ProcessPoolExecutor
+gives parallel grading (plans and force batches are pickled per batch; overlays are sent
+back as the compact log and rebuilt in the parent, as in grading_pool).
+
+handle_json() is the endpoint body: request JSON in, response JSON out, with an HTTP-like
+status; overlays are part of the response only for want="full". LocalClient calls it
+in-process, so the service can be exercised without a server.
+
+Usage:
+    async with GradingService(TASKS, max_pending=256, default_timeout=2.0) as service:
+        client = LocalClient(service)
+        reply = await client.evaluate('skråplan', forces_json)
+        print(reply['status'], reply['result']['score'])
+"""
+from __future__ import annotations
+from concurrent.futures import Executor
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+import asyncio
+import json
+
+from problem.drawn_forces import ForceBatch, as_force_batch, check_force_json
+from problem.evaluate import CompiledTask, EvaluationResult, WANT_LEVELS, _evaluate_compiled, result_json
+from problem.regrade import TaskPlans
+
+DEFAULT_MAX_PENDING = 1024
+DEFAULT_MAX_BATCH = 64
+DEFAULT_BATCH_WINDOW = 0.002  # seconds a batch stays open for more requests
+DEFAULT_WANT = "score+feedback"
+
+class Overloaded(RuntimeError):
+    """Too many pending requests (HTTP 503)."""
+
+class DeadlineExceeded(asyncio.TimeoutError):
+    """The request's deadline passed before its result was ready (HTTP 504)."""
+
+# ------------------------------------------------------
+# Executor side
+# ------------------------------------------------------
+
+def _grade_batch(plan: CompiledTask, batches: Sequence[ForceBatch], want: str) -> List[tuple]:
+    """Per submission ('ok', result dict, overlay log) or ('error', exception)."""
+    out = []
+    for batch in batches:
+        try:
+            result = _evaluate_compiled(plan, batch, want)
+            out.append(('ok', dict(result), result.overlay_log))
+        except Exception as exc:  # one bad submission must not fail its batch
+            out.append(('error', exc))
+    return out
+
+# ------------------------------------------------------
+# Service
+# ------------------------------------------------------
+
+class _Request:
+    __slots__ = ('batch', 'future', 'deadline')
+
+    def __init__(self, batch: ForceBatch, future: asyncio.Future, deadline: Optional[float]):
+        self.batch = batch
+        self.future = future
+        self.deadline = deadline
+
+    def live(self, now: float) -> bool:
+        return not self.future.done() and (self.deadline is None or now < self.deadline)
+
+class GradingService:
+    """
+    Coalescing grading service for a set of tasks.
+
+    tasks: {task_id: TaskSpec} (a single TaskSpec is used for every task id, as in regrade)
+    executor: where batches are graded (None = the loop's default thread pool)
+    max_pending / max_batches / max_batch / batch_window / default_timeout: see module docstring
+    """
+
+    def __init__(
+        self,
+        tasks: Union[Dict[str, object], object],
+        *,
+        executor: Optional[Executor] = None,
+        want: str = DEFAULT_WANT,
+        max_pending: int = DEFAULT_MAX_PENDING,
+        max_batches: int = 4,
+        max_batch: int = DEFAULT_MAX_BATCH,
+        batch_window: float = DEFAULT_BATCH_WINDOW,
+        default_timeout: Optional[float] = None,
+    ):
+        if want not in WANT_LEVELS:
+            raise ValueError(f"Ukjent want: {want}")
+        if not isinstance(tasks, dict):
+            tasks = {None: tasks}
+        self.plans = TaskPlans({k if k is None else str(k): v for k, v in tasks.items()}, {})
+        self.executor = executor
+        self.want = want
+        self.max_pending = max(1, int(max_pending))
+        self.max_batch = max(1, int(max_batch))
+        self.batch_window = max(0.0, float(batch_window))
+        self.default_timeout = default_timeout
+        self._max_batches = max(1, int(max_batches))
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._queues: Dict[Tuple, List[_Request]] = {}
+        self._timers: Dict[Tuple, asyncio.TimerHandle] = {}
+        self._plan_of: Dict[Tuple, CompiledTask] = {}
+        self._running: set = set()
+        self._pending = 0
+        self._closed = False
+        self.stats: Dict[str, int] = {
+            'requests': 0, 'graded': 0, 'batches': 0, 'rejected': 0, 'expired': 0, 'errors': 0,
+        }
+
+    # --- Lifecycle ---
+
+    async def __aenter__(self) -> "GradingService":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        """Stop accepting requests, grade what is queued and wait for running batches."""
+        self._closed = True
+        for key in list(self._queues):
+            self._flush(key)
+        while self._running:
+            await asyncio.gather(*list(self._running), return_exceptions=True)
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    # --- Requests ---
+
+    async def grade(
+        self,
+        task_id: Optional[str],
+        forces: Union[ForceBatch, Sequence[object]],
+        *,
+        want: Optional[str] = None,
+        timeout: Optional[float] = None,
+    ) -> EvaluationResult:
+        """
+        Grade one submission (forces: ForceBatch, client force dicts or force objects).
+        Raises Overloaded, DeadlineExceeded, KeyError for unknown tasks, or the evaluator's error.
+        """
+        want = want or self.want
+        if want not in WANT_LEVELS:
+            raise ValueError(f"Ukjent want: {want}")
+        if self._closed:
+            raise RuntimeError("Rettetjenesten er stengt")
+        self.stats['requests'] += 1
+        if self._pending >= self.max_pending:
+            self.stats['rejected'] += 1
+            raise Overloaded(f"For mange ventende forespørsler ({self._pending})")
+        plan = self.plans.get(None if task_id is None else str(task_id))
+        if not isinstance(forces, ForceBatch) and forces and isinstance(forces[0], dict):
+            batch = ForceBatch.from_json(forces)
+        else:
+            batch = as_force_batch(forces)
+
+        loop = asyncio.get_running_loop()
+        timeout = self.default_timeout if timeout is None else timeout
+        future = loop.create_future()
+        request = _Request(batch, future, None if timeout is None else loop.time() + timeout)
+        self._pending += 1
+        future.add_done_callback(self._done)
+
+        key = (id(plan), want)
+        queue = self._queues.get(key)
+        if queue is None:
+            queue = self._queues[key] = []
+            self._plan_of[key] = plan
+            self._timers[key] = loop.call_later(self.batch_window, self._flush, key)
+        queue.append(request)
+        if len(queue) >= self.max_batch:
+            self._flush(key)
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            self.stats['expired'] += 1
+            raise DeadlineExceeded(f"Fristen på {timeout:g} s gikk ut") from None
+
+    def _done(self, future: asyncio.Future) -> None:
+        self._pending -= 1
+
+    # --- Batching ---
+
+    def _flush(self, key: Tuple) -> None:
+        """Close the open batch for key and start grading it."""
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        requests = self._queues.pop(key, None)
+        plan = self._plan_of.pop(key, None)
+        if not requests or plan is None:
+            return
+        task = asyncio.ensure_future(self._run_batch(plan, key[1], requests))
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    async def _run_batch(self, plan: CompiledTask, want: str, requests: List[_Request]) -> None:
+        loop = asyncio.get_running_loop()
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self._max_batches)
+        async with self._slots:
+            now = loop.time()
+            live = [r for r in requests if r.live(now)]
+            if not live:
+                return
+            self.stats['batches'] += 1
+            try:
+                graded = await loop.run_in_executor(
+                    self.executor, _grade_batch, plan, [r.batch for r in live], want,
+                )
+            except Exception as exc:  # executor failure (e.g. a broken process pool)
+                for r in live:
+                    if not r.future.done():
+                        r.future.set_exception(exc)
+                return
+        for r, item in zip(live, graded):
+            if r.future.done():  # deadline passed while grading
+                continue
+            if item[0] == 'ok':
+                result = EvaluationResult(item[1])
+                if item[2] is not None:
+                    result.defer_overlays(plan, item[2])
+                self.stats['graded'] += 1
+                r.future.set_result(result)
+            else:
+                self.stats['errors'] += 1
+                r.future.set_exception(item[1])
+
+    # --- Endpoint ---
+
+    async def handle_json(self, body: Union[str, bytes]) -> Tuple[int, str]:
+        """
+        Endpoint body. Request: {"task_id", "forces": [client force dicts], "want"?, "timeout"?}.
+        Every force is checked (drawn_forces.check_force_json) before anything is graded.
+        The response is strict JSON (evaluate.result_json): non-finite numbers are null.
+        Returns (status, response JSON): 200 {"result": {...}} or {"error": "..."} with
+        400 (bad request), 404 (unknown task), 503 (overloaded), 504 (deadline), 500.
+        """
+        try:
+            request = json.loads(body)
+            if not isinstance(request, dict):
+                raise ValueError("forespørselen må være et JSON-objekt")
+            forces = request.get('forces') or []
+            if not isinstance(forces, list):
+                raise ValueError("'forces' må være en liste")
+            for i, force in enumerate(forces):
+                try:
+                    check_force_json(force)
+                except ValueError as exc:
+                    raise ValueError(f"'forces'[{i}]: {exc}") from None
+            want = request.get('want')
+            timeout = request.get('timeout')
+            timeout = None if timeout is None else float(timeout)
+        except (ValueError, TypeError) as exc:
+            return 400, json.dumps({'error': f"Ugyldig forespørsel: {exc}"}, ensure_ascii=False)
+        try:
+            result = await self.grade(request.get('task_id'), forces, want=want, timeout=timeout)
+        except Overloaded as exc:
+            return 503, json.dumps({'error': str(exc)}, ensure_ascii=False)
+        except DeadlineExceeded as exc:
+            return 504, json.dumps({'error': str(exc)}, ensure_ascii=False)
+        except KeyError as exc:
+            return 404, json.dumps({'error': str(exc.args[0]) if exc.args else "Ukjent oppgave"}, ensure_ascii=False)
+        except ValueError as exc:
+            return 400, json.dumps({'error': str(exc)}, ensure_ascii=False)
+        except Exception as exc:
+            return 500, json.dumps({'error': f"{type(exc).__name__}: {exc}"}, ensure_ascii=False)
+        return 200, result_json({'result': dict(result)})
+
+# ------------------------------------------------------
+# In-process client
+# ------------------------------------------------------
+
+class LocalClient:
+    """Calls a GradingService through handle_json, as the web client would over HTTP."""
+
+    def __init__(self, service: GradingService):
+        self.service = service
+
+    async def evaluate(
+        self,
+        task_id: Optional[str],
+        forces: Sequence[Dict],
+        *,
+        want: Optional[str] = None,
+        timeout: Optional[float] = None,
+    ) -> Dict[str, object]:
+        """{'status': int, 'result': {...}} or {'status': int, 'error': str}"""
+        request: Dict[str, object] = {'task_id': task_id, 'forces': list(forces)}
+        if want is not None:
+            request['want'] = want
+        if timeout is not None:
+            request['timeout'] = timeout
+        status, body = await self.service.handle_json(json.dumps(request))
+        reply = json.loads(body)
+        reply['status'] = status
+        return reply
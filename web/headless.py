@@ -0,0 +1,198 @@
+# ./problem/headless.py
+"""
+Hodeløs retting: minste inngang til retteren for skript, workers og serverløse funksjoner.
+
+Importing this module loads only the grader core (evaluate, drawn_forces, task_json,
+taskset and their stdlib imports). The rest is deferred to first use:
+  - engine.forces (name normalization): the first name that is scored
+  - utils.settings (GRID_STEP): compiling a task with many anchors, or building overlays
+  - NumPy: matching problems of NUMPY_MIN_PAIRS pairs or more, and the batched helpers
+  - overlays and EvaluationResult's debug strings: only when they are asked for
+With a task set whose plans are already in the disk cache (problem.taskset), a task is
+not compiled either.
+
+Input and output as problem.regrade, one JSON line per submission:
+    {"id": ..., "task_id": ..., "forces": [...]}     task looked up in --tasks
+    {"id": ..., "task": {...}, "forces": [...]}      inline client task (problem.task_json)
+Output lines hold the want="score" fields unless --want says otherwise; never overlays.
+They are strict JSON (evaluate.result_json): non-finite numbers are written as null.
+
+check_import() measures the cold start: `import problem.headless` in fresh interpreters
+(median of runs, after one discarded warm-up run that fills the bytecode and OS file caches),
+failing when it exceeds the budget or loads a deferred module. The budget defaults to
+$HEADLESS_IMPORT_BUDGET_MS, else DEFAULT_IMPORT_BUDGET_MS (measured: ~50 ms with bytecode
+cached, ~100 ms with PYTHONDONTWRITEBYTECODE, so set the variable on such machines).
+
+Usage:
+    result = grade(task_json, forces_json)            # EvaluationResult
+    python -m problem.headless --tasks oppgaver/ < subs.jsonl > scores.jsonl
+    python -m problem.headless --check-import --budget-ms 100
+    HEADLESS_IMPORT_BUDGET_MS=150 python -m problem.headless --check-import
+"""
+from __future__ import annotations
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+import argparse
+import json
+import os
+import sys
+
+from problem.spec import TaskSpec, Tolerances
+from problem.drawn_forces import ForceBatch
+from problem.evaluate import CompiledTask, EvaluationResult, WANT_LEVELS, compile_task, _evaluate_compiled, result_json
+from problem.task_json import task_spec_from_json
+from problem.taskset import TaskSet
+
+DEFAULT_WANT = "score"
+PLAN_CACHE_SIZE = 256           # inline tasks kept compiled (cleared when full)
+DEFAULT_IMPORT_BUDGET_MS = 100.0
+IMPORT_BUDGET_ENV = 'HEADLESS_IMPORT_BUDGET_MS'
+DEFAULT_IMPORT_RUNS = 5
+# Must not be loaded by `import problem.headless`
+DEFERRED_MODULES = (
+    'numpy', 'engine.forces', 'utils.settings', 'pygame',
+    'multiprocessing', 'asyncio', 'problem.submission_archive', 'problem.submission_format',
+)
+
+# ------------------------------------------------------
+# Grading
+# ------------------------------------------------------
+
+_plans: Dict[Tuple[bytes, str], CompiledTask] = {}
+
+def plan_for(task: Union[Dict, TaskSpec, CompiledTask], tol: Optional[Tolerances] = None) -> CompiledTask:
+    """CompiledTask for a client task dict (compiled once per content and tol), TaskSpec or plan."""
+    if isinstance(task, CompiledTask):
+        return task
+    if not isinstance(task, dict):
+        return compile_task(task)
+    key = (json.dumps(task, sort_keys=True, separators=(',', ':')).encode('utf-8'), repr(tol))
+    plan = _plans.get(key)
+    if plan is None:
+        if len(_plans) >= PLAN_CACHE_SIZE:
+            _plans.clear()
+        plan = _plans[key] = compile_task(task_spec_from_json(task, tol=tol))
+    return plan
+
+def grade(
+    task: Union[Dict, TaskSpec, CompiledTask],
+    forces: Union[ForceBatch, Iterable[Dict]],
+    *,
+    want: str = DEFAULT_WANT,
+    tol: Optional[Tolerances] = None,
+) -> EvaluationResult:
+    """
+    Grade one submission.
+
+    task: client task dict (tasks.js / editor export), TaskSpec or CompiledTask
+    forces: the client's drawn forces (list of dicts) or a ForceBatch
+    """
+    batch = forces if isinstance(forces, ForceBatch) else ForceBatch.from_json(forces)
+    return _evaluate_compiled(plan_for(task, tol), batch, want)
+
+def grade_line(tasks: Optional[TaskSet], line: str, want: str = DEFAULT_WANT) -> Optional[str]:
+    """One input line -> one output line (None for blank lines)."""
+    line = line.strip()
+    if not line:
+        return None
+    record_id = task_id = None
+    try:
+        record = json.loads(line)
+        record_id = record.get('id')
+        task_id = record.get('task_id')
+        if record.get('task') is not None:
+            plan = plan_for(record['task'])
+        elif tasks is None:
+            raise ValueError("Besvarelsen mangler 'task' (ingen --tasks)")
+        else:
+            plan = tasks.plan(str(task_id))
+        result = _evaluate_compiled(plan, ForceBatch.from_json(record.get('forces') or []), want)
+        out = {'id': record_id, 'task_id': task_id}
+        out.update(result)
+        out.pop('overlays', None)
+    except Exception as exc:  # one bad line must not stop the stream
+        out = {'id': record_id, 'task_id': task_id, 'error': f"{type(exc).__name__}: {exc}"}
+    return result_json(out)
+
+# ------------------------------------------------------
+# Cold start
+# ------------------------------------------------------
+
+_PROBE = (
+    "import sys, time\n"
+    "t = time.perf_counter()\n"
+    "import {module}\n"
+    "ms = (time.perf_counter() - t) * 1000.0\n"
+    "print(ms, ' '.join(m for m in {deferred!r} if m in sys.modules))\n"
+)
+
+def import_time(module: str = 'problem.headless', *, runs: int = DEFAULT_IMPORT_RUNS) -> Tuple[float, List[str]]:
+    """
+    (median ms, deferred modules loaded) for importing module in fresh interpreters with
+    this process's sys.path. Interpreter startup itself is not counted, nor is the first
+    (warm-up) run.
+    """
+    import subprocess
+
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(p for p in sys.path if p)
+    code = _PROBE.format(module=module, deferred=DEFERRED_MODULES)
+    times = []
+    loaded: List[str] = []
+    for run in range(max(1, runs) + 1):
+        out = subprocess.run([sys.executable, '-c', code], env=env, capture_output=True, text=True, check=True)
+        ms, _, mods = out.stdout.strip().partition(' ')
+        loaded = sorted(set(loaded) | set(mods.split()))
+        if run:
+            times.append(float(ms))
+    times.sort()
+    return times[len(times) // 2], loaded
+
+def import_budget_ms() -> float:
+    """Import budget: $HEADLESS_IMPORT_BUDGET_MS when set, else DEFAULT_IMPORT_BUDGET_MS."""
+    value = os.environ.get(IMPORT_BUDGET_ENV)
+    if not value:
+        return DEFAULT_IMPORT_BUDGET_MS
+    try:
+        return float(value)
+    except ValueError:
+        raise ValueError(f"{IMPORT_BUDGET_ENV} må være et tall (ms), fikk {value!r}") from None
+
+def check_import(
+    budget_ms: Optional[float] = None,
+    *,
+    module: str = 'problem.headless',
+    runs: int = DEFAULT_IMPORT_RUNS,
+) -> Tuple[bool, str]:
+    """(ok, report): the cold import is within budget_ms (default import_budget_ms()) and loads none of DEFERRED_MODULES."""
+    if budget_ms is None:
+        budget_ms = import_budget_ms()
+    ms, loaded = import_time(module, runs=runs)
+    ok = ms <= budget_ms and not loaded
+    lines = [f"import {module}: {ms:.1f} ms (median of {runs}, budget {budget_ms:.0f} ms)"]
+    if loaded:
+        lines.append(f"  lastet ved import: {', '.join(loaded)}")
+    lines.append("OK" if ok else "FEIL")
+    return ok, "\n".join(lines)
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Hodeløs retting (JSON lines inn, JSON lines ut)")
+    parser.add_argument('--tasks', metavar='PATH', help="task-set file or directory (problem.taskset)")
+    parser.add_argument('--want', default=DEFAULT_WANT, choices=WANT_LEVELS)
+    parser.add_argument('--check-import', action='store_true', help="measure the cold import and check it against --budget-ms")
+    parser.add_argument('--budget-ms', type=float, default=None, help=f"default ${IMPORT_BUDGET_ENV} or {DEFAULT_IMPORT_BUDGET_MS:g}")
+    parser.add_argument('--runs', type=int, default=DEFAULT_IMPORT_RUNS)
+    args = parser.parse_args(argv)
+    if args.check_import:
+        ok, report = check_import(args.budget_ms, runs=args.runs)
+        print(report)
+        return 0 if ok else 1
+    tasks = TaskSet(args.tasks) if args.tasks else None
+    for line in sys.stdin:
+        out = grade_line(tasks, line, args.want)
+        if out is not None:
+            sys.stdout.write(out + "\n")
+    sys.stdout.flush()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
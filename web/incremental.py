@@ -0,0 +1,187 @@
+# ./problem/incremental.py
+"""
+Inkrementell retting for interaktiv bruk: én pil endres om gangen.
+
+Evaluator keeps, per drawn force, its column of pair scores (one per expected force) and,
+per expected force, the scored result for the drawn force it is matched to. A delta
+(add / move / rename / delete) recomputes only the changed drawn force's column; after
+re-selecting the matching from the cached score matrix, only expected forces whose
+matched drawn force changed are re-scored.
+
+Results are identical to evaluate_task on the same drawing. ΣF and the relation sums are
+re-summed over the matched forces on every result (O(expected forces), no trigonometry):
+keeping running accumulators would change the floating-point summation order and break
+the bit-for-bit equality with a full evaluation.
+
+Usage:
+    ev = Evaluator(task_spec, forces)
+    i = ev.add(DrawnForce('N', (0, -60), (500, 480)))
+    ev.move(i, vec=(5, -60))
+    ev.rename(i, 'R')
+    ev.delete(0)
+    print(ev.result()['score'])
+"""
+from __future__ import annotations
+from typing import Dict, Iterable, List, Optional, Tuple
+import itertools
+
+from problem.drawn_forces import DrawnForce, ForceBatch, _point
+from problem.evaluate import (
+    CompiledTask,
+    EvaluationResult,
+    WANT_LEVELS,
+    compile_task,
+    unit,
+    _evaluate_compiled,
+    _finish_evaluation,
+    _match_greedy,
+    _match_optimal,
+    _normalize_name_cached,
+    _pair_score,
+    _score_force,
+)
+
+_KEEP = object()  # move(): leave this field unchanged
+
+class Evaluator:
+    """
+    Stateful grading session for one task.
+
+    want: detail level of result() (see evaluate.WANT_LEVELS)
+    Drawn forces are addressed by index in drawing order; delete() shifts later indices.
+    """
+
+    def __init__(self, task_spec: object, drawn_forces: Iterable[object] = (), *, want: str = "full"):
+        if want not in WANT_LEVELS:
+            raise ValueError(f"Ukjent want: {want}")
+        self.plan: CompiledTask = task_spec if isinstance(task_spec, CompiledTask) else compile_task(task_spec)
+        self.want = want
+        self._forces: List[DrawnForce] = []
+        self._tokens: List[int] = []          # changes whenever the drawn force changes
+        self._columns: List[List[float]] = []  # pair score per expected force, per drawn force
+        self._token_seq = itertools.count()
+        # expected index -> (token of the matched drawn force, _score_force result)
+        self._scored: Dict[int, Tuple[int, tuple]] = {}
+        self._result: Optional[EvaluationResult] = None
+        self.columns_computed = 0
+        self.forces_rescored = 0
+        for f in drawn_forces:
+            self.add(f)
+
+    # --- Deltas ---
+
+    def add(self, force: object) -> int:
+        """Append a drawn force; returns its index."""
+        f = DrawnForce.from_object(force)
+        f = DrawnForce(f.name, f.vec, f.anchor, f.arrowBase, f.editable)  # own copy
+        self._forces.append(f)
+        self._tokens.append(next(self._token_seq))
+        self._columns.append(self._column(f))
+        self._result = None
+        return len(self._forces) - 1
+
+    def move(self, idx: int, *, vec=_KEEP, anchor=_KEEP, arrowBase=_KEEP) -> None:
+        """Change the geometry of drawn force idx (fields not given are kept)."""
+        f = self._forces[idx]
+        if vec is not _KEEP:
+            f.vec = _point(vec)
+        if anchor is not _KEEP:
+            f.anchor = _point(anchor)
+        if arrowBase is not _KEEP:
+            f.arrowBase = _point(arrowBase)
+        self._changed(idx, direction=vec is not _KEEP)
+
+    def rename(self, idx: int, name: str) -> None:
+        self._forces[idx].name = name or ''
+        self._changed(idx, direction=True)
+
+    def set_editable(self, idx: int, editable: bool) -> None:
+        self._forces[idx].editable = bool(editable)
+        self._changed(idx, direction=False)
+
+    def delete(self, idx: int) -> None:
+        """Remove drawn force idx; later forces move down one index."""
+        del self._forces[idx]
+        del self._tokens[idx]
+        del self._columns[idx]
+        self._result = None
+
+    def _changed(self, idx: int, *, direction: bool) -> None:
+        self._tokens[idx] = next(self._token_seq)
+        if direction:  # pair scores depend on name and vec only
+            self._columns[idx] = self._column(self._forces[idx])
+        self._result = None
+
+    # --- State ---
+
+    @property
+    def forces(self) -> List[DrawnForce]:
+        return list(self._forces)
+
+    def __len__(self) -> int:
+        return len(self._forces)
+
+    def _column(self, f: DrawnForce) -> List[float]:
+        plan = self.plan
+        self.columns_computed += 1
+        named = plan.alias_rows.get(_normalize_name_cached(f.name), ()) if f.name else ()
+        u = unit(f.vec) if f.vec is not None else None
+        return [
+            _pair_score(cf, u, i in named, plan.ang_tol, plan.ang_span)
+            for i, cf in enumerate(plan.forces)
+        ]
+
+    def _match(self) -> Dict[str, int]:
+        forces = self.plan.forces
+        rows = [[col[i] for col in self._columns] for i in range(len(forces))]
+        if self.plan.match_strategy == "optimal":
+            return _match_optimal(forces, len(self._columns), rows)
+        return _match_greedy(forces, rows)
+
+    # --- Result ---
+
+    def result(self) -> EvaluationResult:
+        """Evaluation of the current drawing (cached until the next delta)."""
+        if self._result is not None:
+            return self._result
+        plan = self.plan
+        batch = ForceBatch.from_drawn(self._forces)
+        if not any(batch.editable):
+            self._result = _evaluate_compiled(plan, batch, self.want)
+            return self._result
+
+        with_feedback = self.want != "score"
+        matched = self._match()
+        feedback: List[str] = []
+        details: Dict[str, object] = {}
+        overlay_log: List[tuple] = []
+        total_score = 0.0
+        total_weight = 0.0
+        editable_weight = 0.0
+        scored: Dict[int, Tuple[int, tuple]] = {}
+        for force_idx, cf in enumerate(plan.forces):
+            drawn_idx = matched.get(cf.name)
+            token = self._tokens[drawn_idx] if drawn_idx is not None else -1
+            cached = self._scored.get(force_idx)
+            if cached is not None and cached[0] == token:
+                entry = cached[1]
+            else:
+                entry = _score_force(plan, force_idx, batch, drawn_idx, with_feedback)
+                self.forces_rescored += 1
+            scored[force_idx] = (token, entry)
+            force_detail, score, weight, events = entry
+            total_score += score
+            editable_weight += weight
+            total_weight += 1.0
+            for message, overlay in events:
+                if overlay is not None:
+                    overlay_log.append((len(feedback),) + overlay)
+                feedback.append(message)
+            details[cf.name] = dict(force_detail)  # the result owns its details
+        self._scored = scored
+
+        self._result = _finish_evaluation(
+            plan, batch, matched, details, feedback, overlay_log,
+            total_score, total_weight, editable_weight, self.want,
+        )
+        return self._result
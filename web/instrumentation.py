@@ -0,0 +1,105 @@
+# ./problem/instrumentation.py
+"""
+Valgfri måling av tidsbruk i evaluate_task (fase-tidtakere og tellere).
+
+Disabled by default. When disabled the evaluator does one None-check per phase and
+nothing else. Enable per call (evaluate_task(..., instrument=True)) or globally:
+
+    from problem import instrumentation
+    agg = instrumentation.TimingAggregator()
+    instrumentation.set_sink(agg)          # every evaluation reports to agg
+    ...
+    print(agg.summary())
+    instrumentation.set_sink(None)
+
+Phases (seconds): prepare, matching, forces, names, equilibrium, relations, final, overlays.
+Counters: pairs_scored, fast_path, anchors_tried, overlays_built, overlays_deferred.
+"""
+from __future__ import annotations
+from typing import Callable, Dict, Optional
+import time
+
+PHASES = ("prepare", "matching", "forces", "names", "equilibrium", "relations", "final", "overlays")
+
+class EvalTimings:
+    """Phase timings and counters for one evaluation."""
+    __slots__ = ('phases', 'counters', '_last')
+
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+        self.counters: Dict[str, int] = {}
+        self._last = time.perf_counter()
+
+    def mark(self, phase: str) -> None:
+        """Charge the time since the previous mark to phase."""
+        now = time.perf_counter()
+        self.phases[phase] = self.phases.get(phase, 0.0) + (now - self._last)
+        self._last = now
+
+    def count(self, name: str, n: int = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    @property
+    def total(self) -> float:
+        return sum(self.phases.values())
+
+    def as_dict(self) -> Dict[str, Dict[str, float]]:
+        return {'phases': dict(self.phases), 'counters': dict(self.counters)}
+
+    def __repr__(self) -> str:
+        return f"EvalTimings(phases={self.phases}, counters={self.counters})"
+
+def format_timings(phases: Dict[str, float], counters: Dict[str, float], calls: int = 1) -> str:
+    """Text block: per-phase time (µs, share of total) and counters; averaged over calls."""
+    calls = max(1, calls)
+    total = sum(phases.values())
+    out = [f"TIMINGS ({calls} call{'s' if calls != 1 else ''}, {total / calls * 1e6:.1f} µs/call):"]
+    order = [p for p in PHASES if p in phases] + [p for p in phases if p not in PHASES]
+    for phase in order:
+        t = phases[phase]
+        share = t / total if total > 0 else 0.0
+        out.append(f"  {phase:<12} {t / calls * 1e6:>10.1f} µs  {share:>6.1%}")
+    if counters:
+        out.append("  counters:")
+        for name, n in counters.items():
+            out.append(f"    {name:<18} {n / calls:.2f}" if calls > 1 else f"    {name:<18} {n}")
+    return "\n".join(out)
+
+class TimingAggregator:
+    """Sink that sums timings over many evaluations."""
+
+    def __init__(self):
+        self.calls = 0
+        self.phases: Dict[str, float] = {}
+        self.counters: Dict[str, int] = {}
+
+    def __call__(self, timings: EvalTimings) -> None:
+        self.calls += 1
+        for k, v in timings.phases.items():
+            self.phases[k] = self.phases.get(k, 0.0) + v
+        for k, v in timings.counters.items():
+            self.counters[k] = self.counters.get(k, 0) + v
+
+    def reset(self) -> None:
+        self.calls = 0
+        self.phases.clear()
+        self.counters.clear()
+
+    def summary(self) -> str:
+        return format_timings(self.phases, self.counters, self.calls)
+
+# ------------------------------------------------------
+# Global sink
+# ------------------------------------------------------
+
+Sink = Callable[[EvalTimings], None]
+
+_SINK: Optional[Sink] = None
+
+def set_sink(sink: Optional[Sink]) -> None:
+    """Send timings of every evaluation to sink (None disables global instrumentation)."""
+    global _SINK
+    _SINK = sink
+
+def get_sink() -> Optional[Sink]:
+    return _SINK
@@ -0,0 +1,333 @@
+# ./problem/measurements.py
+"""
+Rå målinger av en besvarelse, adskilt fra poenggivingen.
+
+measure() does the expensive part of grading once: matching, angle errors, anchor
+distances, ΣF relative error and relation errors. The result is a compact Measurements
+record (flat arrays, NaN = not measured). score_measurements() is a pure function that
+turns a record into scores under any ScoringPolicy (tolerances, weights, name penalty,
+coverage exponent, quality floor), so stored measurements can be rescored instantly.
+
+With the task's own policy the scores equal evaluate_task(...). The matching is part of
+the measurement: it was made with the task's angle tolerances, and rescoring with other
+ang_tol_deg / ang_span_deg keeps it (problem.sweep re-matches per angle setting).
+
+Usage:
+    m = measure(task_spec, forces)
+    policy = ScoringPolicy.from_task(task_spec)
+    score_measurements(m, policy)['score']
+    score_measurements(m, policy.replace(pos_tol=30.0, quality_floor=0.3))
+"""
+from __future__ import annotations
+from array import array
+from dataclasses import dataclass, replace
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+import math
+
+from problem.drawn_forces import ForceBatch, as_force_batch
+from problem.evaluate import (
+    COVERAGE_PENALTY_EXP,
+    CompiledTask,
+    compile_task,
+    nearest_anchor_distance,
+    ramp_down_linear,
+    _angle_error_unit,
+    _combine_scores,
+    _equilibrium_measure,
+    _match_compiled,
+    _normalize_name_cached,
+)
+from problem.relation_engine import Values as RelationValues
+
+NAN = float('nan')
+
+# ------------------------------------------------------
+# Record
+# ------------------------------------------------------
+
+class Measurements:
+    """
+    Raw measurements of one submission (E expected forces, R relations).
+
+    matched: drawn index per expected force, -1 = not found            (array 'i', E)
+    editable, name_ok: 0/1 per expected force                          (bytes, E)
+    angle_err: angle error in degrees, NaN = no direction measured      (array 'd', E)
+    anchor_dist: distance to the nearest allowed anchor, NaN = none     (array 'd', E)
+    eq_rel_err: |ΣF| / largest force, NaN = equilibrium not checked
+    relation_err: per relation, NaN = skipped (force missing/misnamed), inf = |RHS| ≈ 0  (array 'd', R)
+    empty: no editable drawn force (score 0)
+    """
+    __slots__ = ('matched', 'editable', 'name_ok', 'angle_err', 'anchor_dist', 'eq_rel_err', 'relation_err', 'empty')
+
+    def __init__(self, matched, editable, name_ok, angle_err, anchor_dist, eq_rel_err: float, relation_err, empty: bool = False):
+        self.matched = matched
+        self.editable = editable
+        self.name_ok = name_ok
+        self.angle_err = angle_err
+        self.anchor_dist = anchor_dist
+        self.eq_rel_err = eq_rel_err
+        self.relation_err = relation_err
+        self.empty = empty
+
+    @classmethod
+    def empty_for(cls, plan: CompiledTask) -> "Measurements":
+        E, R = len(plan.forces), len(plan.relations)
+        return cls(
+            array('i', [-1] * E), bytes(E), bytes(E),
+            array('d', [NAN] * E), array('d', [NAN] * E),
+            NAN, array('d', [NAN] * R), empty=True,
+        )
+
+    @property
+    def num_found(self) -> int:
+        return sum(1 for j in self.matched if j >= 0)
+
+    def as_row(self) -> Tuple[float, ...]:
+        """
+        Flat row of floats (fixed length 5E + R + 2 per task), for stacking into an array:
+        matched, editable, name_ok, angle_err, anchor_dist, relation_err, eq_rel_err, empty.
+        """
+        return (
+            tuple(float(j) for j in self.matched)
+            + tuple(float(b) for b in self.editable)
+            + tuple(float(b) for b in self.name_ok)
+            + tuple(self.angle_err)
+            + tuple(self.anchor_dist)
+            + tuple(self.relation_err)
+            + (self.eq_rel_err, 1.0 if self.empty else 0.0)
+        )
+
+    @classmethod
+    def from_row(cls, row: Sequence[float], num_forces: int, num_relations: int) -> "Measurements":
+        E, R = num_forces, num_relations
+        return cls(
+            array('i', [int(x) for x in row[0:E]]),
+            bytes(int(x) for x in row[E:2*E]),
+            bytes(int(x) for x in row[2*E:3*E]),
+            array('d', row[3*E:4*E]),
+            array('d', row[4*E:5*E]),
+            float(row[5*E + R]),
+            array('d', row[5*E:5*E + R]),
+            empty=bool(row[5*E + R + 1]),
+        )
+
+    def to_dict(self) -> Dict[str, object]:
+        """JSON-ready dict (NaN/inf as null/"inf")."""
+        def f(x: float):
+            if math.isnan(x):
+                return None
+            return "inf" if math.isinf(x) else x
+        return {
+            'matched': list(self.matched),
+            'editable': list(self.editable),
+            'name_ok': list(self.name_ok),
+            'angle_err': [f(x) for x in self.angle_err],
+            'anchor_dist': [f(x) for x in self.anchor_dist],
+            'eq_rel_err': f(self.eq_rel_err),
+            'relation_err': [f(x) for x in self.relation_err],
+            'empty': self.empty,
+        }
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, object]) -> "Measurements":
+        def f(x) -> float:
+            if x is None:
+                return NAN
+            return float(x)  # float("inf") parses "inf"
+        return cls(
+            array('i', d['matched']),
+            bytes(d['editable']),
+            bytes(d['name_ok']),
+            array('d', [f(x) for x in d['angle_err']]),
+            array('d', [f(x) for x in d['anchor_dist']]),
+            f(d['eq_rel_err']),
+            array('d', [f(x) for x in d['relation_err']]),
+            empty=bool(d.get('empty', False)),
+        )
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Measurements):
+            return NotImplemented
+        a, b = self.as_row(), other.as_row()
+        return len(a) == len(b) and all(x == y or (x != x and y != y) for x, y in zip(a, b))
+
+    def __repr__(self) -> str:
+        return f"Measurements({self.to_dict()})"
+
+# ------------------------------------------------------
+# Measuring
+# ------------------------------------------------------
+
+def measure_matched(
+    plan: CompiledTask,
+    batch: ForceBatch,
+    matched: Dict[str, int],
+    angles: Optional[List[List[float]]] = None,
+    *,
+    relation_values: Optional[RelationValues] = None,
+) -> Measurements:
+    """
+    Measurements for a given matching {expected name: drawn index}.
+    angles: optional precomputed angle errors angles[expected][drawn] (as in problem.sweep).
+    relation_values: optional RelationTable.evaluate() output for this matching, e.g. one
+    row of RelationTable.evaluate_batch (as in problem.sweep).
+    """
+    E = len(plan.forces)
+    drawn = array('i', [-1] * E)
+    editable = bytearray(E)
+    name_ok = bytearray(E)
+    angle_err = array('d', [NAN] * E)
+    anchor_dist = array('d', [NAN] * E)
+    for i, cf in enumerate(plan.forces):
+        j = matched.get(cf.name)
+        if j is None:
+            continue
+        drawn[i] = j
+        if not batch.is_editable(j):
+            name_ok[i] = 1  # pre-drawn forces count as correctly named (relations)
+            continue
+        editable[i] = 1
+        name = batch.names[j]
+        ok = bool(name) and _normalize_name_cached(name) in cf.aliases
+        name_ok[i] = ok
+        v = batch.vec_at(j)
+        if v is not None and cf.dir_unit is not None:
+            angle_err[i] = angles[i][j] if angles is not None else _angle_error_unit(v, cf.dir_unit)
+        anchor_pt = batch.anchor_at(j)
+        if ok and anchor_pt is not None and cf.has_anchor:
+            # ramp_down_linear is non-increasing, so the best anchor is the nearest one
+            best = nearest_anchor_distance(cf, anchor_pt)
+            if best is not None:
+                anchor_dist[i] = best
+
+    # ΣF (only without relations, as in evaluate_task)
+    eq_rel_err = NAN
+    if not plan.has_relations and matched and plan.basis in ("xy", "np"):
+        eq_rel_err = _equilibrium_measure(plan, batch, matched)[5]
+
+    relation_err = array('d', [NAN] * len(plan.relations))
+    if plan.has_relations:
+        ok_by_name = {cf.name: name_ok[i] for i, cf in enumerate(plan.forces) if drawn[i] >= 0}
+        table = plan.relation_table
+        x, _, _, errs = relation_values or table.evaluate(batch, matched)
+        for r, mag_rel in enumerate(plan.relations):
+            if not all(ok_by_name.get(n, 0) for n in mag_rel.force_names):
+                continue
+            table.check(r, x)
+            relation_err[r] = errs[r]
+
+    return Measurements(drawn, bytes(editable), bytes(name_ok), angle_err, anchor_dist, eq_rel_err, relation_err)
+
+def measure(task_spec: object, drawn_forces: Union[ForceBatch, Sequence[object]]) -> Measurements:
+    """Match and measure one submission (no scoring)."""
+    plan = task_spec if isinstance(task_spec, CompiledTask) else compile_task(task_spec)
+    batch = as_force_batch(drawn_forces)
+    if not any(batch.editable):
+        return Measurements.empty_for(plan)
+    matched = _match_compiled(
+        plan.forces, batch, plan.ang_tol, plan.ang_span,
+        strategy=plan.match_strategy, alias_rows=plan.alias_rows,
+    )
+    return measure_matched(plan, batch, matched)
+
+# ------------------------------------------------------
+# Scoring
+# ------------------------------------------------------
+
+@dataclass(frozen=True)
+class ScoringPolicy:
+    """
+    Everything score_measurements needs besides the measurements.
+    weights: (w_name, w_dir, w_pos) per expected force, in task order.
+    """
+    ang_tol_deg: float
+    ang_span_deg: float
+    pos_tol: float
+    pos_span: float
+    sumF_tol: float
+    sumF_span: float
+    rel_tol: float
+    rel_span: float
+    weights: Tuple[Tuple[float, float, float], ...]
+    has_relations: bool
+    name_mismatch_score: float = 0.5
+    coverage_exp: float = COVERAGE_PENALTY_EXP
+    quality_floor: float = 0.5
+
+    @classmethod
+    def from_task(cls, task_spec: object) -> "ScoringPolicy":
+        """The grading policy of a task (scores then equal evaluate_task)."""
+        plan = task_spec if isinstance(task_spec, CompiledTask) else compile_task(task_spec)
+        return cls(
+            ang_tol_deg=plan.ang_tol,
+            ang_span_deg=plan.ang_span,
+            pos_tol=plan.pos_tol,
+            pos_span=plan.pos_span,
+            sumF_tol=plan.sumf_tol,
+            sumF_span=plan.sumf_span,
+            rel_tol=plan.rel_tol,
+            rel_span=plan.rel_span,
+            weights=tuple((cf.w_name, cf.w_dir, cf.w_pos) for cf in plan.forces),
+            has_relations=plan.has_relations,
+        )
+
+    def replace(self, **changes) -> "ScoringPolicy":
+        return replace(self, **changes)
+
+    def with_weights(self, w_name: Optional[float] = None, w_dir: Optional[float] = None, w_pos: Optional[float] = None) -> "ScoringPolicy":
+        """Same weights for every force (None keeps the per-force value)."""
+        return replace(self, weights=tuple(
+            (w_name if w_name is not None else n, w_dir if w_dir is not None else d, w_pos if w_pos is not None else p)
+            for n, d, p in self.weights
+        ))
+
+def score_measurements(m: Measurements, policy: ScoringPolicy) -> Dict[str, float]:
+    """
+    Pure scoring: {'score', 'coverage', 'equilibrium_score', 'relations_score'}.
+    Same arithmetic as evaluate_task.
+    """
+    if m.empty:
+        return {'score': 0.0, 'coverage': 0.0, 'equilibrium_score': 1.0, 'relations_score': 1.0}
+    total_score = 0.0
+    editable_weight = 0.0
+    num_found = 0
+    for i, j in enumerate(m.matched):
+        if j < 0:
+            continue
+        num_found += 1
+        if not m.editable[i]:
+            continue
+        w_n, w_d, w_p = policy.weights[i]
+        name_score = 1.0 if m.name_ok[i] else policy.name_mismatch_score
+        a = m.angle_err[i]
+        dir_score = ramp_down_linear(a, policy.ang_tol_deg, policy.ang_span_deg) if a == a else 0.0
+        d = m.anchor_dist[i]
+        pos_score = ramp_down_linear(d, policy.pos_tol, policy.pos_span) if d == d else 0.0
+        w_sum = w_n + w_d + w_p
+        if w_sum > 0:
+            total_score += (w_n * name_score + w_d * dir_score + w_p * pos_score) / w_sum
+        editable_weight += 1.0
+
+    equilibrium_score = 1.0
+    if m.eq_rel_err == m.eq_rel_err:  # not NaN
+        equilibrium_score = ramp_down_linear(m.eq_rel_err, policy.sumF_tol, policy.sumF_span)
+
+    relations_score = 1.0
+    rel_scores = [
+        0.0 if math.isinf(err) else ramp_down_linear(err, policy.rel_tol, policy.rel_span)
+        for err in m.relation_err if err == err
+    ]
+    if rel_scores:
+        relations_score = sum(rel_scores) / len(rel_scores)
+
+    final_score, coverage = _combine_scores(
+        policy.has_relations, total_score, float(len(m.matched)), editable_weight, num_found,
+        equilibrium_score, relations_score,
+        coverage_exp=policy.coverage_exp, quality_floor=policy.quality_floor,
+    )
+    return {
+        'score': final_score,
+        'coverage': coverage,
+        'equilibrium_score': equilibrium_score,
+        'relations_score': relations_score,
+    }
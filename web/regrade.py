@@ -0,0 +1,358 @@
+# ./problem/regrade.py
+"""
+Kommandolinje for omretting av eksporterte besvarelser (JSON lines inn, JSON lines ut).
+
+Input: one submission per line
+    {"id": "...", "task_id": "...", "forces": [ {name, anchor, arrowBase, arrowTip, ...}, ... ]}
+Output: one result per line
+    {"id": "...", "task_id": "...", "score": ..., "feedback": [...], "coverage": ..., ...}
+    or {"id": "...", "task_id": "...", "error": "..."} for lines that cannot be graded.
+Output is strict JSON: non-finite numbers (e.g. the ratio of a relation with zero RHS) are null.
+
+Input may also be a binary .kpsb file (see problem.submission_format); it is detected by its
+magic bytes and read without JSON parsing. A directory is read as a SubmissionArchive
+(problem.submission_archive), optionally limited with --task. For both the checkpoint offset
+counts records, not bytes.
+
+Tasks come from --tasks MODULE:ATTR, which must name a TaskSpec, a dict {task_id: TaskSpec}
+or a callable returning either, or from --tasks PATH to an exported task set (problem.taskset;
+plans are compiled lazily and cached on disk). --tol overrides Tolerances fields for the regrade.
+
+Memory stays bounded: input is read in windows of --window lines; with --workers > 1
+each window is graded by a process pool (results keep input order).
+--checkpoint stores the input byte offset (and output size) after each written window;
+--resume truncates --output to that size and continues from the input offset, so a run
+interrupted mid-window neither loses nor duplicates lines.
+
+Usage:
+    python -m problem.regrade subs.jsonl -o scores.jsonl --tasks problem.tasks:TASKS \\
+        --workers 4 --tol ang_tol_deg=12 --checkpoint scores.ckpt
+    python -m problem.regrade subs.jsonl -o scores.jsonl --tasks problem.tasks:TASKS --resume --checkpoint scores.ckpt
+"""
+from __future__ import annotations
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+import argparse
+import copy
+import dataclasses
+import importlib
+import json
+import multiprocessing
+import os
+import sys
+
+from problem.drawn_forces import ForceBatch
+from problem.evaluate import CompiledTask, WANT_LEVELS, compile_task, _evaluate_compiled, result_json
+from problem.spec import Tolerances
+from problem.submission_archive import SubmissionArchive
+from problem.submission_format import SubmissionReader, is_binary
+from problem.taskset import SOURCE_SUFFIXES, TaskSet
+
+DEFAULT_WINDOW = 1024   # Input lines held in memory at a time
+DEFAULT_CHUNKSIZE = 16
+
+# ------------------------------------------------------
+# Tasks
+# ------------------------------------------------------
+
+def load_tasks(ref: str) -> Dict[Optional[str], object]:
+    """
+    Resolve MODULE:ATTR to {task_id: TaskSpec}. A single TaskSpec is returned as {None: spec}
+    and is used for every line regardless of task_id.
+    A path to an exported task set (.json / .js file or a directory) gives a lazy TaskSet.
+    """
+    if os.path.isdir(ref) or (ref.endswith(SOURCE_SUFFIXES) and os.path.isfile(ref)):
+        return TaskSet(ref)
+    module_name, _, attr = ref.partition(':')
+    if not attr:
+        raise ValueError(f"--tasks må være MODULE:ATTR, fikk {ref!r}")
+    obj = getattr(importlib.import_module(module_name), attr)
+    if callable(obj) and not isinstance(obj, type):
+        obj = obj()
+    if isinstance(obj, dict):
+        return {str(k): v for k, v in obj.items()}
+    return {None: obj}
+
+def parse_tol_overrides(items: Sequence[str]) -> Dict[str, float]:
+    """['ang_tol_deg=12', ...] -> {'ang_tol_deg': 12.0}"""
+    out: Dict[str, float] = {}
+    for item in items:
+        key, sep, value = item.partition('=')
+        if not sep:
+            raise ValueError(f"--tol forventer NAVN=VERDI, fikk {item!r}")
+        out[key.strip()] = float(value)
+    return out
+
+def check_tol_overrides(overrides: Dict[str, float]) -> None:
+    """Raise ValueError for names that are not Tolerances fields (no task needs to be loaded)."""
+    defaults = Tolerances()
+    for key in overrides:
+        if not hasattr(defaults, key):
+            raise ValueError(f"Ukjent toleranse: {key}")
+
+def with_tolerances(task_spec: object, overrides: Dict[str, float]) -> object:
+    """Copy of task_spec with tol fields replaced (task_spec itself is not modified)."""
+    if not overrides:
+        return task_spec
+    tol = task_spec.tol
+    for key in overrides:
+        if not hasattr(tol, key):
+            raise ValueError(f"Ukjent toleranse: {key}")
+    if dataclasses.is_dataclass(tol):
+        new_tol = dataclasses.replace(tol, **overrides)
+    else:
+        new_tol = copy.copy(tol)
+        for key, value in overrides.items():
+            setattr(new_tol, key, value)
+    spec = copy.copy(task_spec)
+    spec.tol = new_tol
+    return spec
+
+class TaskPlans:
+    """Compiled plans per task id, compiled on first use (tolerance overrides applied then)."""
+
+    def __init__(self, tasks: Dict[Optional[str], object], overrides: Dict[str, float]):
+        self.tasks = tasks
+        self.overrides = overrides
+        self._plans: Dict[Optional[str], CompiledTask] = {}
+
+    def get(self, task_id: Optional[str]) -> CompiledTask:
+        key = None if None in self.tasks else task_id
+        plan = self._plans.get(key)
+        if plan is None:
+            if key not in self.tasks:
+                raise KeyError(f"Ukjent oppgave: {task_id}")
+            if isinstance(self.tasks, TaskSet) and not self.overrides:
+                plan = self.tasks.plan(key)  # compiled plans are cached on disk
+            else:
+                plan = compile_task(with_tolerances(self.tasks[key], self.overrides))
+            self._plans[key] = plan
+        return plan
+
+# ------------------------------------------------------
+# Grading one line
+# ------------------------------------------------------
+
+def grade_line(plans: TaskPlans, line: str, want: str) -> Optional[str]:
+    """One input line -> one output line (None for blank lines)."""
+    line = line.strip()
+    if not line:
+        return None
+    record_id = task_id = None
+    try:
+        record = json.loads(line)
+        record_id = record.get('id')
+        task_id = record.get('task_id')
+        batch = ForceBatch.from_json(record.get('forces') or [])
+    except Exception as exc:
+        return json.dumps({'id': record_id, 'task_id': task_id, 'error': f"{type(exc).__name__}: {exc}"}, ensure_ascii=False)
+    return grade_record(plans, (record_id, task_id, batch), want)
+
+def grade_record(plans: TaskPlans, record: Tuple[object, object, ForceBatch], want: str) -> str:
+    """(id, task_id, ForceBatch) -> one output line."""
+    record_id, task_id, batch = record
+    try:
+        plan = plans.get(None if task_id is None else str(task_id))
+        result = _evaluate_compiled(plan, batch, want)
+        out = {'id': record_id, 'task_id': task_id}
+        out.update(result)
+        out.pop('overlays', None)  # screen overlays are of no use offline
+    except Exception as exc:  # one bad line must not stop a regrade
+        out = {'id': record_id, 'task_id': task_id, 'error': f"{type(exc).__name__}: {exc}"}
+    return result_json(out)
+
+_WORKER_PLANS: Optional[TaskPlans] = None
+_WORKER_WANT = "score+feedback"
+
+def _init_worker(tasks_ref: str, overrides: Dict[str, float], want: str) -> None:
+    global _WORKER_PLANS, _WORKER_WANT
+    _WORKER_PLANS = TaskPlans(load_tasks(tasks_ref), overrides)
+    _WORKER_WANT = want
+
+def _grade_worker(line: str) -> Optional[str]:
+    return grade_line(_WORKER_PLANS, line, _WORKER_WANT)
+
+def _grade_record_worker(record: Tuple[object, object, ForceBatch]) -> str:
+    return grade_record(_WORKER_PLANS, record, _WORKER_WANT)
+
+# ------------------------------------------------------
+# Streaming
+# ------------------------------------------------------
+
+def _windows(fh, window: int) -> Iterator[Tuple[List[str], int]]:
+    """Yield (lines, byte offset after the last line) in windows of at most `window` lines."""
+    lines: List[str] = []
+    offset = fh.tell() if fh.seekable() else 0
+    for raw in iter(fh.readline, b''):
+        offset += len(raw)
+        lines.append(raw.decode('utf-8'))
+        if len(lines) >= window:
+            yield lines, offset
+            lines = []
+    if lines:
+        yield lines, offset
+
+def _record_windows(reader: Iterable[tuple], window: int, skip: int) -> Iterator[Tuple[list, int]]:
+    """Yield (records, records consumed) in windows of at most `window` records, after skipping `skip`."""
+    records = []
+    consumed = 0
+    for record in reader:
+        consumed += 1
+        if consumed <= skip:
+            continue
+        records.append(record)
+        if len(records) >= window:
+            yield records, consumed
+            records = []
+    if records:
+        yield records, consumed
+
+def read_checkpoint(path: str) -> Dict[str, Optional[int]]:
+    """{'offset': input bytes consumed, 'out_offset': output size or None, 'graded': lines written}"""
+    try:
+        with open(path, 'r', encoding='utf-8') as fh:
+            data = json.load(fh)
+    except (OSError, ValueError):
+        data = {}
+    return {
+        'offset': int(data.get('offset', 0)),
+        'out_offset': data.get('out_offset'),
+        'graded': int(data.get('graded', 0)),
+    }
+
+def write_checkpoint(path: str, offset: int, out_offset: Optional[int], graded: int) -> None:
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as fh:
+        json.dump({'offset': offset, 'out_offset': out_offset, 'graded': graded}, fh)
+    os.replace(tmp, path)
+
+def _tell(fh) -> Optional[int]:
+    try:
+        return fh.tell()
+    except (OSError, ValueError):
+        return None
+
+def regrade(
+    in_fh,
+    out_fh,
+    tasks_ref: str,
+    *,
+    want: str = "score+feedback",
+    overrides: Optional[Dict[str, float]] = None,
+    workers: int = 1,
+    window: int = DEFAULT_WINDOW,
+    chunksize: int = DEFAULT_CHUNKSIZE,
+    checkpoint: Optional[str] = None,
+    graded: int = 0,
+    skip: int = 0,
+) -> int:
+    """
+    Grade every line of in_fh (binary) into out_fh (text); returns the number of lines written.
+    Reading starts at in_fh's current position (seek to the checkpoint offset to resume);
+    graded is the count already written by earlier runs (kept in the checkpoint).
+    in_fh may also be an iterable of (id, task_id, ForceBatch) records (SubmissionReader,
+    SubmissionArchive.records()); then skip records are skipped (the checkpoint offset).
+    """
+    if want not in WANT_LEVELS:
+        raise ValueError(f"Ukjent want: {want}")
+    overrides = overrides or {}
+    window = max(1, int(window))
+    check_tol_overrides(overrides)  # fail fast; overrides are applied as each task is compiled
+    tasks = load_tasks(tasks_ref)
+    written = 0
+    if not hasattr(in_fh, 'readline'):
+        windows = _record_windows(in_fh, window, skip)
+        grade_one, worker = grade_record, _grade_record_worker
+    else:
+        windows = _windows(in_fh, window)
+        grade_one, worker = grade_line, _grade_worker
+    pool = None
+    if workers > 1:
+        pool = multiprocessing.Pool(workers, initializer=_init_worker, initargs=(tasks_ref, overrides, want))
+
+        def grade(lines):
+            return pool.imap(worker, lines, chunksize)
+    else:
+        plans = TaskPlans(tasks, overrides)
+
+        def grade(lines):
+            return (grade_one(plans, line, want) for line in lines)
+    try:
+        for lines, offset in windows:
+            for out in grade(lines):
+                if out is not None:
+                    out_fh.write(out)
+                    out_fh.write('\n')
+                    written += 1
+            out_fh.flush()
+            if checkpoint:
+                write_checkpoint(checkpoint, offset, _tell(out_fh), graded + written)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    return written
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Omretting av besvarelser (JSONL)")
+    parser.add_argument('input', nargs='?', default='-', help="JSONL or .kpsb file with submissions ('-' = stdin, JSONL)")
+    parser.add_argument('-o', '--output', default='-', help="JSONL output file ('-' = stdout)")
+    parser.add_argument('--tasks', required=True, metavar='MODULE:ATTR', help="TaskSpec or {task_id: TaskSpec}, or a task-set file/directory")
+    parser.add_argument('--want', default="score+feedback", choices=WANT_LEVELS)
+    parser.add_argument('--tol', action='append', default=[], metavar='NAME=VALUE', help="override a Tolerances field")
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--window', type=int, default=DEFAULT_WINDOW, help="lines held in memory at a time")
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE)
+    parser.add_argument('--checkpoint', metavar='PATH', help="write the input offset here after each window")
+    parser.add_argument('--resume', action='store_true', help="continue from --checkpoint, appending to --output")
+    parser.add_argument('--task', action='append', default=[], metavar='ID', help="archive input: only these task ids")
+    args = parser.parse_args(argv)
+
+    if args.resume and (not args.checkpoint or args.input == '-'):
+        parser.error("--resume krever --checkpoint og en inputfil")
+    try:
+        overrides = parse_tol_overrides(args.tol)
+    except ValueError as exc:
+        parser.error(str(exc))
+
+    state = read_checkpoint(args.checkpoint) if args.resume else {'offset': 0, 'out_offset': None, 'graded': 0}
+    skip = 0
+    archive = None
+    if args.input != '-' and os.path.isdir(args.input):
+        archive = SubmissionArchive(args.input, readonly=True)
+        selection = None
+        if args.task:
+            selection = sorted(i for task_id in args.task for i in archive.select(task_id=task_id))
+        in_fh = archive.records(selection)
+        skip = state['offset']
+    elif args.input != '-' and is_binary(args.input):
+        in_fh = SubmissionReader(args.input)
+        skip = state['offset']
+    else:
+        in_fh = sys.stdin.buffer if args.input == '-' else open(args.input, 'rb')
+        if state['offset']:
+            in_fh.seek(state['offset'])
+    if args.output == '-':
+        out_fh = sys.stdout
+    else:
+        out_fh = open(args.output, 'a' if args.resume else 'w', encoding='utf-8')
+        if args.resume and state['out_offset'] is not None:
+            out_fh.truncate(state['out_offset'])  # drop lines of a window that was not checkpointed
+    try:
+        n = regrade(
+            in_fh, out_fh, args.tasks,
+            want=args.want, overrides=overrides, workers=args.workers,
+            window=args.window, chunksize=args.chunksize, checkpoint=args.checkpoint,
+            graded=state['graded'], skip=skip,
+        )
+    finally:
+        if archive is not None:
+            archive.close()
+        elif in_fh is not sys.stdin.buffer:
+            in_fh.close()
+        if out_fh is not sys.stdout:
+            out_fh.close()
+    print(f"{n} besvarelser rettet", file=sys.stderr)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,269 @@
+# ./problem/relation_engine.py
+"""
+Relasjonsmotor: alle MagRelation-krav i en oppgave som én lineær avbildning.
+
+Every relation side is a signed sum of terms, and every term is a feature of one drawn
+force: its magnitude (e_unit None) or its component along a unit direction. RelationTable
+numbers the distinct (force, direction) features of a task once, at compile time, and
+stores each side as a sparse coefficient row [(feature, sign), ...] in term order.
+
+Per submission:
+    x = table.extract(batch, matched)      # one pass over the features
+    lhs, rhs = table.sides(x)              # sparse mat-vec, LHS and RHS of every relation
+    errs = table.errors(lhs, rhs)          # relative ratio error per relation (inf when |RHS| ≈ 0)
+
+For many submissions, extract_many stacks the feature rows and sides_many applies the
+coefficients column by column over the whole stack (NumPy when available); evaluate_batch
+runs all three and hands back plain Python rows per submission, like evaluate() does for one.
+
+The older dict relations of evaluate.relation_score ("ratio"/"ratio_sum" with a component
+name) compile to the same table through RelationTable.from_components.
+
+Values are bit-identical to summing the terms one by one as evaluate_task did: the same
+utils.geometry calls give each feature, and each side is accumulated from 0.0 in term order.
+Forces that are not matched give NaN features; relations that use them are skipped by
+the callers anyway.
+"""
+from __future__ import annotations
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+import functools
+import math
+
+import utils.geometry as vec
+from problem.drawn_forces import ForceBatch
+
+@functools.lru_cache(maxsize=None)
+def _numpy():
+    """NumPy (valgfri: sides_many over en stabel innleveringer), importert ved første bruk."""
+    try:
+        import numpy
+    except ImportError:  # pragma: no cover
+        return None
+    return numpy
+
+Vec2 = Tuple[float, float]
+NAN = float('nan')
+
+# |RHS| below this makes the ratio undefined (as in evaluate_task)
+RHS_EPS = 1e-9
+
+Row = Tuple[Tuple[int, float], ...]
+# (x, lhs, rhs, errors) of one submission, see RelationTable.evaluate
+Values = Tuple[List[float], List[float], List[float], List[float]]
+
+class Term(NamedTuple):
+    """One relation term: sign * (|F| if e_unit is None else F · e_unit)."""
+    force_name: str
+    sign: float
+    e_unit: Optional[Vec2]
+
+class Relation(NamedTuple):
+    lhs: Tuple[Term, ...]
+    rhs: Tuple[Term, ...]
+    ratio: float
+
+def component_unit(comp, n_vec: Optional[Vec2]) -> Optional[Vec2]:
+    """
+    Enhetsretning for et komponentnavn (relation_score):
+      None/'full' -> None (magnitude)
+      'x'/'y'     -> XY-akse
+      'n'/'p'     -> komponent i np-basis (krever n_vec)
+      Component.* enum -> konvertert til string
+    """
+    if hasattr(comp, 'value'):
+        comp = comp.value
+    if comp is None or comp == "full":
+        return None
+    if comp == "x":
+        return (1.0, 0.0)
+    if comp == "y":
+        return (0.0, 1.0)
+    if comp in ("n", "p"):
+        if n_vec is None:
+            raise ValueError("np-komponent krever n_vec")
+        length = vec.norm(n_vec)
+        if length < 1e-9:
+            raise ValueError("np-komponent: n_vec cannot be zero vector")
+        e_n = (n_vec[0] / length, n_vec[1] / length)
+        return e_n if comp == "n" else (-e_n[1], e_n[0])
+    raise ValueError(f"Ukjent komponent: {comp}")
+
+class RelationTable:
+    """
+    Compiled relations: feature list plus sparse LHS/RHS coefficient rows.
+
+    relations: CompiledRelation-like objects (lhs, rhs: terms with force_name, sign, e_unit; ratio)
+    """
+
+    __slots__ = ('features', 'lhs', 'rhs', 'ratios', 'zero_dir')
+
+    def __init__(self, relations: Sequence[object]):
+        features: List[Tuple[str, Optional[Vec2]]] = []
+        index: Dict[Tuple[str, Optional[Vec2]], int] = {}
+
+        def row(terms) -> Row:
+            out = []
+            for term in terms:
+                key = (term.force_name, term.e_unit)
+                k = index.get(key)
+                if k is None:
+                    k = index[key] = len(features)
+                    features.append(key)
+                out.append((k, term.sign))
+            return tuple(out)
+
+        self.lhs: Tuple[Row, ...] = tuple(row(rel.lhs) for rel in relations)
+        self.rhs: Tuple[Row, ...] = tuple(row(rel.rhs) for rel in relations)
+        self.ratios: Tuple[float, ...] = tuple(rel.ratio for rel in relations)
+        self.features: Tuple[Tuple[str, Optional[Vec2]], ...] = tuple(features)
+        # Features with a zero direction: an error once such a term is actually evaluated
+        self.zero_dir = frozenset(k for k, (_, e) in enumerate(features) if e == (0.0, 0.0))
+
+    def __len__(self) -> int:
+        return len(self.ratios)
+
+    @classmethod
+    def from_components(
+        cls,
+        relations: Sequence[Tuple[Sequence[Tuple[str, float]], Sequence[Tuple[str, float]], float]],
+        comp,
+        n_vec: Optional[Vec2],
+    ) -> "RelationTable":
+        """
+        Table for weighted sums of one component: relations = [(num_terms, den_terms, target), ...]
+        with terms [(force, weight), ...], as in relation_score's "ratio_sum".
+        """
+        # A bad component is only an error once there is a term to evaluate
+        e = component_unit(comp, n_vec) if any(num or den for num, den, _ in relations) else None
+        return cls([
+            Relation(
+                tuple(Term(name, w, e) for name, w in num),
+                tuple(Term(name, w, e) for name, w in den),
+                target,
+            )
+            for num, den, target in relations
+        ])
+
+    # --- Features ---
+
+    def extract(self, batch: ForceBatch, matched: Dict[str, int]) -> List[float]:
+        """
+        Feature values for one submission. Unmatched force: NaN; matched force without a
+        vector: 0.0 (does not contribute); zero direction with a vector: NaN (see check).
+        """
+        x = []
+        for name, e in self.features:
+            j = matched.get(name)
+            if j is None:
+                x.append(NAN)
+                continue
+            v = batch.vec_at(j)
+            if v is None:
+                x.append(0.0)
+            elif e is None:
+                x.append(vec.norm(v))
+            elif e == (0.0, 0.0):
+                x.append(NAN)
+            else:
+                x.append(vec.dot(v, e))
+        return x
+
+    def check(self, r: int, x: Sequence[float]) -> None:
+        """Raise ValueError if relation r uses a zero-direction term on a drawn vector."""
+        if not self.zero_dir:
+            return
+        for k, _ in self.lhs[r] + self.rhs[r]:
+            if k in self.zero_dir and x[k] != x[k]:
+                raise ValueError("_mag_term_value: e_vec cannot be zero vector")
+
+    # --- Mat-vec ---
+
+    def sides(self, x: Sequence[float]) -> Tuple[List[float], List[float]]:
+        """(LHS per relation, RHS per relation) for one feature vector."""
+        lhs = []
+        for row in self.lhs:
+            acc = 0.0
+            for k, sign in row:
+                acc += sign * x[k]
+            lhs.append(acc)
+        rhs = []
+        for row in self.rhs:
+            acc = 0.0
+            for k, sign in row:
+                acc += sign * x[k]
+            rhs.append(acc)
+        return lhs, rhs
+
+    def errors(self, lhs: Sequence[float], rhs: Sequence[float]) -> List[float]:
+        """|LHS/RHS - ratio| / max(|ratio|, 1) per relation; inf when |RHS| < RHS_EPS."""
+        out = []
+        for l, r, target in zip(lhs, rhs, self.ratios):
+            if abs(r) < RHS_EPS:
+                out.append(math.inf)
+            else:
+                out.append(abs(l / r - target) / max(abs(target), 1.0))
+        return out
+
+    def evaluate(self, batch: ForceBatch, matched: Dict[str, int]) -> Values:
+        """(x, lhs, rhs, errors) for one submission."""
+        x = self.extract(batch, matched)
+        lhs, rhs = self.sides(x)
+        return x, lhs, rhs, self.errors(lhs, rhs)
+
+    # --- Batched ---
+
+    def extract_many(self, batches: Sequence[ForceBatch], matchings: Sequence[Dict[str, int]]):
+        """Feature matrix (one row per submission): NumPy array when available, else list of lists."""
+        rows = [self.extract(b, m) for b, m in zip(batches, matchings)]
+        np = _numpy()
+        if np is None:
+            return rows
+        return np.array(rows, dtype=np.float64).reshape(len(rows), len(self.features))
+
+    def sides_many(self, X):
+        """
+        (LHS, RHS) for a feature matrix from extract_many, shaped (submissions, relations).
+        Each side is accumulated term by term over the whole column, so values equal sides() per row.
+        """
+        np = _numpy()
+        if np is None or not isinstance(X, np.ndarray):
+            pairs = [self.sides(x) for x in X]
+            return [p[0] for p in pairs], [p[1] for p in pairs]
+        n = X.shape[0]
+
+        def apply(rows: Tuple[Row, ...]):
+            out = np.zeros((n, len(rows)))
+            for r, row in enumerate(rows):
+                acc = out[:, r]
+                for k, sign in row:
+                    acc += sign * X[:, k]
+            return out
+
+        return apply(self.lhs), apply(self.rhs)
+
+    def errors_many(self, lhs, rhs):
+        """errors() for every row of sides_many's output."""
+        np = _numpy()
+        if np is None or not isinstance(lhs, np.ndarray):
+            return [self.errors(l, r) for l, r in zip(lhs, rhs)]
+        target = np.array(self.ratios, dtype=np.float64)
+        small = np.abs(rhs) < RHS_EPS
+        with np.errstate(divide='ignore', invalid='ignore'):
+            err = np.abs(lhs / np.where(small, 1.0, rhs) - target) / np.maximum(np.abs(target), 1.0)
+        err[small] = math.inf
+        return err
+
+    def evaluate_batch(self, batches: Sequence[ForceBatch], matchings: Sequence[Dict[str, int]]) -> List[Values]:
+        """
+        evaluate() for many submissions: one stacked extraction and one mat-vec over the stack.
+        Rows come back as Python float lists, equal to evaluate(batches[k], matchings[k]).
+        """
+        if not batches:
+            return []
+        X = self.extract_many(batches, matchings)
+        lhs, rhs = self.sides_many(X)
+        errs = self.errors_many(lhs, rhs)
+        rows = (X, lhs, rhs, errs)
+        if hasattr(X, 'tolist'):
+            rows = tuple(a.tolist() for a in rows)
+        return list(zip(*rows))
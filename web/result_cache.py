@@ -0,0 +1,316 @@
+# ./problem/result_cache.py
+"""
+Resultat-cache foran evaluate_task for gjentatte rettinger.
+
+Key: (task fingerprint, match strategy, want, quantized drawing).
+  - task fingerprint: sha256 of a canonical JSON form of the TaskSpec (stable across runs)
+  - drawing: per drawn force (name, vec, anchor, arrowBase, editable) with coordinates
+    rounded to multiples of `quantum` (default GRID_STEP, the snap resolution)
+
+Drawings that differ by less than the snap resolution share one cached result: the
+result of the first drawing seen in that bucket. Use quantum=0 for exact keys.
+
+Plans are cached per task content: a TaskSpec is snapshotted (pickled) on every lookup, so
+a spec edited in place gets a new plan and fingerprint. A CompiledTask is immutable and is
+cached by identity, which makes it the cheapest thing to pass for repeated grading.
+
+Memory tier: LRU bounded by maxsize. Optional disk tier (disk_dir): one pickle file per
+key, consulted on memory misses and written on every store. Disk file names also hash the
+grader source (taskset.code_fingerprint), so a changed grader never reads old results;
+a file that cannot be unpickled counts as a miss.
+
+A hit costs a shallow copy: callers get a new top-level result (keys may be set or removed
+freely), while the nested details, feedback and overlays are shared read-only containers
+that raise TypeError when changed (copy.deepcopy gives plain, mutable copies).
+
+Usage:
+    cache = ResultCache(maxsize=4096, disk_dir="/var/cache/kraftpila")
+    result = cache.evaluate(task_spec, forces)
+    print(cache.stats())
+"""
+from __future__ import annotations
+from collections import OrderedDict
+from enum import Enum
+from typing import Dict, Hashable, Optional, Sequence, Tuple, Union
+import dataclasses
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+
+from utils.settings import GRID_STEP
+from problem.drawn_forces import ForceBatch, as_force_batch
+from problem.evaluate import CompiledTask, EvaluationResult, WANT_LEVELS, compile_task, _evaluate_compiled
+from problem.taskset import code_fingerprint
+
+Vec2 = Tuple[float, float]
+
+DEFAULT_MAXSIZE = 4096
+MAX_TASK_PLANS = 64  # Compiled plans kept per cache (one per distinct task content)
+
+# ------------------------------------------------------
+# Keys
+# ------------------------------------------------------
+
+def _canonical(obj):
+    """JSON-ready canonical form of a spec object (dataclasses, plain objects, enums, containers)."""
+    if obj is None or isinstance(obj, (bool, int, float, str)):
+        return obj
+    if isinstance(obj, Enum):
+        return {'__enum__': type(obj).__name__, 'value': _canonical(obj.value)}
+    if isinstance(obj, (list, tuple)):
+        return [_canonical(x) for x in obj]
+    if isinstance(obj, dict):
+        return {str(k): _canonical(v) for k, v in obj.items()}
+    if dataclasses.is_dataclass(obj):
+        fields = {f.name: _canonical(getattr(obj, f.name)) for f in dataclasses.fields(obj)}
+    elif hasattr(obj, '__dict__'):
+        fields = {k: _canonical(v) for k, v in vars(obj).items() if not k.startswith('_')}
+    elif hasattr(obj, '__slots__'):
+        fields = {k: _canonical(getattr(obj, k, None)) for k in obj.__slots__}
+    else:
+        return repr(obj)
+    fields['__type__'] = type(obj).__name__
+    return fields
+
+def task_fingerprint(task_spec: object) -> str:
+    """Stable hash (hex) of a TaskSpec or CompiledTask; equal specs give equal fingerprints."""
+    if isinstance(task_spec, CompiledTask):
+        task_spec = task_spec.task_spec
+    blob = json.dumps(_canonical(task_spec), sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(blob.encode('utf-8')).hexdigest()
+
+def _quantize(p: Optional[Vec2], quantum: float):
+    if p is None:
+        return None
+    if quantum <= 0:
+        return p
+    return (round(p[0] / quantum), round(p[1] / quantum))
+
+def drawing_key(drawn_forces: Union[ForceBatch, Sequence[object]], quantum: float = GRID_STEP) -> Tuple:
+    """Hashable key of a drawing with coordinates snapped to multiples of quantum."""
+    batch = as_force_batch(drawn_forces)
+    return tuple(
+        (
+            batch.names[i],
+            _quantize(batch.vec_at(i), quantum),
+            _quantize(batch.anchor_at(i), quantum),
+            _quantize(batch.base_at(i), quantum),
+            batch.is_editable(i),
+        )
+        for i in range(len(batch))
+    )
+
+# ------------------------------------------------------
+# Cache
+# ------------------------------------------------------
+
+def _read_only(*args, **kwargs):
+    raise TypeError("Bufrede resultater kan ikke endres (bruk copy.deepcopy)")
+
+class _ReadOnlyDict(dict):
+    """dict shared between cache hits; changes raise TypeError, copies and pickles are plain dicts."""
+    __slots__ = ()
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+
+    def __reduce__(self):
+        return (dict, (dict(self),))
+
+class _ReadOnlyList(list):
+    """list shared between cache hits; changes raise TypeError, copies and pickles are plain lists."""
+    __slots__ = ()
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _read_only
+    append = extend = insert = pop = remove = clear = sort = reverse = _read_only
+
+    def __reduce__(self):
+        return (list, (list(self),))
+
+def _freeze(obj):
+    """obj with every nested dict and list replaced by a read-only one."""
+    if isinstance(obj, dict):
+        return _ReadOnlyDict({k: _freeze(v) for k, v in obj.items()})
+    if isinstance(obj, list):
+        return _ReadOnlyList([_freeze(v) for v in obj])
+    return obj
+
+def _cached_result(result: EvaluationResult) -> EvaluationResult:
+    """The stored form of a result: top level as is, nested containers read-only."""
+    out = EvaluationResult({k: _freeze(v) for k, v in result.items()})
+    if result._overlay_source is not None:
+        out.defer_overlays(*result._overlay_source)
+    return out
+
+def _copy_result(result: EvaluationResult) -> EvaluationResult:
+    """Result handed to callers: new top level sharing the read-only values (keeps deferred overlays)."""
+    out = EvaluationResult(result)
+    if result._overlay_source is not None:
+        out.defer_overlays(*result._overlay_source)
+    return out
+
+def _spec_key(task_spec: object) -> Hashable:
+    """Content snapshot of a TaskSpec: its pickle (fast), or its fingerprint when it cannot be pickled."""
+    try:
+        return pickle.dumps(task_spec, protocol=pickle.HIGHEST_PROTOCOL)
+    except Exception:  # e.g. a spec holding a lambda: fall back to the canonical form
+        return task_fingerprint(task_spec)
+
+class ResultCache:
+    """
+    Content-addressed cache of evaluation results.
+
+    maxsize: entries kept in memory (LRU eviction)
+    quantum: coordinate snap resolution of the key (default GRID_STEP; 0 = exact)
+    disk_dir: optional directory for the persistent tier
+    """
+
+    def __init__(
+        self,
+        maxsize: int = DEFAULT_MAXSIZE,
+        *,
+        quantum: float = GRID_STEP,
+        disk_dir: Optional[str] = None,
+    ):
+        self.maxsize = max(1, int(maxsize))
+        self.quantum = quantum
+        self.disk_dir = disk_dir
+        self._code: Optional[str] = None
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+        self._entries: "OrderedDict[Hashable, EvaluationResult]" = OrderedDict()
+        # spec snapshot (or ('plan', id) for a CompiledTask) -> (fingerprint, plan)
+        self._tasks: "OrderedDict[Hashable, Tuple[str, CompiledTask]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self.evictions = 0
+
+    # --- Task plans ---
+
+    def _task(self, task_spec: object) -> Tuple[str, CompiledTask]:
+        """(fingerprint, plan) for the task's current content."""
+        compiled = isinstance(task_spec, CompiledTask)
+        key = ('plan', id(task_spec)) if compiled else _spec_key(task_spec)
+        entry = self._tasks.get(key)
+        if entry is not None and (not compiled or entry[1] is task_spec):
+            self._tasks.move_to_end(key)
+            return entry
+        plan = task_spec if isinstance(task_spec, CompiledTask) else compile_task(task_spec)
+        entry = self._tasks[key] = (task_fingerprint(plan), plan)  # the plan keeps an id key valid
+        if len(self._tasks) > MAX_TASK_PLANS:
+            self._tasks.popitem(last=False)
+        return entry
+
+    # --- Lookup ---
+
+    def key(self, task_spec: object, drawn_forces: Union[ForceBatch, Sequence[object]], want: str = "full") -> Tuple:
+        fingerprint, plan = self._task(task_spec)
+        return (fingerprint, plan.match_strategy, want, drawing_key(drawn_forces, self.quantum))
+
+    def evaluate(
+        self,
+        task_spec: object,
+        drawn_forces: Union[ForceBatch, Sequence[object]],
+        *,
+        want: str = "full",
+    ) -> EvaluationResult:
+        """evaluate_task through the cache."""
+        if want not in WANT_LEVELS:
+            raise ValueError(f"Ukjent want: {want}")
+        fingerprint, plan = self._task(task_spec)
+        batch = as_force_batch(drawn_forces)
+        key = (fingerprint, plan.match_strategy, want, drawing_key(batch, self.quantum))
+
+        result = self._entries.get(key)
+        if result is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return _copy_result(result)
+
+        if self.disk_dir:
+            result = self._disk_load(key, plan)
+            if result is not None:
+                self.disk_hits += 1
+                self.hits += 1
+                return _copy_result(self._store(key, result))
+
+        self.misses += 1
+        result = _evaluate_compiled(plan, batch, want)
+        result.timings = None
+        if self.disk_dir:
+            self._disk_save(key, result)
+        return _copy_result(self._store(key, result))
+
+    def _store(self, key: Hashable, result: EvaluationResult) -> EvaluationResult:
+        stored = self._entries[key] = _cached_result(result)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        return stored
+
+    # --- Disk tier ---
+
+    def _disk_path(self, key: Tuple) -> str:
+        if self._code is None:
+            self._code = code_fingerprint()
+        digest = hashlib.sha256(f"{self._code}:{key!r}".encode('utf-8')).hexdigest()
+        return os.path.join(self.disk_dir, digest[:2], digest + '.pkl')
+
+    def _disk_load(self, key: Tuple, plan: CompiledTask) -> Optional[EvaluationResult]:
+        path = self._disk_path(key)
+        try:
+            with open(path, 'rb') as fh:
+                stored_key, payload, overlay_log = pickle.load(fh)
+        except Exception:  # missing, torn or stale (e.g. pickled by an older grader): a miss
+            return None
+        if stored_key != key:  # sha256 collision or foreign file
+            return None
+        result = EvaluationResult(payload)
+        if overlay_log is not None:
+            result.defer_overlays(plan, overlay_log)
+        return result
+
+    def _disk_save(self, key: Tuple, result: EvaluationResult) -> None:
+        path = self._disk_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Deferred overlays are stored as the compact log; the plan is re-attached on load
+        data = (key, dict(result), result.overlay_log)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as fh:
+                pickle.dump(data, fh, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+        except OSError:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+
+    # --- Stats ---
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'disk_hits': self.disk_hits,
+            'evictions': self.evictions,
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+    def clear(self, *, disk: bool = False) -> None:
+        """Empty the memory tier (and the disk tier if disk=True); resets stats."""
+        self._entries.clear()
+        self._tasks.clear()
+        self.hits = self.misses = self.disk_hits = self.evictions = 0
+        if disk and self.disk_dir:
+            for root, _, files in os.walk(self.disk_dir):
+                for name in files:
+                    if name.endswith('.pkl'):
+                        os.unlink(os.path.join(root, name))
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,455 @@
+# ./problem/submission_archive.py
+"""
+Arkiv for innleverte tegninger: append-only, minnetilordnet, indeksert på oppgave, elev og tid.
+
+An archive is a directory:
+    data.bin     records, each aligned to 8 bytes:
+                     id length u16 (NONE16 = no id) | id (JSON, utf-8) | force block
+                 (force block as in problem.submission_format: names, editable, coordinates)
+    strings.bin  interned strings (force names, task ids, students): length u32 | utf-8 bytes
+    index.bin    one fixed 32-byte entry per record:
+                     data offset u64 | forces u32 | task u32 | student u32 | reserved u32 | timestamp f64
+    meta.json    {"version": 1, "float32": false}
+
+Appends write the record and any new strings first and the index entry last, so the index
+is the commit point: after a crash the archive holds every record whose entry was written
+(a torn last entry is dropped when the archive is reopened for writing).
+One process appends at a time; readers may open the same directory with readonly=True.
+
+Queries return record numbers (append order). get() is random access through the data
+mapping; records() scans a selection in order and yields (id, task_id, ForceBatch) as
+SubmissionReader does, so it feeds regrade / the batch grader directly.
+
+Usage:
+    with SubmissionArchive('arkiv/') as archive:
+        archive.append('Intro 1', forces_json, student='ola', timestamp=time.time())
+        for record_id, task_id, batch in archive.records(archive.select(task_id='Intro 1')):
+            print(evaluate_task(TASKS[task_id], batch)['score'])
+
+    python -m problem.submission_archive import-localstorage arkiv/ dump.json --student ola
+    python -m problem.submission_archive import-jsonl arkiv/ subs.jsonl
+    python -m problem.submission_archive stats arkiv/
+"""
+from __future__ import annotations
+from array import array
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple, Union
+import argparse
+import bisect
+import json
+import math
+import mmap
+import os
+import struct
+import sys
+
+from problem.drawn_forces import ForceBatch, as_force_batch
+from problem.submission_format import NONE, NONE16, decode_forces, encode_forces
+
+VERSION = 1
+LOCAL_STORAGE_PREFIX = 'tk_forces_'  # browser localStorage key of the saved forces of a task
+
+_ENTRY = struct.Struct('<QIIIId')
+_ID = struct.Struct('<H')
+_U32 = struct.Struct('<I')
+_ANY = object()  # select(): no filter on this field
+
+class SubmissionMeta(NamedTuple):
+    record_id: object
+    task_id: object
+    student: Optional[str]
+    timestamp: Optional[float]
+
+class SubmissionArchive:
+    """
+    Append-only submission archive in directory `path` (created if missing unless readonly).
+
+    float32: coordinate width for a new archive (an existing archive keeps its own)
+    """
+
+    def __init__(self, path: str, *, readonly: bool = False, float32: bool = False):
+        self.path = path
+        self.readonly = readonly
+        meta_path = os.path.join(path, 'meta.json')
+        if not os.path.exists(meta_path):
+            if readonly:
+                raise FileNotFoundError(f"Fant ikke arkiv: {path}")
+            os.makedirs(path, exist_ok=True)
+            with open(meta_path, 'w', encoding='utf-8') as fh:
+                json.dump({'version': VERSION, 'float32': bool(float32)}, fh)
+        with open(meta_path, 'r', encoding='utf-8') as fh:
+            meta = json.load(fh)
+        if meta.get('version') != VERSION:
+            raise ValueError(f"Ukjent arkivversjon: {meta.get('version')}")
+        self.float32 = bool(meta.get('float32'))
+
+        self._strings: List[str] = []
+        self._string_index: Dict[str, int] = {}
+        self._offsets = array('Q')
+        self._counts = array('I')
+        self._tasks = array('I')
+        self._students = array('I')
+        self._times = array('d')
+        self._by_task: Dict[int, array] = {}
+        self._by_student: Dict[int, array] = {}
+        self._times_sorted = True  # timestamps non-decreasing in append order (bisect in select)
+        self._strings_read = 0  # bytes of strings.bin / index.bin already loaded
+        self._index_read = 0
+        self.refresh()
+
+        self._map: Optional[mmap.mmap] = None
+        self._view: Optional[memoryview] = None
+        self._data_fh = self._strings_fh = self._index_fh = None
+        if not readonly:
+            self._data_fh = open(os.path.join(path, 'data.bin'), 'ab')
+            self._strings_fh = open(os.path.join(path, 'strings.bin'), 'ab')
+            self._index_fh = open(os.path.join(path, 'index.bin'), 'ab')
+        self._data_size = self._file_size('data.bin')
+        self._dirty = False
+
+    # --- Loading ---
+
+    def _file_size(self, name: str) -> int:
+        try:
+            return os.path.getsize(os.path.join(self.path, name))
+        except OSError:
+            return 0
+
+    def _read_from(self, name: str, offset: int) -> bytes:
+        try:
+            with open(os.path.join(self.path, name), 'rb') as fh:
+                fh.seek(offset)
+                return fh.read()
+        except FileNotFoundError:
+            return b''
+
+    def _truncate(self, name: str, size: int) -> None:
+        with open(os.path.join(self.path, name), 'r+b') as fh:
+            fh.truncate(size)
+
+    def refresh(self) -> int:
+        """Load records appended (by another process) since opening; returns how many."""
+        data = self._read_from('strings.bin', self._strings_read)
+        at = 0
+        while at + 4 <= len(data):
+            (length,) = _U32.unpack_from(data, at)
+            if at + 4 + length > len(data):
+                break
+            self._add_string(str(data[at + 4:at + 4 + length], 'utf-8'))
+            at += 4 + length
+        self._strings_read += at
+        if at != len(data) and not self.readonly:
+            self._truncate('strings.bin', self._strings_read)  # torn append before a crash
+
+        data = self._read_from('index.bin', self._index_read)
+        whole = len(data) - len(data) % _ENTRY.size
+        if whole != len(data) and not self.readonly:
+            self._truncate('index.bin', self._index_read + whole)
+        before = len(self)
+        for entry in _ENTRY.iter_unpack(memoryview(data)[:whole]):
+            self._index(*entry)
+        self._index_read += whole
+        return len(self) - before
+
+    def _add_string(self, s: str) -> int:
+        idx = self._string_index.get(s)
+        if idx is None:
+            idx = self._string_index[s] = len(self._strings)
+            self._strings.append(s)
+        return idx
+
+    def _index(self, offset: int, count: int, task: int, student: int, _reserved: int, timestamp: float) -> None:
+        i = len(self._offsets)
+        self._offsets.append(offset)
+        self._counts.append(count)
+        self._tasks.append(task)
+        self._students.append(student)
+        if self._times and not (timestamp >= self._times[-1]):
+            self._times_sorted = False
+        self._times.append(timestamp)
+        self._by_task.setdefault(task, array('I')).append(i)
+        self._by_student.setdefault(student, array('I')).append(i)
+
+    # --- Appending ---
+
+    def _intern(self, s: str) -> int:
+        idx = self._string_index.get(s)
+        if idx is None:
+            idx = self._add_string(s)
+            data = s.encode('utf-8')
+            self._strings_fh.write(_U32.pack(len(data)) + data)
+            self._strings_read += 4 + len(data)
+        return idx
+
+    def append(
+        self,
+        task_id,
+        forces: Union[ForceBatch, Sequence[object]],
+        *,
+        student: Optional[str] = None,
+        timestamp: Optional[float] = None,
+        record_id=None,
+    ) -> int:
+        """Store one submission (forces: ForceBatch, client force dicts or force objects); returns its record number."""
+        if self.readonly:
+            raise ValueError("Arkivet er åpnet skrivebeskyttet")
+        if isinstance(forces, ForceBatch):
+            batch = forces
+        elif forces and isinstance(forces[0], dict):
+            batch = ForceBatch.from_json(forces)
+        else:
+            batch = as_force_batch(forces)
+        if len(batch) >= NONE16:
+            raise ValueError(f"For mange krefter i én besvarelse: {len(batch)}")
+        id_bytes = b'' if record_id is None else json.dumps(record_id, ensure_ascii=False).encode('utf-8')
+        if len(id_bytes) >= NONE16:
+            raise ValueError("For lang id")
+
+        offset = self._data_size + (-self._data_size % 8)
+        head = _ID.pack(NONE16 if record_id is None else len(id_bytes)) + id_bytes
+        block = encode_forces(batch, self._intern, offset + len(head), self.float32)
+        self._data_fh.write(b'\0' * (offset - self._data_size) + head + block)
+        self._data_size = offset + len(head) + len(block)
+
+        task = NONE if task_id is None else self._intern(json.dumps(task_id, ensure_ascii=False))
+        who = NONE if student is None else self._intern(str(student))
+        when = math.nan if timestamp is None else float(timestamp)
+        self._strings_fh.flush()
+        self._data_fh.flush()
+        entry = (offset, len(batch), task, who, 0, when)
+        self._index_fh.write(_ENTRY.pack(*entry))
+        self._index_read += _ENTRY.size
+        self._index(*entry)
+        self._dirty = True
+        return len(self._offsets) - 1
+
+    def flush(self) -> None:
+        """Push appended index entries to the OS (data and strings are flushed on every append)."""
+        if self._index_fh is not None:
+            self._index_fh.flush()
+        self._dirty = False
+
+    def close(self) -> None:
+        self.flush()
+        for fh in (self._data_fh, self._strings_fh, self._index_fh):
+            if fh is not None:
+                fh.close()
+        self._data_fh = self._strings_fh = self._index_fh = None
+        self._view = None
+        if self._map is not None:
+            try:
+                self._map.close()
+            except BufferError:  # batches handed out still reference it
+                pass
+            self._map = None
+
+    def __enter__(self) -> "SubmissionArchive":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # --- Random access ---
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def _data(self, end: int) -> memoryview:
+        """A view of data.bin covering at least `end` bytes (remapped after appends)."""
+        if self._view is None or len(self._view) < end:
+            if self._dirty:
+                self.flush()
+            size = self._file_size('data.bin')
+            if size < end:
+                raise ValueError("Ødelagt arkiv: data.bin er kortere enn indeksen")
+            with open(os.path.join(self.path, 'data.bin'), 'rb') as fh:
+                # The old mapping is left to the garbage collector: batches may still view it
+                self._map = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+            self._view = memoryview(self._map)
+        return self._view
+
+    def _string(self, idx: int):
+        return None if idx == NONE else self._strings[idx]
+
+    def meta(self, i: int) -> SubmissionMeta:
+        """Metadata of record i (record id is read from the data file)."""
+        return SubmissionMeta(self._record_id(i)[0], self._task_id(i), self._string(self._students[i]), self._time(i))
+
+    def _task_id(self, i: int):
+        task = self._tasks[i]
+        return None if task == NONE else json.loads(self._strings[task])
+
+    def _time(self, i: int) -> Optional[float]:
+        t = self._times[i]
+        return None if t != t else t
+
+    def _record_id(self, i: int) -> Tuple[object, int]:
+        offset = self._offsets[i]
+        buf = self._data(offset + _ID.size)
+        (length,) = _ID.unpack_from(buf, offset)
+        at = offset + _ID.size
+        if length == NONE16:
+            return None, at
+        buf = self._data(at + length)
+        return json.loads(str(buf[at:at + length], 'utf-8')), at + length
+
+    def get(self, i: int) -> Tuple[object, object, ForceBatch]:
+        """(record id, task id, ForceBatch) of record i; coordinates view the mapping (float64)."""
+        if i < 0:
+            i += len(self)
+        record_id, at = self._record_id(i)
+        n = self._counts[i]
+        width = 4 if self.float32 else 8
+        end = at + 5 * n
+        end += -end % width + 6 * n * width
+        batch, _ = decode_forces(self._data(end), at, n, self._strings, self.float32)
+        return record_id, self._task_id(i), batch
+
+    # --- Queries ---
+
+    def task_ids(self) -> List[object]:
+        return [json.loads(self._strings[t]) for t in self._by_task if t != NONE]
+
+    def students(self) -> List[str]:
+        return [self._strings[s] for s in self._by_student if s != NONE]
+
+    def count(self, task_id=_ANY) -> int:
+        """Records of task_id (all records when omitted)."""
+        if task_id is _ANY:
+            return len(self)
+        return len(self._rows(self._by_task, None if task_id is None else json.dumps(task_id, ensure_ascii=False)))
+
+    def _rows(self, by: Dict[int, array], key: Optional[str]) -> array:
+        idx = NONE if key is None else self._string_index.get(key)
+        if idx is None:
+            return array('I')
+        return by.get(idx, array('I'))
+
+    def select(
+        self,
+        *,
+        task_id=_ANY,
+        student=_ANY,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+    ) -> List[int]:
+        """
+        Record numbers (ascending) matching every given filter; since <= timestamp < until.
+        Records without a timestamp never match a time filter.
+        """
+        candidates: Optional[Sequence[int]] = None
+        if task_id is not _ANY:
+            candidates = self._rows(self._by_task, None if task_id is None else json.dumps(task_id, ensure_ascii=False))
+        if student is not _ANY:
+            rows = self._rows(self._by_student, None if student is None else str(student))
+            candidates = rows if candidates is None else _intersect(candidates, rows)
+        if since is None and until is None:
+            return list(range(len(self))) if candidates is None else list(candidates)
+
+        lo = -math.inf if since is None else since
+        hi = math.inf if until is None else until
+        times = self._times
+        if candidates is None:
+            if self._times_sorted:
+                return list(range(bisect.bisect_left(times, lo), bisect.bisect_left(times, hi)))
+            candidates = range(len(self))
+        return [i for i in candidates if lo <= times[i] < hi]
+
+    # --- Scans ---
+
+    def records(self, indices: Optional[Iterable[int]] = None) -> Iterator[Tuple[object, object, ForceBatch]]:
+        """(record id, task id, ForceBatch) for indices (all records by default), in the given order."""
+        if indices is None:
+            indices = range(len(self))
+        for i in indices:
+            yield self.get(i)
+
+def _intersect(a: Sequence[int], b: Sequence[int]) -> List[int]:
+    """Common elements of two ascending sequences (binary search in the longer one)."""
+    if len(a) > len(b):
+        a, b = b, a
+    out = []
+    for i in a:
+        k = bisect.bisect_left(b, i)
+        if k < len(b) and b[k] == i:
+            out.append(i)
+    return out
+
+# ------------------------------------------------------
+# Import
+# ------------------------------------------------------
+
+def import_local_storage(
+    archive: SubmissionArchive,
+    dump: Dict[str, object],
+    *,
+    student: Optional[str] = None,
+    timestamp: Optional[float] = None,
+) -> int:
+    """
+    Append the saved drawings of a browser localStorage dump ({key: JSON string or value}):
+    one record per tk_forces_<task id> key. Returns the number of records appended.
+    """
+    n = 0
+    for key, value in dump.items():
+        if not key.startswith(LOCAL_STORAGE_PREFIX):
+            continue
+        forces = json.loads(value) if isinstance(value, str) else value
+        if not isinstance(forces, list):
+            continue
+        archive.append(key[len(LOCAL_STORAGE_PREFIX):], forces, student=student, timestamp=timestamp)
+        n += 1
+    return n
+
+def import_jsonl(archive: SubmissionArchive, path: str) -> int:
+    """Append JSONL submissions ({id, task_id, forces, student?, timestamp?}); returns records appended."""
+    n = 0
+    with open(path, 'r', encoding='utf-8') as fh:
+        for line in fh:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            archive.append(
+                record.get('task_id'),
+                ForceBatch.from_json(record.get('forces') or []),
+                student=record.get('student'),
+                timestamp=record.get('timestamp'),
+                record_id=record.get('id'),
+            )
+            n += 1
+    return n
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Arkiv for besvarelser")
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('import-localstorage', help="localStorage dump (JSON object) -> archive")
+    p.add_argument('archive')
+    p.add_argument('dump')
+    p.add_argument('--student')
+    p.add_argument('--timestamp', type=float, help="default: the dump file's modification time")
+    p = sub.add_parser('import-jsonl', help="JSONL submissions -> archive")
+    p.add_argument('archive')
+    p.add_argument('input')
+    p = sub.add_parser('stats', help="records per task")
+    p.add_argument('archive')
+    args = parser.parse_args(argv)
+
+    if args.command == 'stats':
+        with SubmissionArchive(args.archive, readonly=True) as archive:
+            print(f"{len(archive)} besvarelser, {len(archive.students())} elever")
+            for task_id in archive.task_ids():
+                print(f"  {task_id}: {archive.count(task_id)}")
+        return 0
+    with SubmissionArchive(args.archive) as archive:
+        if args.command == 'import-localstorage':
+            with open(args.dump, 'r', encoding='utf-8') as fh:
+                dump = json.load(fh)
+            timestamp = args.timestamp if args.timestamp is not None else os.path.getmtime(args.dump)
+            n = import_local_storage(archive, dump, student=args.student, timestamp=timestamp)
+        else:
+            n = import_jsonl(archive, args.input)
+    print(f"{n} besvarelser lagt til", file=sys.stderr)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
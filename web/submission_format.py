@@ -0,0 +1,324 @@
+# ./problem/submission_format.py
+"""
+Binært format for besvarelser (.kpsb): rask masseretting uten JSON-parsing.
+
+Layout (little-endian):
+    file header   'KPSB' | version u8 | flags u8 | reserved u16 | string table offset u64
+    sections      one per run of consecutive records with the same task id:
+                      task u32 (string index, NONE = no task id) | records u32
+                  followed by its records:
+                      id length u16 (NONE16 = no id) | forces n u16 | id (JSON, utf-8)
+                      names    n * u32 (string index)
+                      editable n * u8
+                      padding to the coordinate width
+                      vec, anchor, base: 2n coordinates each, [x0, y0, x1, y1, ...], NaN = missing
+    string table  count u32, then per string: length u32 | utf-8 bytes
+
+Coordinates are float64, or float32 with flags & FLAG_FLOAT32 (half the size, ~7 digits).
+Record ids and task ids are stored as JSON text so their type survives (17 vs "17").
+Force names and task ids are interned in the string table.
+
+SubmissionReader maps the file and yields (id, task_id, ForceBatch) per record. For float64
+files the ForceBatch coordinate columns are memoryviews into the mapping (no copies and no
+per-force objects); for float32 files each column is converted to one array('d').
+Batches are views: they are valid while the reader is open (pickling a ForceBatch copies it).
+
+Usage:
+    convert_jsonl('subs.jsonl', 'subs.kpsb')
+    with SubmissionReader('subs.kpsb') as reader:
+        for record_id, task_id, batch in reader:
+            evaluate_task(tasks[task_id], batch)
+
+    python -m problem.submission_format to-binary subs.jsonl subs.kpsb [--float32]
+    python -m problem.submission_format to-jsonl subs.kpsb subs.jsonl
+"""
+from __future__ import annotations
+from array import array
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
+import argparse
+import json
+import mmap
+import struct
+import sys
+
+from problem.drawn_forces import ForceBatch, as_force_batch
+
+MAGIC = b'KPSB'
+VERSION = 1
+FLAG_FLOAT32 = 0x01
+NONE = 0xFFFFFFFF     # string index: no task id
+NONE16 = 0xFFFF       # id length: no record id
+
+_HEADER = struct.Struct('<4sBBHQ')
+_SECTION = struct.Struct('<II')
+_RECORD = struct.Struct('<HH')
+_U32 = struct.Struct('<I')
+
+if sys.byteorder != 'little':  # array/memoryview use native order
+    raise ImportError("submission_format krever en little-endian maskin")
+
+def _pad(offset: int, width: int) -> int:
+    return -offset % width
+
+def encode_forces(batch: ForceBatch, intern, offset: int, float32: bool = False) -> bytes:
+    """
+    The force block of a record (names, editable, padding, coordinates) starting at `offset`
+    from the start of the mapping; intern maps a name to its string index.
+    """
+    head = array('I', [intern(name or '') for name in batch.names]).tobytes() + bytes(batch.editable)
+    width = 4 if float32 else 8
+    typecode = 'f' if float32 else 'd'
+    parts = [head, b'\0' * _pad(offset + len(head), width)]
+    for column in (batch.vec, batch.anchor, batch.base):
+        parts.append(array(typecode, column).tobytes())
+    return b''.join(parts)
+
+def decode_forces(buf: memoryview, at: int, n: int, strings: Sequence[str], float32: bool = False) -> Tuple[ForceBatch, int]:
+    """(ForceBatch of the force block of n forces at `at`, offset after it); float64 columns are views into buf."""
+    width = 4 if float32 else 8
+    names = [strings[i] for i in buf[at:at + 4 * n].cast('I')]
+    at += 4 * n
+    editable = buf[at:at + n]
+    at += n + _pad(at + n, width)
+    columns = []
+    for _ in range(3):
+        view = buf[at:at + 2 * n * width].cast('f' if float32 else 'd')
+        columns.append(array('d', view) if float32 else view)
+        at += 2 * n * width
+    return ForceBatch(names, columns[0], columns[1], columns[2], editable), at
+
+def is_binary(path: str) -> bool:
+    """True if path starts with the .kpsb magic."""
+    try:
+        with open(path, 'rb') as fh:
+            return fh.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+# ------------------------------------------------------
+# Writer
+# ------------------------------------------------------
+
+class SubmissionWriter:
+    """
+    Appends records to a seekable binary file handle; close() writes the string table.
+
+    float32: store coordinates as float32 instead of float64
+    """
+
+    def __init__(self, fh, *, float32: bool = False):
+        self.fh = fh
+        self.float32 = float32
+        self._strings: List[str] = []
+        self._index: Dict[str, int] = {}
+        self._section_task: Optional[int] = None
+        self._section_at: Optional[int] = None
+        self._section_count = 0
+        self._start = fh.tell()
+        self._offset = self._start + _HEADER.size
+        fh.write(_HEADER.pack(MAGIC, VERSION, FLAG_FLOAT32 if float32 else 0, 0, 0))
+        self.records = 0
+
+    def __enter__(self) -> "SubmissionWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _intern(self, s: str) -> int:
+        idx = self._index.get(s)
+        if idx is None:
+            idx = self._index[s] = len(self._strings)
+            self._strings.append(s)
+        return idx
+
+    def _write(self, data: bytes) -> None:
+        self.fh.write(data)
+        self._offset += len(data)
+
+    def _end_section(self) -> None:
+        if self._section_at is None:
+            return
+        end = self.fh.tell()
+        self.fh.seek(self._section_at)
+        self.fh.write(_SECTION.pack(self._section_task, self._section_count))
+        self.fh.seek(end)
+        self._section_at = None
+
+    def write(self, record_id, task_id, forces: Union[ForceBatch, Sequence[object]]) -> None:
+        """Append one submission (forces: ForceBatch or force objects)."""
+        batch = as_force_batch(forces)
+        n = len(batch)
+        if n >= NONE16:
+            raise ValueError(f"For mange krefter i én besvarelse: {n}")
+        task = NONE if task_id is None else self._intern(json.dumps(task_id, ensure_ascii=False))
+        if self._section_at is None or task != self._section_task:
+            self._end_section()
+            self._section_task = task
+            self._section_at = self._offset
+            self._section_count = 0
+            self._write(_SECTION.pack(task, 0))
+        id_bytes = b'' if record_id is None else json.dumps(record_id, ensure_ascii=False).encode('utf-8')
+        if len(id_bytes) >= NONE16:
+            raise ValueError("For lang id")
+        self._write(_RECORD.pack(NONE16 if record_id is None else len(id_bytes), n))
+        self._write(id_bytes)
+        self._write(encode_forces(batch, self._intern, self._offset - self._start, self.float32))
+        self._section_count += 1
+        self.records += 1
+
+    def close(self) -> None:
+        """Write the string table and patch the header (the file handle stays open)."""
+        if self._strings is None:
+            return
+        self._end_section()
+        table_at = self._offset - self._start
+        self._write(_U32.pack(len(self._strings)))
+        for s in self._strings:
+            data = s.encode('utf-8')
+            self._write(_U32.pack(len(data)))
+            self._write(data)
+        end = self.fh.tell()
+        self.fh.seek(self._start)
+        self.fh.write(_HEADER.pack(MAGIC, VERSION, FLAG_FLOAT32 if self.float32 else 0, 0, table_at))
+        self.fh.seek(end)
+        self._strings = None
+
+# ------------------------------------------------------
+# Reader
+# ------------------------------------------------------
+
+class SubmissionReader:
+    """Memory-mapped reader of a .kpsb file (or any bytes-like buffer)."""
+
+    def __init__(self, source: Union[str, bytes, bytearray, memoryview]):
+        self._fh = None
+        self._mmap = None
+        if isinstance(source, str):
+            self._fh = open(source, 'rb')
+            self._mmap = mmap.mmap(self._fh.fileno(), 0, access=mmap.ACCESS_READ)
+            self._buf = memoryview(self._mmap)
+        else:
+            self._buf = memoryview(source).cast('B')
+        if len(self._buf) < _HEADER.size:
+            raise ValueError("Ikke en .kpsb-fil (for kort)")
+        magic, version, flags, _, table_at = _HEADER.unpack_from(self._buf, 0)
+        if magic != MAGIC:
+            raise ValueError("Ikke en .kpsb-fil")
+        if version != VERSION:
+            raise ValueError(f"Ukjent .kpsb-versjon: {version}")
+        if table_at == 0:
+            raise ValueError("Ufullstendig .kpsb-fil (mangler strengtabell)")
+        self.float32 = bool(flags & FLAG_FLOAT32)
+        self._table_at = table_at
+        self.strings = self._read_strings(table_at)
+
+    def _read_strings(self, at: int) -> List[str]:
+        buf = self._buf
+        (count,) = _U32.unpack_from(buf, at)
+        at += 4
+        strings = []
+        for _ in range(count):
+            (length,) = _U32.unpack_from(buf, at)
+            at += 4
+            strings.append(str(buf[at:at + length], 'utf-8'))
+            at += length
+        return strings
+
+    def __enter__(self) -> "SubmissionReader":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Release the mapping; batches handed out must no longer be used."""
+        if self._buf is not None:
+            self._buf.release()
+            self._buf = None
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:  # a caller still holds a view; the OS unmaps it later
+                pass
+            self._mmap = None
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+    def __iter__(self) -> Iterator[Tuple[object, object, ForceBatch]]:
+        buf = self._buf
+        strings = self.strings
+        at = _HEADER.size
+        end = self._table_at
+        while at < end:
+            task, count = _SECTION.unpack_from(buf, at)
+            at += _SECTION.size
+            task_id = None if task == NONE else json.loads(strings[task])
+            for _ in range(count):
+                id_len, n = _RECORD.unpack_from(buf, at)
+                at += _RECORD.size
+                record_id = None
+                if id_len != NONE16:
+                    record_id = json.loads(str(buf[at:at + id_len], 'utf-8'))
+                    at += id_len
+                batch, at = decode_forces(buf, at, n, strings, self.float32)
+                yield record_id, task_id, batch
+
+# ------------------------------------------------------
+# JSON conversion
+# ------------------------------------------------------
+
+def convert_jsonl(in_path: str, out_path: str, *, float32: bool = False) -> int:
+    """JSONL submissions ({id, task_id, forces}, as for regrade) -> .kpsb; returns records written."""
+    with open(in_path, 'r', encoding='utf-8') as src, open(out_path, 'wb') as dst:
+        with SubmissionWriter(dst, float32=float32) as writer:
+            for line in src:
+                line = line.strip()
+                if not line:
+                    continue
+                record = json.loads(line)
+                writer.write(record.get('id'), record.get('task_id'), ForceBatch.from_json(record.get('forces') or []))
+            return writer.records
+
+def _force_json(batch: ForceBatch, i: int) -> Dict[str, object]:
+    vec, anchor, base = batch.vec_at(i), batch.anchor_at(i), batch.base_at(i)
+    return {
+        'name': batch.names[i],
+        'vec': list(vec) if vec is not None else None,
+        'anchor': list(anchor) if anchor is not None else None,
+        'arrowBase': list(base) if base is not None else None,
+        'editable': batch.is_editable(i),
+    }
+
+def to_jsonl(in_path: str, out_path: str) -> int:
+    """.kpsb -> JSONL with forces as {name, vec, anchor, arrowBase, editable}; returns records written."""
+    n = 0
+    with SubmissionReader(in_path) as reader, open(out_path, 'w', encoding='utf-8') as dst:
+        for record_id, task_id, batch in reader:
+            forces = [_force_json(batch, i) for i in range(len(batch))]
+            dst.write(json.dumps({'id': record_id, 'task_id': task_id, 'forces': forces}, ensure_ascii=False))
+            dst.write('\n')
+            n += 1
+    return n
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Konvertering mellom JSONL og .kpsb")
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('to-binary', help="JSONL -> .kpsb")
+    p.add_argument('input')
+    p.add_argument('output')
+    p.add_argument('--float32', action='store_true', help="float32 coordinates (half the size)")
+    p = sub.add_parser('to-jsonl', help=".kpsb -> JSONL")
+    p.add_argument('input')
+    p.add_argument('output')
+    args = parser.parse_args(argv)
+    if args.command == 'to-binary':
+        n = convert_jsonl(args.input, args.output, float32=args.float32)
+    else:
+        n = to_jsonl(args.input, args.output)
+    print(f"{n} besvarelser konvertert", file=sys.stderr)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,231 @@
+# ./problem/sweep.py
+"""
+Toleranse-sveip: hvordan endres karakterfordelingen hvis toleransene endres?
+
+Evaluates a set of submissions of one task against a grid of Tolerances values in one
+pass. Per submission, everything that does not depend on the tolerances is measured once:
+  - the pair angle-error matrix and name matches (input to matching)
+  - per distinct matching: problem.measurements.Measurements (name ok, angle error,
+    nearest anchor distance, ΣF relative error, relation errors)
+Per grid point only score_measurements (ramp_down_linear and the weighting) is reapplied. Matching itself
+depends on ang_tol_deg / ang_span_deg, so it is re-selected (from the cached angle matrix)
+once per distinct angle setting, and measurements are shared between settings that
+produce the same matching. With relations, submissions are taken SWEEP_CHUNK at a time and
+the relations of all distinct matchings in a chunk are evaluated as one batch
+(RelationTable.evaluate_batch).
+
+Scores equal evaluate_task(...)['score'] with the same tolerances.
+
+Usage:
+    grid = tolerance_grid(ang_tol_deg=[5, 10, 15], pos_tol=[10, 20])
+    for row in sweep(task_spec, submissions, grid):
+        print(row['tolerances'], row['mean'], row['histogram'])
+"""
+from __future__ import annotations
+from typing import Dict, Iterable, List, Sequence, Tuple
+import itertools
+
+from problem.drawn_forces import as_force_batch
+from problem.evaluate import (
+    CompiledTask,
+    NAME_MISMATCH_PENALTY,
+    compile_task,
+    ramp_down_linear,
+    _angle_error_units,
+    _drawn_units,
+    _match_greedy,
+    _match_optimal,
+    _normalize_name_cached,
+)
+from problem.measurements import Measurements, ScoringPolicy, measure_matched, score_measurements
+
+# Tolerances fields that can be swept (name -> CompiledTask attribute)
+TOLERANCE_FIELDS = {
+    'ang_tol_deg': 'ang_tol',
+    'ang_span_deg': 'ang_span',
+    'pos_tol': 'pos_tol',
+    'pos_span': 'pos_span',
+    'sumF_tol': 'sumf_tol',
+    'sumF_span': 'sumf_span',
+    'rel_tol': 'rel_tol',
+    'rel_span': 'rel_span',
+}
+DEFAULT_BINS = 10
+SWEEP_CHUNK = 256   # submissions whose relations are measured as one batch
+
+def tolerance_grid(**axes: Sequence[float]) -> List[Dict[str, float]]:
+    """Cartesian product of tolerance values: tolerance_grid(ang_tol_deg=[5, 10], pos_tol=[10]) -> [{...}, ...]."""
+    for name in axes:
+        if name not in TOLERANCE_FIELDS:
+            raise ValueError(f"Ukjent toleranse: {name}")
+    names = list(axes)
+    return [dict(zip(names, values)) for values in itertools.product(*(axes[n] for n in names))]
+
+def _settings(plan: CompiledTask, overrides: Dict[str, float]) -> Dict[str, float]:
+    """Full tolerance setting (plan values with overrides applied), keyed by Tolerances field name."""
+    for name in overrides:
+        if name not in TOLERANCE_FIELDS:
+            raise ValueError(f"Ukjent toleranse: {name}")
+    return {name: float(overrides.get(name, getattr(plan, attr))) for name, attr in TOLERANCE_FIELDS.items()}
+
+# ------------------------------------------------------
+# Per submission (tolerance independent)
+# ------------------------------------------------------
+
+class _Submission:
+    """Tolerance-independent data of one submission: angle matrix, name matches, matchings."""
+
+    def __init__(self, plan: CompiledTask, drawn_forces):
+        self.plan = plan
+        self.batch = as_force_batch(drawn_forces)
+        self.empty = not any(self.batch.editable)
+        if self.empty:
+            return
+        units = _drawn_units(self.batch)
+        self.named = [[False] * len(self.batch) for _ in plan.forces]
+        for j, name in enumerate(self.batch.names):
+            if name:
+                for i in plan.alias_rows.get(_normalize_name_cached(name), ()):
+                    self.named[i][j] = True
+        self.angles = [
+            [
+                _angle_error_units(u, cf.dir_unit) if u is not None and cf.dir_unit is not None else 180.0
+                for u in units
+            ]
+            for cf in plan.forces
+        ]
+        # (ang_tol, ang_span) -> matching key; matching key -> Measurements
+        self._by_angle_tol: Dict[Tuple[float, float], Tuple] = {}
+        self._by_matching: Dict[Tuple, Measurements] = {}
+
+    def _matching_key(self, ang_tol: float, ang_span: float) -> Tuple:
+        key = (ang_tol, ang_span)
+        mkey = self._by_angle_tol.get(key)
+        if mkey is None:
+            mkey = self._by_angle_tol[key] = tuple(self._match(ang_tol, ang_span).items())
+        return mkey
+
+    def matchings(self, angle_settings: Iterable[Tuple[float, float]]) -> List[Dict[str, int]]:
+        """Match once per angle setting; the distinct matchings that are not measured yet."""
+        new: Dict[Tuple, Dict[str, int]] = {}
+        for ang_tol, ang_span in angle_settings:
+            mkey = self._matching_key(ang_tol, ang_span)
+            if mkey not in self._by_matching:
+                new[mkey] = dict(mkey)
+        return list(new.values())
+
+    def measure(self, matched: Dict[str, int], relation_values=None) -> Measurements:
+        """Measure one matching (relation_values: its row of RelationTable.evaluate_batch)."""
+        m = measure_matched(self.plan, self.batch, matched, self.angles, relation_values=relation_values)
+        self._by_matching[tuple(matched.items())] = m
+        return m
+
+    def matching(self, ang_tol: float, ang_span: float) -> Measurements:
+        """Measurements for the matching made with these angle tolerances."""
+        mkey = self._matching_key(ang_tol, ang_span)
+        m = self._by_matching.get(mkey)
+        if m is None:
+            m = self.measure(dict(mkey))
+        return m
+
+    def _match(self, ang_tol: float, ang_span: float) -> Dict[str, int]:
+        plan = self.plan
+        # Same pair scores as _pair_score, from the cached angle errors
+        rows = []
+        for named_row, angle_row in zip(self.named, self.angles):
+            row = []
+            for named, angle_err in zip(named_row, angle_row):
+                dir_match = ramp_down_linear(angle_err, ang_tol, ang_span)
+                row.append(0.5 + 0.5 * dir_match if named else NAME_MISMATCH_PENALTY * dir_match)
+            rows.append(row)
+        if plan.match_strategy == "optimal":
+            return _match_optimal(plan.forces, len(self.batch), rows)
+        return _match_greedy(plan.forces, rows)
+
+    def score(self, tol: Dict[str, float], policy: ScoringPolicy) -> float:
+        if self.empty:
+            return 0.0
+        return score_measurements(self.matching(tol['ang_tol_deg'], tol['ang_span_deg']), policy)['score']
+
+# ------------------------------------------------------
+# Sweep
+# ------------------------------------------------------
+
+def histogram(scores: Sequence[float], bins: int = DEFAULT_BINS) -> List[int]:
+    """Counts of scores in `bins` equal bins over [0, 1] (1.0 goes in the last bin)."""
+    counts = [0] * bins
+    for s in scores:
+        k = int(s * bins)
+        counts[min(max(k, 0), bins - 1)] += 1
+    return counts
+
+def sweep_scores(
+    task_spec: object,
+    submissions: Iterable[Sequence[object]],
+    grid: Sequence[Dict[str, float]],
+) -> List[List[float]]:
+    """Scores per grid point: result[g][k] = score of submission k with tolerances grid[g]."""
+    plan = task_spec if isinstance(task_spec, CompiledTask) else compile_task(task_spec)
+    settings = [_settings(plan, overrides) for overrides in grid]
+    base = ScoringPolicy.from_task(plan)
+    policies = [base.replace(**tol) for tol in settings]
+    out: List[List[float]] = [[] for _ in settings]
+    table = plan.relation_table
+    angle_settings = list(dict.fromkeys((tol['ang_tol_deg'], tol['ang_span_deg']) for tol in settings))
+    it = iter(submissions)
+    while True:
+        subs = [_Submission(plan, drawn_forces) for drawn_forces in itertools.islice(it, SWEEP_CHUNK)]
+        if not subs:
+            return out
+        if table is not None:
+            # All distinct matchings of the chunk: one batched relation evaluation
+            pending = [(sub, matched) for sub in subs if not sub.empty for matched in sub.matchings(angle_settings)]
+            values = table.evaluate_batch([sub.batch for sub, _ in pending], [matched for _, matched in pending])
+            for (sub, matched), relation_values in zip(pending, values):
+                sub.measure(matched, relation_values)
+        for sub in subs:
+            for g, tol in enumerate(settings):
+                out[g].append(sub.score(tol, policies[g]))
+
+def sweep(
+    task_spec: object,
+    submissions: Iterable[Sequence[object]],
+    grid: Sequence[Dict[str, float]],
+    *,
+    bins: int = DEFAULT_BINS,
+) -> List[Dict[str, object]]:
+    """
+    Score histograms per tolerance setting.
+    Returns one dict per grid point: {'tolerances', 'n', 'mean', 'histogram', 'bin_edges'}.
+    """
+    plan = task_spec if isinstance(task_spec, CompiledTask) else compile_task(task_spec)
+    edges = [k / bins for k in range(bins + 1)]
+    rows = []
+    for overrides, scores in zip(grid, sweep_scores(plan, submissions, grid)):
+        rows.append({
+            'tolerances': _settings(plan, overrides),
+            'n': len(scores),
+            'mean': sum(scores) / len(scores) if scores else 0.0,
+            'histogram': histogram(scores, bins),
+            'bin_edges': edges,
+        })
+    return rows
+
+def format_sweep(rows: Sequence[Dict[str, object]], *, width: int = 30) -> str:
+    """Text report: one block per setting with changed tolerances, mean and a bar histogram."""
+    if not rows:
+        return "SWEEP: (ingen innstillinger)"
+    base = rows[0]['tolerances']
+    out = []
+    for row in rows:
+        tol = row['tolerances']
+        changed = {k: v for k, v in tol.items() if any(r['tolerances'][k] != base[k] for r in rows)}
+        label = ", ".join(f"{k}={v:g}" for k, v in changed.items()) or "(grunnverdier)"
+        out.append(f"{label}: n={row['n']} mean={row['mean']:.3f}")
+        counts = row['histogram']
+        peak = max(counts) if counts else 0
+        edges = row['bin_edges']
+        for k, c in enumerate(counts):
+            bar = "#" * (round(width * c / peak) if peak else 0)
+            out.append(f"  [{edges[k]:.1f}, {edges[k + 1]:.1f}) {c:>6} {bar}")
+    return "\n".join(out)
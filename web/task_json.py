@@ -0,0 +1,245 @@
+# ./problem/task_json.py
+"""
+Oppgaver i web-klientens JSON-format (tasks.js / editor-eksport) som TaskSpec.
+
+A web task is a dict:
+    {id, origin, scene: {plane, rects, circles, ellipses, segments, arrows, texts},
+     expectedForces: [{name, aliases, dir, anchor: {type, ref, point | segment}}
+                      or, from the editor's task export, {name, anchor: [x, y], arrowBase, arrowTip}],
+     initialForces, sumF, relations: [{lhs: [{name, component?}], rhs, ratio, tol_rel}]}
+
+Anchor references are resolved the way the client does (scene_render.buildAllScenePoints:
+'origin', 'plane', 'rect<i>', 'circle<i>', 'ellipse<i>', 'segment<i>', 'arrow<i>', 'text<i>'),
+so the TaskSpec carries explicit points and segments. Directions 'planeNormal' / 'planeTangent'
+and relation components 'normal' / 'tangent' / 'vertical' use the plane as in evaluate.js.
+
+Usage:
+    spec = task_spec_from_json(task)
+    result = evaluate_task(spec, ForceBatch.from_json(forces))
+"""
+from __future__ import annotations
+from types import SimpleNamespace
+from typing import Dict, List, Optional, Tuple
+import math
+
+from problem.spec import TaskSpec, AnchorType, Tolerances
+
+Vec2 = Tuple[float, float]
+
+PLANE_SPAN = 1400  # length of the plane segment in the scene lookup (as in the client)
+
+def _unit(v) -> Vec2:
+    """Client unit(): [0, 0] for (near) zero vectors."""
+    n = math.hypot(v[0], v[1])
+    return (v[0] / n, v[1] / n) if n > 1e-6 else (0.0, 0.0)
+
+def _pt(p) -> Optional[Vec2]:
+    if isinstance(p, (list, tuple)) and len(p) >= 2:
+        return (float(p[0]), float(p[1]))
+    return None
+
+# ------------------------------------------------------
+# Scene
+# ------------------------------------------------------
+
+def plane_vectors(plane: Optional[Dict]) -> Tuple[Optional[Vec2], Optional[Vec2]]:
+    """(n_unit, t_unit) of a client plane: stored n_vec/t_vec, else from angleDeg (y down)."""
+    if not plane:
+        return None, None
+    a = math.radians(plane.get('angleDeg') or 0)
+    n = _pt(plane.get('n_vec')) or (-math.sin(a), -math.cos(a))
+    t = _pt(plane.get('t_vec')) or (math.cos(a), -math.sin(a))
+    return _unit(n), _unit(t)
+
+def rect_points(r: Dict) -> Dict[str, Vec2]:
+    """Corners and named points of a client rect (scene_render.rectPoints)."""
+    w, h = r['width'], r['height']
+    bc = r['bottomCenter']
+    t = r.get('t_vec') or (1, 0)
+    n = r.get('n_vec') or (0, -1)
+    half = w / 2
+    top = (bc[0] + n[0] * h, bc[1] + n[1] * h)
+    center = (bc[0] + n[0] * (h / 2), bc[1] + n[1] * (h / 2))
+    return {
+        'bottomLeft': (bc[0] - t[0] * half, bc[1] - t[1] * half),
+        'bottomRight': (bc[0] + t[0] * half, bc[1] + t[1] * half),
+        'topLeft': (top[0] - t[0] * half, top[1] - t[1] * half),
+        'topRight': (top[0] + t[0] * half, top[1] + t[1] * half),
+        'center': center,
+        'right_middle': (center[0] + t[0] * half, center[1] + t[1] * half),
+        'left_middle': (center[0] - t[0] * half, center[1] - t[1] * half),
+        'top_center': top,
+        'bottom_center': (bc[0], bc[1]),
+    }
+
+def scene_lookup(task: Dict) -> Dict[str, Dict[str, Dict]]:
+    """{ref: {'points': {name: pt}, 'segments': {name: (a, b)}}} as buildAllScenePoints."""
+    lookup: Dict[str, Dict[str, Dict]] = {}
+    scene = task.get('scene') or {}
+    origin = _pt(task.get('origin') or scene.get('origin'))
+    if origin:
+        lookup['origin'] = {'points': {'center': origin}, 'segments': {}}
+    plane = scene.get('plane')
+    if plane and _pt(plane.get('through')):
+        through = _pt(plane['through'])
+        a_deg = math.radians(plane.get('angleDeg') or 0)
+        t = plane.get('t_vec') or (math.cos(a_deg), -math.sin(a_deg))
+        a = (through[0] - t[0] * PLANE_SPAN / 2, through[1] - t[1] * PLANE_SPAN / 2)
+        b = (through[0] + t[0] * PLANE_SPAN / 2, through[1] + t[1] * PLANE_SPAN / 2)
+        lookup['plane'] = {'points': {'a': a, 'b': b}, 'segments': {'plane': (a, b)}}
+    for i, r in enumerate(scene.get('rects') or []):
+        if not r:
+            continue
+        p = rect_points(r)
+        lookup[f'rect{i}'] = {
+            'points': {k: p[k] for k in ('center', 'top_center', 'bottom_center', 'left_middle', 'right_middle')},
+            'segments': {
+                'top': (p['topLeft'], p['topRight']),
+                'bottom': (p['bottomLeft'], p['bottomRight']),
+                'left': (p['bottomLeft'], p['topLeft']),
+                'right': (p['bottomRight'], p['topRight']),
+            },
+        }
+    for i, c in enumerate(scene.get('circles') or []):
+        if c and _pt(c.get('center')):
+            lookup[f'circle{i}'] = {'points': {'center': _pt(c['center'])}, 'segments': {}}
+    for i, e in enumerate(scene.get('ellipses') or []):
+        if not e or not _pt(e.get('center')):
+            continue
+        t = e.get('t_vec') or (1, 0)
+        n = e.get('n_vec') or (0, -1)
+        cx, cy = _pt(e['center'])
+        rx, ry = (e.get('width') or 0) / 2, (e.get('height') or 0) / 2
+        lookup[f'ellipse{i}'] = {
+            'points': {
+                'center': (cx, cy),
+                'top_center': (cx + n[0] * ry, cy + n[1] * ry),
+                'bottom_center': (cx - n[0] * ry, cy - n[1] * ry),
+                'right_middle': (cx + t[0] * rx, cy + t[1] * rx),
+                'left_middle': (cx - t[0] * rx, cy - t[1] * rx),
+            },
+            'segments': {},
+        }
+    for kind in ('segment', 'arrow'):
+        for i, s in enumerate(scene.get(kind + 's') or []):
+            if s and _pt(s.get('a')) and _pt(s.get('b')):
+                a, b = _pt(s['a']), _pt(s['b'])
+                lookup[f'{kind}{i}'] = {'points': {'start': a, 'end': b}, 'segments': {kind: (a, b)}}
+    for i, txt in enumerate(scene.get('texts') or []):
+        if txt and _pt(txt.get('pos')):
+            lookup[f'text{i}'] = {'points': {'pos': _pt(txt['pos'])}, 'segments': {}}
+    return lookup
+
+# ------------------------------------------------------
+# Forces and relations
+# ------------------------------------------------------
+
+def expected_dir(spec: Dict, task: Dict) -> Vec2:
+    """
+    Unit direction of an expected force (evaluate.js expectedDir). A force exported from
+    the editor as a drawn arrow (arrowBase/arrowTip, no dir) points from base to tip.
+    """
+    d = spec.get('dir')
+    if isinstance(d, (list, tuple)):
+        return _unit(d)
+    base, tip = _pt(spec.get('arrowBase')), _pt(spec.get('arrowTip'))
+    if d is None and base and tip:
+        return _unit((tip[0] - base[0], tip[1] - base[1]))
+    n, t = plane_vectors((task.get('scene') or {}).get('plane'))
+    if d == 'planeNormal' and n:
+        return n
+    if d == 'planeTangent' and t:
+        return t
+    return (1.0, 0.0)
+
+def component_dir(component: Optional[str], task: Dict) -> Optional[Vec2]:
+    """Unit direction of a relation term component; None = magnitude (evaluate.js getComponentDir)."""
+    n, t = plane_vectors((task.get('scene') or {}).get('plane'))
+    if component == 'normal':
+        return n
+    if component == 'tangent':
+        return t
+    if component == 'vertical':
+        return (0.0, -1.0)
+    return None
+
+def resolve_anchor(anchor, lookup: Dict[str, Dict[str, Dict]]):
+    """
+    Client anchor {type, ref, point | segment} as a resolved anchor, None if unresolvable.
+    A bare [x, y] (editor export of a drawn force) is a point anchor at that position.
+    """
+    if not anchor:
+        return None
+    if isinstance(anchor, (list, tuple)):
+        p = _pt(anchor)
+        if p is None:
+            return None
+        return SimpleNamespace(kind=AnchorType.POINT, point=p, segment=None,
+                               ref=None, point_name=None, segment_name=None)
+    entry = lookup.get(anchor.get('ref'))
+    if entry is None:
+        return None
+    if anchor.get('type') == 'point':
+        p = entry['points'].get(anchor.get('point'))
+        if p is None:
+            return None
+        return SimpleNamespace(kind=AnchorType.POINT, point=p, segment=None,
+                               ref=None, point_name=None, segment_name=None)
+    if anchor.get('type') == 'segment':
+        seg = entry['segments'].get(anchor.get('segment'))
+        if seg is None:
+            return None
+        return SimpleNamespace(kind=AnchorType.SEGMENT, point=None, segment=seg,
+                               ref=None, point_name=None, segment_name=None)
+    return None
+
+def _has_dir(spec: Dict) -> bool:
+    return spec.get('dir') is not None or (_pt(spec.get('arrowBase')) is not None and _pt(spec.get('arrowTip')) is not None)
+
+def _terms(side: List[Dict], task: Dict) -> list:
+    return [
+        SimpleNamespace(force_name=term['name'], sign=1.0, e_vec=component_dir(term.get('component'), task))
+        for term in side
+    ]
+
+def task_spec_from_json(task: Dict, *, tol: Optional[Tolerances] = None) -> TaskSpec:
+    """
+    TaskSpec for a client task dict. Basis is "np" when the task checks ΣF_n on a plane,
+    otherwise "xy". tol: tolerances (default Tolerances()).
+    """
+    scene = task.get('scene') or {}
+    lookup = scene_lookup(task)
+    forces = []
+    for spec in task.get('expectedForces') or []:
+        forces.append(SimpleNamespace(
+            name=spec['name'],
+            aliases=list(spec.get('aliases') or []),
+            dir_unit=expected_dir(spec, task) if _has_dir(spec) else None,
+            anchor=resolve_anchor(spec.get('anchor'), lookup),
+            w_name=1.0,
+            w_dir=1.0,
+            w_pos=1.0,
+        ))
+
+    relation_requirements = None
+    if task.get('relations'):
+        relation_requirements = SimpleNamespace(relations=[
+            SimpleNamespace(lhs=_terms(rel['lhs'], task), rhs=_terms(rel['rhs'], task), ratio=rel.get('ratio') or 1.0)
+            for rel in task['relations']
+        ])
+
+    n_unit, _ = plane_vectors(scene.get('plane'))
+    sum_f = task.get('sumF') or {}
+    basis = "np" if n_unit is not None and isinstance(sum_f.get('n'), (int, float)) else "xy"
+    origin = _pt(task.get('origin') or scene.get('origin'))
+    return TaskSpec(
+        expected_forces=forces,
+        scene=SimpleNamespace(
+            plane=SimpleNamespace(n_vec=n_unit) if n_unit is not None else None,
+            rects=[],
+            origin=origin,
+        ),
+        basis=basis,
+        tol=tol if tol is not None else Tolerances(),
+        relation_requirements=relation_requirements,
+    )
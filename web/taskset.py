@@ -0,0 +1,291 @@
+# ./problem/taskset.py
+"""
+Oppgavesett: les eksporterte oppgaver og bygg/kompiler bare de som faktisk brukes.
+
+Sources (a file or a directory of them):
+  - .json: the editor's task-set export {tasks: [...], metadata}, a list of tasks or one task
+  - .js:   TASKS.push({...}); blocks (the editor's task export, and tasks.js). Blocks that are
+           not plain JSON (tasks.js entries using JS constants) are skipped and counted.
+
+TaskSet is a read-only mapping {task_id: TaskSpec}: a spec is built (problem.task_json) the
+first time it is looked up, and plan(task_id) compiles it (evaluate.compile_task) on first use.
+Later sources override earlier ones with the same task id.
+
+With a cache directory (default: __taskcache__ next to the first source) nothing is parsed up
+front once a source has been seen:
+    index/<source hash>.json          task ids and task hashes of one source file
+    tasks/<task hash>.json            a task's canonical JSON (parsed when the task is requested)
+    plans/<plan key>-<code>.pickle    its CompiledTask
+The task hash is the hash of the task's canonical JSON, the plan key adds the tolerances, and
+<code> is a hash of the grader source (evaluate, task_json and their helpers), so editing a
+task or the grader never reuses a stale plan. Files are written atomically; the cache is
+trusted local data (pickle).
+
+Usage:
+    tasks = TaskSet('oppgaver/taskset_fysikk1.json')
+    plan = tasks.plan('Intro 1')                      # cached CompiledTask
+    regrade(..., tasks_ref='oppgaver/taskset_fysikk1.json')
+"""
+from __future__ import annotations
+from collections.abc import Mapping
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import sys
+
+from problem.spec import Tolerances
+from problem.evaluate import CompiledTask, compile_task
+from problem.task_json import task_spec_from_json
+
+CACHE_VERSION = 1
+DEFAULT_CACHE_NAME = "__taskcache__"
+SOURCE_SUFFIXES = ('.json', '.js')
+# Modules whose source goes into the plan cache key
+_CODE_MODULES = (
+    'problem.evaluate', 'problem.task_json', 'problem.anchor_index', 'problem.relation_engine',
+    'problem.drawn_forces', 'problem.spec',
+)
+
+def _sha(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:32]
+
+def _canonical(task: Dict) -> bytes:
+    return json.dumps(task, sort_keys=True, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+def _write_atomic(path: str, data: bytes) -> None:
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'wb') as fh:
+        fh.write(data)
+    os.replace(tmp, path)
+
+def code_fingerprint() -> str:
+    """Hash of the grader source that compiled plans depend on."""
+    h = hashlib.sha256(f"{CACHE_VERSION}:{sys.version_info[:2]}".encode())
+    for name in _CODE_MODULES:
+        path = getattr(sys.modules.get(name), '__file__', None)
+        if path:
+            try:
+                with open(path, 'rb') as fh:
+                    h.update(fh.read())
+            except OSError:
+                h.update(name.encode())
+    return h.hexdigest()[:16]
+
+# ------------------------------------------------------
+# Sources
+# ------------------------------------------------------
+
+def source_files(sources: Union[str, Sequence[str]]) -> List[str]:
+    """Files of the given sources; directories give their .json/.js files in name order."""
+    if isinstance(sources, str):
+        sources = [sources]
+    files = []
+    for src in sources:
+        if os.path.isdir(src):
+            files.extend(os.path.join(src, n) for n in sorted(os.listdir(src)) if n.endswith(SOURCE_SUFFIXES))
+        else:
+            files.append(src)
+    return files
+
+def extract_js_tasks(text: str) -> Tuple[List[Dict], int]:
+    """(tasks, skipped) from the TASKS.push(...) blocks of a JS file; skipped = blocks that are not JSON."""
+    tasks: List[Dict] = []
+    skipped = 0
+    decoder = json.JSONDecoder()
+    marker = "TASKS.push("
+    at = text.find(marker)
+    while at >= 0:
+        start = at + len(marker)
+        while start < len(text) and text[start].isspace():
+            start += 1
+        try:
+            task, _ = decoder.raw_decode(text, start)
+            if isinstance(task, dict):
+                tasks.append(task)
+            else:
+                skipped += 1
+        except ValueError:
+            skipped += 1
+        at = text.find(marker, start)
+    return tasks, skipped
+
+def parse_source(data: bytes, path: str = "") -> Tuple[List[Dict], int]:
+    """(tasks, skipped) of one source file's content."""
+    text = data.decode('utf-8-sig')
+    if path.endswith('.js') or "TASKS.push(" in text:
+        return extract_js_tasks(text)
+    obj = json.loads(text)
+    if isinstance(obj, dict) and isinstance(obj.get('tasks'), list):
+        obj = obj['tasks']
+    if isinstance(obj, dict):
+        obj = [obj]
+    if not isinstance(obj, list):
+        raise ValueError(f"Ukjent oppgaveformat i {path or 'kilden'}")
+    tasks = [t for t in obj if isinstance(t, dict)]
+    return tasks, len(obj) - len(tasks)
+
+# ------------------------------------------------------
+# Task set
+# ------------------------------------------------------
+
+class TaskSet(Mapping):
+    """
+    Lazy {task_id: TaskSpec} over exported task sources, with compiled plans cached on disk.
+
+    sources: file, directory or list of them
+    cache_dir: cache directory; None = default (__taskcache__ next to the first source),
+        False = no disk cache (sources are parsed at once, specs and plans still built lazily)
+    tol: Tolerances for every task (default Tolerances())
+    """
+
+    def __init__(
+        self,
+        sources: Union[str, Sequence[str]],
+        *,
+        cache_dir: Union[str, None, bool] = None,
+        tol: Optional[Tolerances] = None,
+    ):
+        self.files = source_files(sources)
+        if not self.files:
+            raise ValueError("Ingen oppgavekilder")
+        if cache_dir is None:
+            cache_dir = os.path.join(os.path.dirname(os.path.abspath(self.files[0])), DEFAULT_CACHE_NAME)
+        self.cache_dir: Optional[str] = cache_dir or None
+        self.tol = tol
+        self._tol_key = repr(tol).encode('utf-8')
+        self._hashes: Dict[str, str] = {}          # task id -> task hash
+        self._raw: Dict[str, Dict] = {}            # task hash -> task dict (parsed tasks)
+        self._specs: Dict[str, object] = {}
+        self._plans: Dict[str, CompiledTask] = {}
+        self._code: Optional[str] = None
+        self.skipped = 0
+        self.stats: Dict[str, int] = {'sources_parsed': 0, 'tasks_parsed': 0, 'compiled': 0, 'plan_hits': 0}
+        if self.cache_dir:
+            for sub in ('index', 'tasks', 'plans'):
+                os.makedirs(os.path.join(self.cache_dir, sub), exist_ok=True)
+        for path in self.files:
+            self._index(path)
+
+    def _cache(self, *parts: str) -> str:
+        return os.path.join(self.cache_dir, *parts)
+
+    def _index(self, path: str) -> None:
+        with open(path, 'rb') as fh:
+            data = fh.read()
+        if self.cache_dir:
+            index_path = self._cache('index', f"{_sha(data)}.json")
+            try:
+                with open(index_path, 'r', encoding='utf-8') as fh:
+                    entries = json.load(fh)
+            except (OSError, ValueError):
+                entries = None
+            if entries is not None:
+                self.skipped += entries['skipped']
+                for task_id, canon_hash in entries['tasks']:
+                    self._hashes[task_id] = canon_hash
+                return
+        tasks, skipped = parse_source(data, path)
+        self.stats['sources_parsed'] += 1
+        self.skipped += skipped
+        entries = []
+        for task in tasks:
+            task_id = str(task.get('id'))
+            canonical = _canonical(task)
+            canon_hash = _sha(canonical)
+            self._hashes[task_id] = canon_hash
+            self._raw[canon_hash] = task
+            entries.append([task_id, canon_hash])
+            if self.cache_dir:
+                task_path = self._cache('tasks', f"{canon_hash}.json")
+                if not os.path.exists(task_path):
+                    _write_atomic(task_path, canonical)
+        if self.cache_dir:
+            _write_atomic(index_path, json.dumps({'tasks': entries, 'skipped': skipped}).encode('utf-8'))
+
+    # --- Mapping ---
+
+    def __getitem__(self, task_id: str) -> object:
+        spec = self._specs.get(task_id)
+        if spec is None:
+            spec = task_spec_from_json(self.task_json(task_id), tol=self.tol)
+            self._specs[task_id] = spec
+        return spec
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._hashes)
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    def __contains__(self, task_id: object) -> bool:
+        return task_id in self._hashes
+
+    # --- Tasks and plans ---
+
+    def task_json(self, task_id: str) -> Dict:
+        """The task dict as exported (parsed on first request)."""
+        canon_hash = self._hashes.get(task_id)
+        if canon_hash is None:
+            raise KeyError(f"Ukjent oppgave: {task_id}")
+        task = self._raw.get(canon_hash)
+        if task is None:
+            with open(self._cache('tasks', f"{canon_hash}.json"), 'rb') as fh:
+                task = json.loads(fh.read().decode('utf-8'))
+            self._raw[canon_hash] = task
+            self.stats['tasks_parsed'] += 1
+        return task
+
+    def plan(self, task_id: str) -> CompiledTask:
+        """CompiledTask of a task: memory, then the disk cache, then compile_task (and store)."""
+        plan = self._plans.get(task_id)
+        if plan is not None:
+            return plan
+        if task_id not in self._hashes:
+            raise KeyError(f"Ukjent oppgave: {task_id}")
+        plan_path = None
+        if self.cache_dir:
+            if self._code is None:
+                self._code = code_fingerprint()
+            key = _sha(self._hashes[task_id].encode() + b"\0" + self._tol_key)
+            plan_path = self._cache('plans', f"{key}-{self._code}.pickle")
+            try:
+                with open(plan_path, 'rb') as fh:
+                    plan = pickle.load(fh)
+                self.stats['plan_hits'] += 1
+            except Exception:  # missing or unreadable cache entry: compile again
+                plan = None
+        if plan is None:
+            plan = compile_task(self[task_id])
+            self.stats['compiled'] += 1
+            if plan_path is not None:
+                _write_atomic(plan_path, pickle.dumps(plan, protocol=pickle.HIGHEST_PROTOCOL))
+        self._plans[task_id] = plan
+        return plan
+
+    def warm(self, task_ids: Optional[Sequence[str]] = None) -> int:
+        """Compile (or load) the plans of task_ids (default all); returns the count."""
+        ids = list(self) if task_ids is None else list(task_ids)
+        for task_id in ids:
+            self.plan(task_id)
+        return len(ids)
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Oppgavesett: list og forhåndskompiler oppgaver")
+    parser.add_argument('sources', nargs='+', help="task-set .json / .js files or directories")
+    parser.add_argument('--cache-dir', default=None)
+    parser.add_argument('--no-cache', action='store_true')
+    parser.add_argument('--warm', action='store_true', help="compile every task into the cache")
+    args = parser.parse_args(argv)
+    tasks = TaskSet(args.sources, cache_dir=False if args.no_cache else args.cache_dir)
+    if args.warm:
+        tasks.warm()
+    for task_id in tasks:
+        print(task_id)
+    print(f"{len(tasks)} oppgaver ({tasks.skipped} hoppet over), {tasks.stats}", file=sys.stderr)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())